@@ -0,0 +1,22 @@
+"""
+A tiny web process for benchmarking Procenv, which prints the time it
+started listening to its `PORT` at, so that it can be compared to the time
+Procenv reports it.
+"""
+import os
+import signal
+import socket
+import sys
+import time
+
+
+sock = socket.socket()
+sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+sock.bind(('127.0.0.1', int(os.environ['PORT'])))
+sock.listen()
+print(f'listening at {time.time()}', flush=True)
+signal.signal(signal.SIGTERM, lambda *args: sys.exit(0))
+
+while True:
+    conn, _ = sock.accept()
+    conn.close()
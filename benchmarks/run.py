@@ -0,0 +1,297 @@
+import json
+import os
+import platform
+import queue
+import re
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+import click
+
+from procenv import logs
+from procenv import utils
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROCFILE = 'benchmarks/fixtures/Procfile'
+LISTENING_RE = re.compile(r'listening at (\d+\.\d+)')
+
+
+def metric(value, unit, better='lower'):
+    return {'value': value, 'unit': unit, 'better': better}
+
+
+def get_free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def read_cpu_time(pid):
+    """
+    Return the CPU time of the given process in seconds, excluding its
+    children, from `/proc/<pid>/stat`.
+    """
+    with open(f'/proc/{pid}/stat', 'rb') as stat:
+        fields = stat.read().rsplit(b')', 1)[1].split()
+
+    return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+
+def read_rss(pid):
+    """
+    Return the resident memory of the given process in MiB.
+    """
+    with open(f'/proc/{pid}/status') as status:
+        for line in status:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+
+
+class ProcenvRun:
+    """
+    A run of Procenv with the fixture application, recording the time each
+    message of Procenv and each line of output got received at.
+    """
+
+    def __init__(self, *args):
+        self.port = get_free_port()
+        env = {
+            key: value for key, value in os.environ.items()
+            if key not in ('DATABASE_URL', 'REDIS_URL')
+        }
+        env.update(
+            PROCFILE=PROCFILE, PORT=str(self.port), PYTHON=sys.executable,
+        )
+        self.lines = queue.Queue()
+        self.received = []
+        self.started_at = time.time()
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'procenv.cli', *args],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            env=env,
+            cwd=ROOT,
+        )
+
+        for stream in (self.process.stdout, self.process.stderr):
+            threading.Thread(
+                target=self.read, args=(stream,), daemon=True,
+            ).start()
+
+    def read(self, stream):
+        for line in stream:
+            self.lines.put((time.time(), line.decode(errors='replace')))
+
+    def wait_for(self, pattern, timeout=30):
+        """
+        Wait for a line matching the given regular expression and return the
+        time it got received at, along with the match. Lines are looked up
+        from the start of the run, as stdout and stderr are read separately.
+        """
+        deadline = time.monotonic() + timeout
+        index = 0
+
+        while True:
+            while index < len(self.received):
+                received_at, line = self.received[index]
+                match = re.search(pattern, line)
+                index += 1
+
+                if match:
+                    return received_at, match
+
+            remaining = deadline - time.monotonic()
+
+            try:
+                self.received.append(
+                    self.lines.get(timeout=max(remaining, 0)),
+                )
+            except queue.Empty:
+                raise click.ClickException(
+                    f'Timed out waiting for "{pattern}"',
+                )
+
+    def stop(self):
+        self.process.send_signal(signal.SIGTERM)
+
+        try:
+            self.process.wait(10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+
+def benchmark_startup(repeat, check):
+    """
+    Measure the time from spawning Procenv to its welcome message, the
+    duration of its preboot stage and the time from the application
+    listening to its port to Procenv reporting it.
+    """
+    cold_starts, preboots, times_to_bind = [], [], []
+
+    for _ in range(repeat):
+        run = ProcenvRun('--check', 'procenv.checks.ProcfileCheck',
+                         '--check', check)
+
+        try:
+            welcomed_at, _ = run.wait_for(r'\(PE00\)')
+            preboot_started_at, _ = run.wait_for(r'\(PE01\)')
+            preboot_ended_at, _ = run.wait_for(r'\(PE10\)')
+            _, listening = run.wait_for(LISTENING_RE)
+            bound_at, _ = run.wait_for(r'\(PB20\)')
+        finally:
+            run.stop()
+
+        cold_starts.append(welcomed_at - run.started_at)
+        preboots.append(preboot_ended_at - preboot_started_at)
+        times_to_bind.append(bound_at - float(listening.group(1)))
+
+    return {
+        'cold_start': metric(statistics.median(cold_starts), 'seconds'),
+        'preboot_duration': metric(statistics.median(preboots), 'seconds'),
+        'time_to_bind': metric(statistics.median(times_to_bind), 'seconds'),
+    }
+
+
+def benchmark_main_loop(duration):
+    """
+    Measure the CPU time and memory of Procenv itself, while running the main
+    checks against the application for `duration` seconds.
+    """
+    if not os.path.exists('/proc/self/stat'):
+        return {}
+
+    run = ProcenvRun()
+
+    try:
+        run.wait_for(r'\(PB20\)')
+        cpu_time = read_cpu_time(run.process.pid)
+        time.sleep(duration)
+        cpu_time = read_cpu_time(run.process.pid) - cpu_time
+        rss = read_rss(run.process.pid)
+    finally:
+        run.stop()
+
+    return {
+        'main_loop_cpu_per_hour': metric(
+            cpu_time / duration * 3600, 'seconds',
+        ),
+        'main_loop_rss': metric(rss, 'MiB'),
+    }
+
+
+def benchmark_log(count):
+    """
+    Measure how many messages per second `utils.log` accepts and how many
+    get written to stderr per second, with stderr being `/dev/null`.
+    """
+    logs.sink = logs.LogSink(max_queue_size=count)
+    stderr = sys.stderr
+
+    with open(os.devnull, 'w') as devnull:
+        sys.stderr = devnull
+
+        try:
+            started_at = time.perf_counter()
+
+            for index in range(count):
+                utils.log('PE99', f'Benchmark message {index}')
+
+            emitted_at = time.perf_counter()
+            logs.sink.flush()
+            flushed_at = time.perf_counter()
+        finally:
+            sys.stderr = stderr
+
+    return {
+        'log_emit_throughput': metric(
+            count / (emitted_at - started_at), 'messages/second', 'higher',
+        ),
+        'log_write_throughput': metric(
+            count / (flushed_at - started_at), 'messages/second', 'higher',
+        ),
+    }
+
+
+def compare(results, baseline, threshold):
+    """
+    Print how each metric changed since the baseline results and return
+    whether any of them regressed by more than `threshold`.
+    """
+    regressed = False
+
+    for name, result in results['metrics'].items():
+        previous = baseline['metrics'].get(name)
+
+        if not previous or not previous['value']:
+            continue
+
+        change = result['value'] / previous['value'] - 1
+
+        if result['better'] == 'higher':
+            change = -change
+
+        status = 'ok'
+
+        if change > threshold:
+            status = 'REGRESSED'
+            regressed = True
+
+        click.echo(
+            f'{name}: {previous["value"]:.4g} -> {result["value"]:.4g} '
+            f'{result["unit"]} ({change:+.1%} worse) {status}',
+            err=True,
+        )
+
+    return regressed
+
+
+@click.command()
+@click.option('--repeat', default=5, show_default=True,
+              help='Runs of Procenv to take the median of')
+@click.option('--duration', default=10.0, show_default=True,
+              help='Seconds to measure the main check loop for')
+@click.option('--log-messages', default=100000, show_default=True,
+              help='Messages to log for measuring the log throughput')
+@click.option('--output', type=click.File('w'), default='-',
+              help='File to write the results to, as JSON')
+@click.option('--compare', 'baseline', type=click.File('r'),
+              help='Results of a previous run to compare with')
+@click.option('--threshold', default=0.2, show_default=True,
+              help='Fraction by which a metric should get worse compared to '
+              'the baseline, to fail')
+def main(repeat, duration, log_messages, output, baseline, threshold):
+    """
+    Measure the overhead of Procenv itself and write the results as JSON.
+    """
+    results = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'metrics': {},
+    }
+    results['metrics'].update(
+        benchmark_startup(repeat, 'procenv.checks.PortBindCheck'),
+    )
+    netlink_results = benchmark_startup(
+        repeat, 'procenv.checks.NetlinkPortBindCheck',
+    )
+    results['metrics']['time_to_bind_netlink'] = (
+        netlink_results['time_to_bind']
+    )
+    results['metrics'].update(benchmark_main_loop(duration))
+    results['metrics'].update(benchmark_log(log_messages))
+    json.dump(results, output, indent=2)
+    output.write('\n')
+
+    if baseline and compare(results, json.load(baseline), threshold):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
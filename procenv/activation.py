@@ -0,0 +1,106 @@
+import re
+import socket
+import struct
+import sys
+
+
+# The first file descriptor passed to socket-activated processes, according
+# to the `LISTEN_FDS` convention of systemd.
+LISTEN_FDS_START = 3
+# Moves the listening socket from the file descriptor it got passed as (given
+# as `argv[1]`) to `LISTEN_FDS_START`, exports its PID as `LISTEN_PID` and
+# replaces itself with a shell running the command (given as `argv[2]`), so
+# that the command keeps the PID, as long as it gets `exec`-ed by the shell.
+# The shell cannot do the former, as it only handles file descriptors up to 9.
+LISTEN_FDS_WRAPPER = f'''
+import os, sys
+fd = int(sys.argv[1])
+if fd != {LISTEN_FDS_START}:
+    os.dup2(fd, {LISTEN_FDS_START})
+    os.close(fd)
+os.environ['LISTEN_PID'] = str(os.getpid())
+os.execv('/bin/sh', ['/bin/sh', '-c', sys.argv[2]])
+'''
+# Commands without shell operators, which can be `exec`-ed as they are
+# (i.e. not starting by `exec` or by variable assignments already).
+SIMPLE_COMMAND_RE = re.compile(
+    r'^(?!exec\s)(?![A-Za-z_][A-Za-z0-9_]*=)[^;&|()<>`\n]+$',
+)
+
+TCP_INFO = getattr(socket, 'TCP_INFO', 11)
+# The `tcpi_unacked` field of struct tcp_info, which holds the length of the
+# accept queue for listening sockets
+TCP_INFO_UNACKED = struct.Struct('=24xI')
+
+
+def create_listening_socket(port, backlog=socket.SOMAXCONN):
+    """
+    Create a socket listening to the given port of all addresses, over both
+    IPv6 and IPv4 where available. The socket stays blocking, as its file
+    description gets shared with the processes it is passed to.
+    """
+    try:
+        sock = socket.socket(socket.AF_INET6, socket.SOCK_STREAM)
+        sock.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_V6ONLY, 0)
+    except (AttributeError, OSError):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind(('', port))
+        sock.listen(backlog)
+    except OSError:
+        sock.close()
+        raise
+
+    return sock
+
+
+def get_activated_command(command):
+    """
+    Return the given command, so that the shell replaces itself with it
+    instead of forking, as the process listening to the passed sockets should
+    have the PID announced in `LISTEN_PID`. Commands with shell operators are
+    returned as they are; these should `exec` the server on their own (e.g.
+    `./migrate && exec gunicorn app:app`).
+    """
+    if SIMPLE_COMMAND_RE.match(command.strip()):
+        return f'exec {command.strip()}'
+
+    return command
+
+
+def get_wrapped_command(command, fd):
+    """
+    Return the arguments spawning the given command with the listening socket
+    passed as the given file descriptor (e.g. via `pass_fds`), which it gets
+    as `LISTEN_FDS_START` instead.
+    """
+    # Isolated from the environment of the application (e.g. PYTHONPATH), as
+    # only the command should see it.
+    return [
+        sys.executable, '-I', '-S', '-c', LISTEN_FDS_WRAPPER, str(fd),
+        get_activated_command(command),
+    ]
+
+
+def get_activation_env(names):
+    """
+    Return the environment variables announcing the given sockets to a
+    process, apart from `LISTEN_PID`, which is set by `LISTEN_FDS_WRAPPER`.
+    """
+    return {
+        'LISTEN_FDS': str(len(names)),
+        'LISTEN_FDNAMES': ':'.join(names),
+    }
+
+
+def get_accept_queue_length(sock):
+    """
+    Return the number of connections waiting to be accepted by the given
+    listening socket (Linux only).
+    """
+    tcp_info = sock.getsockopt(
+        socket.IPPROTO_TCP, TCP_INFO, TCP_INFO_UNACKED.size,
+    )
+    return TCP_INFO_UNACKED.unpack_from(tcp_info)[0]
@@ -0,0 +1,103 @@
+import os
+import socket
+import subprocess
+import sys
+import unittest
+
+from . import activation
+
+
+def test_get_activated_command():
+    """
+    Make sure that simple commands get `exec`-ed, while commands with shell
+    operators, variable assignments or `exec` already are left as they are.
+    """
+    assert activation.get_activated_command('gunicorn -b ":$PORT" app') == (
+        'exec gunicorn -b ":$PORT" app'
+    )
+
+    for command in (
+        './migrate && exec gunicorn app',
+        'exec gunicorn app',
+        'WEB_CONCURRENCY=4 gunicorn app',
+        'gunicorn app | tee log',
+    ):
+        assert activation.get_activated_command(command) == command
+
+
+def test_get_activation_env():
+    """
+    Make sure that the sockets get announced by number and by name.
+    """
+    assert activation.get_activation_env(['web.1']) == {
+        'LISTEN_FDS': '1',
+        'LISTEN_FDNAMES': 'web.1',
+    }
+
+
+def test_get_wrapped_command():
+    """
+    Integration test: Make sure that the socket gets passed to the process as
+    file descriptor 3, without the one it got passed as, along with the PID
+    of the process in `LISTEN_PID`.
+    """
+    # Past the file descriptors that the shell can handle.
+    padding_fds = [os.open(os.devnull, os.O_RDONLY) for _ in range(10)]
+    read_fd, write_fd = os.pipe()
+    script = (
+        'import os; '
+        'os.write(3, os.environ["LISTEN_PID"].encode()); '
+        f'print(os.getpid(), os.path.exists("/proc/self/fd/{write_fd}"))'
+    )
+
+    try:
+        output = subprocess.check_output(
+            activation.get_wrapped_command(
+                f'exec {sys.executable} -c \'{script}\'', write_fd,
+            ),
+            pass_fds=[write_fd],
+        )
+        os.close(write_fd)
+        write_fd = None
+        pid, write_fd_passed = output.split()
+        assert os.read(read_fd, 100) == pid
+        assert write_fd_passed == b'False'
+    finally:
+        for fd in padding_fds + [read_fd, write_fd]:
+            if fd is not None:
+                os.close(fd)
+
+
+class ListeningSocketTest(unittest.TestCase):
+    def setUp(self):
+        self.sock = activation.create_listening_socket(0)
+        self.port = self.sock.getsockname()[1]
+
+    def tearDown(self):
+        self.sock.close()
+
+    def test_create_listening_socket(self):
+        """
+        Ensure that the socket accepts connections over IPv4 and stays
+        blocking, as its file description gets shared.
+        """
+        assert self.sock.getblocking() is True
+
+        with socket.create_connection(('127.0.0.1', self.port)):
+            connection, _ = self.sock.accept()
+            connection.close()
+
+    def test_get_accept_queue_length(self):
+        """
+        Ensure that connections waiting to be accepted are counted.
+        """
+        if not hasattr(socket, 'TCP_INFO'):
+            self.skipTest('TCP_INFO is available only on Linux')
+
+        assert activation.get_accept_queue_length(self.sock) == 0
+
+        with socket.create_connection(('127.0.0.1', self.port)):
+            assert activation.get_accept_queue_length(self.sock) == 1
+            connection, _ = self.sock.accept()
+            connection.close()
+            assert activation.get_accept_queue_length(self.sock) == 0
@@ -1,23 +1,177 @@
 import asyncio
+import collections
+import fnmatch
+import os
+import signal
 import sys
+import time
 
+from . import activation
+from . import dependencies
+from . import inotify
+from . import logs
+from . import metrics
+from . import tracing
 from . import utils
+from .checks import call_check_method
+from .scheduler import CheckScheduler
+from .streams import OutputPipeline
 
 
-class ProcfileApplication:
+class ProcfileProcess:
+    """
+    The `ProcfileProcess` class represents a single process of a
+    Procfile-based application (e.g. `web.1`), which gets spawned directly by
+    Procenv as its own child process.
+    """
+
+    def __init__(self, name, command, env=None, cwd=None, listen_socket=None):
+        self.name = name
+        self.command = command
+        self.env = env
+        self.cwd = cwd
+        self.listen_socket = listen_socket
+        self.process = None
+
+    @property
+    def cmd(self):
+        if self.listen_socket is not None:
+            return activation.get_wrapped_command(
+                self.command, self.listen_socket.fileno(),
+            )
+
+        return ['/bin/sh', '-c', self.command]
+
+    @property
+    def process_type(self):
+        return self.name.rsplit('.', 1)[0]
+
+    @property
+    def pid(self):
+        return self.process.pid if self.process else None
+
+    @property
+    def returncode(self):
+        return self.process.returncode if self.process else None
+
+    async def start(self):
+        """
+        Spawn the process in its own session, so that signals can be sent to
+        the whole process group of the command (e.g. a shell and its
+        children). Socket-activated processes inherit their listening socket
+        as file descriptor 3.
+        """
+        kwargs = {}
+
+        if self.listen_socket is not None:
+            # Passed as it is and moved to file descriptor 3 by the wrapper
+            # of the command, as a `preexec_fn` is not safe to use while
+            # Procenv runs threads.
+            kwargs.update(pass_fds=[self.listen_socket.fileno()])
+
+        self.process = await asyncio.create_subprocess_exec(
+            *self.cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+            env=self.env,
+            cwd=self.cwd,
+            start_new_session=True,
+            **kwargs,
+        )
+        return self.process
+
+    def send_signal(self, signum):
+        if self.process is None:
+            return
+
+        try:
+            os.killpg(self.process.pid, signum)
+        except ProcessLookupError:
+            pass
+
+    def terminate(self):
+        self.send_signal(signal.SIGTERM)
+
+    def kill(self):
+        self.send_signal(signal.SIGKILL)
+
+
+class StopSignalsMixin:
+    """
+    Handles the `stop_signals` in the `loop` of an application (or a group
+    of them), by calling its `terminate` method.
+    """
+    stop_signals = (signal.SIGINT, signal.SIGTERM)
+
+    def add_signal_handlers(self):
+        for signum in self.stop_signals:
+            try:
+                self.loop.add_signal_handler(signum, self.terminate)
+            except (NotImplementedError, RuntimeError, ValueError):
+                # Signal handlers can only be added in the main thread of
+                # Unix event loops.
+                pass
+
+    def remove_signal_handlers(self):
+        for signum in self.stop_signals:
+            try:
+                self.loop.remove_signal_handler(signum)
+            except (NotImplementedError, RuntimeError, ValueError):
+                pass
+
+
+class ProcfileApplication(StopSignalsMixin):
     """
     The `ProcfileApplication` class helps run, monitor and manage a
     Procfile-based application in an asyncio event loop.
     """
+    default_port = 5000
+    kill_timeout = 10
+    preboot_deadline = 60
+    wait_dependencies = False
+    wait_endpoints = ()
+    wait_timeout = 60
+    socket_activation = False
+    reload_procfile = False
+    reload_delay = 0.1
+    watch_process_types = None
+    watch_ignore = (
+        '.git', '.hg', '.svn', 'node_modules', '__pycache__', '.venv',
+        'venv', '.tox', '*.pyc', '*.swp', '*.swx', '*~', '.#*', '#*#',
+    )
+    watch_debounce = 0.2
+    handle_signals = True
 
-    def __init__(self, procfile, checks, loop=None):
+    def __init__(self, procfile, checks, loop=None, concurrency=None,
+                 name=None, cwd=None, output=None):
         self.procfile = procfile
         self.checks = checks
         self.loop = loop or asyncio.get_event_loop()
+        self.concurrency = concurrency or {}
+        self.name = name
+        self.cwd = cwd
+        self.environment = None
+        self.processes = []
+        self.scheduler = None
+        self.started_at = None
+        self.listen_sockets = {}
+        self.output = output or OutputPipeline(loop=self.loop, label=name)
+        self.watchers = {}
+        self.replaced_processes = set()
+        self.exited = None
+        self.procfile_watcher = None
+        self.reload_handle = None
+        self.tree_watcher = None
+        self.reload_lock = asyncio.Lock()
+        self.spawned_at = {}
+
+        for check in self.checks:
+            if hasattr(check, 'attach'):
+                check.attach(self)
 
     @property
-    def cmd(self):
-        return ['honcho', '-f', self.procfile, 'start']
+    def process_types(self):
+        return utils.parse_procfile(self.procfile)
 
     @property
     def preboot_checks(self):
@@ -33,14 +187,121 @@ class ProcfileApplication:
         ]
         return _checks
 
-    def run_preboot_checks(self):
-        utils.log('PE01', 'Running preboot checks for your application')
+    def qualify(self, name):
+        """
+        Return the given name (e.g. of a process), prefixed by the name of the
+        application when Procenv runs many applications.
+        """
+        return f'{self.name}/{name}' if self.name else name
+
+    @property
+    def trace_track(self):
+        """
+        The track of the spans of the lifecycle of the application.
+        """
+        return self.name or 'application'
+
+    async def run_preboot_check(self, check, timeout):
+        """
+        Run the `preboot` method of the given check within the given timeout
+        and return its result, along with the time it took in seconds.
+        Timeouts and exceptions are turned into failed results.
+        """
+        started_at = self.loop.time()
+        # Each preboot check runs in a task of its own, so this affects just
+        # this check.
+        logs.current_check.set(check.__class__.__name__)
+
+        try:
+            preboot_result = await asyncio.wait_for(
+                call_check_method(check.preboot), timeout,
+            )
+        except asyncio.TimeoutError:
+            preboot_result = (
+                False, ('PE50', f'timed out after {timeout} seconds'),
+            )
+        except Exception as e:
+            preboot_result = (False, ('PE51', f'raised {e!r}'))
+
+        duration = self.loop.time() - started_at
+        check_name = self.qualify(check.__class__.__name__)
+        succeeded = (
+            preboot_result[0] if isinstance(preboot_result, tuple)
+            else preboot_result
+        )
+        metrics.check_duration.observe(duration, check_name, 'preboot')
+        metrics.check_status.set(int(bool(succeeded)), check_name)
+        tracing.tracer.add_span(
+            'preboot()', check_name, started_at, started_at + duration,
+            succeeded=bool(succeeded),
+        )
+        return preboot_result, duration
+
+    async def gather_preboot_results(self):
+        """
+        Run all preboot checks concurrently, within the timeout of each check
+        and the preboot deadline of the application. Return their results and
+        durations, in the order of the checks.
+        """
+        # This runs in a task of its own, which the tasks of the checks
+        # inherit the application of their messages from.
+        logs.current_app.set(self.name)
+        # Checks whose timeout exceeds the preboot deadline are being bound
+        # by the deadline itself.
+        tasks = [
+            self.loop.create_task(
+                self.run_preboot_check(
+                    check,
+                    check.timeout
+                    if check.timeout < self.preboot_deadline else None,
+                ),
+            )
+            for check in self.preboot_checks
+        ]
+
+        if not tasks:
+            return []
+
+        with tracing.tracer.span('preboot', self.trace_track):
+            _, pending = await asyncio.wait(
+                tasks, timeout=self.preboot_deadline,
+            )
+
+        results = []
+
+        for task in tasks:
+            if task in pending:
+                task.cancel()
+                message = (
+                    'did not complete within the preboot deadline of '
+                    f'{self.preboot_deadline} seconds'
+                )
+                results.append(((False, ('PE52', message)), None))
+            else:
+                results.append(task.result())
+
+        return results
+
+    def report_preboot_results(self, results):
+        """
+        Log the duration of each preboot check and the reason of each failed
+        one. Return whether all of them succeeded.
+        """
         at_least_one_check_has_failed = False
 
-        for check in self.preboot_checks:
-            preboot_result = check.preboot()
+        for check, (preboot_result, duration) in zip(
+            self.preboot_checks, results,
+        ):
+            check_name = check.__class__.__name__
 
-            if (type(preboot_result) == tuple):
+            if duration is not None:
+                utils.log(
+                    'PE12',
+                    f'Check {check_name}.preboot() took {duration:.3f} '
+                    'seconds',
+                )
+
+            if isinstance(preboot_result, tuple):
                 succeedded, reason = preboot_result
             else:
                 succeedded = preboot_result
@@ -52,8 +313,7 @@ class ProcfileApplication:
                 if reason:
                     code, message = reason
                     message = (
-                        f'Check {check.__class__.__name__}.preboot() failed: '
-                        f'{message}'
+                        f'Check {check_name}.preboot() failed: {message}'
                     )
                 else:
                     message = reason
@@ -61,25 +321,833 @@ class ProcfileApplication:
 
                 utils.log(code, message)
 
-        if at_least_one_check_has_failed:
+        return not at_least_one_check_has_failed
+
+    def run_preboot_checks(self):
+        utils.log('PE01', 'Running preboot checks for your application')
+        results = self.loop.run_until_complete(self.gather_preboot_results())
+
+        if not self.report_preboot_results(results):
             utils.log(
                 'PE11', 'Exiting because at least one preboot check failed',
             )
             sys.exit(1)
 
+    def get_dependencies(self):
+        return dependencies.get_dependencies(self.getenv, self.wait_endpoints)
+
+    async def wait_for_dependency(self, dependency):
+        with tracing.tracer.span(
+            'wait', self.qualify(dependency.address),
+        ) as attributes:
+            waited = await dependency.wait()
+            attributes['attempts'] = dependency.attempts
+
+        utils.log(
+            'PE18',
+            f'Waited for {dependency} for {waited:.3f} seconds '
+            f'({dependency.attempts} attempts)',
+        )
+
+    async def gather_dependency_results(self):
+        """
+        Wait for all dependencies of the application concurrently, within the
+        wait timeout of the application, and log the ones that did not answer.
+        Return whether all of them answered.
+        """
+        logs.current_app.set(self.name)
+        _dependencies = self.get_dependencies()
+
+        if not _dependencies:
+            return True
+
+        utils.log(
+            'PE02',
+            'Waiting for the dependencies of your application: ' +
+            ', '.join(str(dependency) for dependency in _dependencies),
+        )
+        tasks = [
+            self.loop.create_task(self.wait_for_dependency(dependency))
+            for dependency in _dependencies
+        ]
+        with tracing.tracer.span('wait for dependencies', self.trace_track):
+            _, pending = await asyncio.wait(tasks, timeout=self.wait_timeout)
+
+        for dependency, task in zip(_dependencies, tasks):
+            if task in pending:
+                task.cancel()
+                utils.log(
+                    'PE46',
+                    f'Gave up waiting for {dependency} after '
+                    f'{self.wait_timeout} seconds: {dependency.error}',
+                )
+
+        return not pending
+
+    def wait_for_dependencies(self):
+        """
+        Wait for the dependencies of the application (e.g. its database) to
+        answer, so that its processes do not crash while they start up, and
+        exit if any of them does not answer within the wait timeout.
+        """
+        if not self.wait_dependencies:
+            return
+
+        if not self.loop.run_until_complete(
+            self.gather_dependency_results(),
+        ):
+            utils.log(
+                'PE47',
+                'Exiting because at least one dependency did not answer',
+            )
+            sys.exit(1)
+
     def setup_main_checks(self):
-        for check in self.main_checks:
-            self.loop.create_task(check.main_loop())
+        self.scheduler = CheckScheduler(self.main_checks, loop=self.loop)
+        self.loop.create_task(self.scheduler.run())
+
+    def get_environment(self):
+        """
+        Return the environment of the application's processes; the
+        environment of Procenv, overridden by the variables of the `.env` file
+        next to the Procfile (if any), so that each application of a group
+        gets its own (e.g. `PORT`).
+        """
+        env = dict(os.environ)
+        env_file = os.path.join(os.path.dirname(self.procfile), '.env')
+        env.update(utils.read_env_file(env_file))
+        return env
+
+    def getenv(self, key, default=None):
+        """
+        Return the given variable of the environment of the application's
+        processes.
+        """
+        if self.environment is None:
+            self.environment = self.get_environment()
+
+        return self.environment.get(key, default)
+
+    def get_instances(self, env):
+        """
+        Return a `(process_type, name, command, port)` tuple for every
+        instance of every process type, according to the concurrency of the
+        application (one instance per process type by default). As Honcho and
+        Foreman do, each process type gets its own range of ports, starting
+        from the `PORT` of the given environment and incrementing by 100, with
+        each instance of it getting the next port of its range.
+        """
+        base_port = int(env.get('PORT') or self.default_port)
+        instances = []
+
+        for index, (process_type, command) in enumerate(
+            self.process_types.items(),
+        ):
+            for number in range(self.concurrency.get(process_type, 1)):
+                name = f'{process_type}.{number + 1}'
+                port = base_port + index * 100 + number
+                instances.append((process_type, name, command, port))
+
+        return instances
+
+    @property
+    def web_process_type(self):
+        """
+        The process type expected to bind to its ports; `web` if the Procfile
+        declares it, as on Heroku, or else the first process type.
+        """
+        process_types = self.process_types
+
+        if 'web' in process_types:
+            return 'web'
+
+        return next(iter(process_types), None)
+
+    def get_web_ports(self):
+        """
+        Return the names of the instances of the web process type, by the port
+        each one of them is expected to bind to.
+        """
+        web_process_type = self.web_process_type
+        return collections.OrderedDict(
+            (port, name)
+            for process_type, name, _, port in self.get_instances(
+                self.get_environment(),
+            )
+            if process_type == web_process_type
+        )
+
+    def build_processes(self):
+        """
+        Create a `ProcfileProcess` for each instance of each process type of
+        the Procfile, with its own `PORT`.
+        """
+        env = self.get_environment()
+        processes = []
+
+        for _, name, command, port in self.get_instances(env):
+            process_env = dict(env, PORT=str(port), PS=name)
+            listen_socket = self.listen_sockets.get(port)
+
+            if listen_socket is not None:
+                process_env.update(activation.get_activation_env([name]))
+
+            processes.append(
+                ProcfileProcess(
+                    name=name,
+                    command=command,
+                    env=process_env,
+                    cwd=self.cwd,
+                    listen_socket=listen_socket,
+                ),
+            )
+
+        return processes
+
+    def create_listen_sockets(self):
+        """
+        Listen to the port of each instance of the web process type on behalf
+        of the application, so that connections queue up in the backlog of
+        the socket while the application boots, instead of being refused.
+        Ports that cannot be listened to are left for the application to
+        bind to.
+        """
+        for port, name in self.get_web_ports().items():
+            try:
+                self.listen_sockets[port] = activation.create_listening_socket(
+                    port,
+                )
+            except OSError as err:
+                utils.log(
+                    'PE42',
+                    f'Cannot listen to port "{port}" for {name}: '
+                    f'{err.strerror}. {name} has to bind to it on its own',
+                )
+                continue
+
+            utils.log('PE14', f'Listening to port "{port}" for {name}')
+
+    def close_listen_sockets(self):
+        for listen_socket in self.listen_sockets.values():
+            listen_socket.close()
+
+        self.listen_sockets = {}
+
+    @property
+    def output_name_width(self):
+        return max(
+            [len('system')] +
+            [len(self.output.get_display_name(p.name)) for p in self.processes]
+        )
+
+    def write_output(self, name, line):
+        """
+        Write a line of output of the given process to stdout, prefixed by the
+        time and the name of the process.
+        """
+        self.output.write_line(name, line)
+
+    async def pipe_output(self, process):
+        await self.output.pipe(process.name, process.process.stdout)
+
+    def trace_output(self, name, lines):
+        """
+        Record the time from spawning each process until its first output,
+        as a subscriber of the output of the application.
+        """
+        spawned_at = self.spawned_at.pop(name, None)
+
+        if spawned_at is not None:
+            tracing.tracer.add_span(
+                'first output', self.qualify(name), spawned_at,
+            )
+
+    async def watch_process(self, process):
+        started_at = self.spawned_at[process.name] = time.monotonic()
+
+        try:
+            await asyncio.gather(
+                self.pipe_output(process), process.process.wait(),
+            )
+        finally:
+            self.spawned_at.pop(process.name, None)
+            tracing.tracer.add_span(
+                'running', self.qualify(process.name), started_at,
+                pid=process.pid, returncode=process.returncode,
+            )
+
+        self.write_output(
+            'system', f'{process.name} stopped (rc={process.returncode})',
+        )
+        return process.returncode
+
+    def process_exited(self, process, watcher):
+        """
+        Called when a process exits. The first process to exit, apart from
+        the ones replaced on reloading the Procfile, makes the application
+        exit.
+        """
+        if process in self.replaced_processes:
+            self.replaced_processes.discard(process)
+            return
+
+        if watcher.cancelled() or self.exited.done():
+            return
+
+        if watcher.exception() is not None:
+            self.exited.set_exception(watcher.exception())
+        else:
+            self.exited.set_result(watcher.result())
+
+    async def start_process(self, process):
+        with tracing.tracer.span(
+            'spawn', self.qualify(process.name), command=process.command,
+        ):
+            await process.start()
+
+        self.write_output(
+            'system', f'{process.name} started (pid={process.pid})',
+        )
+        watcher = self.loop.create_task(self.watch_process(process))
+        watcher.add_done_callback(
+            lambda watcher: self.process_exited(process, watcher),
+        )
+        self.watchers[process] = watcher
+
+    async def stop_processes(self, processes):
+        """
+        Terminate the given processes and wait for them to exit, killing the
+        ones that do not exit within `kill_timeout` seconds.
+        """
+        for process in processes:
+            if process.returncode is None:
+                self.write_output(
+                    'system', f'sending SIGTERM to {process.name}',
+                )
+            process.terminate()
+
+        watchers = [
+            self.watchers.pop(process) for process in processes
+            if process in self.watchers
+        ]
+
+        if not watchers:
+            return
+
+        _, pending = await asyncio.wait(watchers, timeout=self.kill_timeout)
+
+        if pending:
+            for process in processes:
+                if process.returncode is None:
+                    self.write_output(
+                        'system', f'sending SIGKILL to {process.name}',
+                    )
+                process.kill()
+
+            await asyncio.gather(*watchers)
+
+    async def reload(self):
+        """
+        Apply the changes of the Procfile to the running processes. The
+        instances of the process types whose command (or environment, e.g.
+        `PORT`) changed get restarted, the ones of removed process types get
+        stopped and the ones of new process types get started, while the
+        rest of them keep running.
+        """
+        async with self.reload_lock:
+            if self.exited is None or self.exited.done():
+                return
+
+            try:
+                processes = self.build_processes()
+            except OSError as err:
+                utils.log(
+                    'PE43',
+                    f'Cannot reload the Procfile "{self.procfile}": '
+                    f'{err.strerror}',
+                )
+                return
+
+            running = {process.name: process for process in self.processes}
+            changed = [
+                process for process in processes
+                if process.name not in running or (
+                    (process.command, process.env) != (
+                        running[process.name].command,
+                        running[process.name].env,
+                    )
+                )
+            ]
+            changed_names = {process.name for process in changed}
+            names = {process.name for process in processes}
+            stale = [
+                process for process in self.processes
+                if process.name not in names or process.name in changed_names
+            ]
+
+            if not changed and not stale:
+                return
+
+            changes = collections.OrderedDict([
+                ('restarting', [p for p in changed if p.name in running]),
+                ('starting', [p for p in changed if p.name not in running]),
+                ('stopping', [p for p in stale if p.name not in names]),
+            ])
+            utils.log(
+                'PE16',
+                f'Procfile "{self.procfile}" changed; ' + '; '.join(
+                    action + ' ' + ', '.join(sorted({
+                        instance.process_type for instance in instances
+                    }))
+                    for action, instances in changes.items() if instances
+                ),
+            )
+            await self.replace_processes(stale, [
+                process if process.name in changed_names
+                else running[process.name]
+                for process in processes
+            ])
+
+    async def replace_processes(self, stale, processes):
+        """
+        Stop the given stale processes and run the given processes instead of
+        the current ones, starting the ones that are not running yet. New
+        processes replacing a stale one with the same name count as its
+        restarts.
+        """
+        stale_names = {process.name for process in stale}
+        started = [
+            process for process in processes if process not in self.processes
+        ]
+        self.replaced_processes.update(stale)
+        await self.stop_processes(stale)
+        self.processes = processes
+        self.output.name_width = self.output_name_width
+
+        for process in started:
+            metrics.process_restarts.inc(
+                self.qualify(process.name),
+                amount=1 if process.name in stale_names else 0,
+            )
+            await self.start_process(process)
+
+    def schedule_reload(self):
+        """
+        Reload the Procfile in `reload_delay` seconds, so that the events of
+        a single save (e.g. truncating and writing the file) get coalesced
+        into a single reload.
+        """
+        if self.reload_handle is not None:
+            self.reload_handle.cancel()
+
+        self.reload_handle = self.loop.call_later(
+            self.reload_delay,
+            lambda: self.loop.create_task(self.reload()),
+        )
+
+    def procfile_changed(self):
+        name = os.path.basename(self.procfile)
+
+        for event in self.procfile_watcher.read_events():
+            if event.name == name or event.mask & inotify.IN_Q_OVERFLOW:
+                self.schedule_reload()
+
+    def watch_procfile(self):
+        """
+        Watch the directory of the Procfile with inotify, so that the
+        Procfile gets reloaded whenever it gets written or replaced (e.g. by
+        an editor renaming a new file over it).
+        """
+        directory = os.path.dirname(os.path.abspath(self.procfile))
+
+        try:
+            self.procfile_watcher = inotify.Inotify()
+            self.procfile_watcher.add_watch(
+                directory, inotify.IN_CLOSE_WRITE | inotify.IN_MOVED_TO,
+            )
+        except OSError as err:
+            utils.log(
+                'PE44',
+                f'Cannot watch the Procfile "{self.procfile}" for changes: '
+                f'{err.strerror}',
+            )
+            self.unwatch_procfile()
+            return
+
+        self.loop.add_reader(
+            self.procfile_watcher.fileno(), self.procfile_changed,
+        )
+
+    def unwatch_procfile(self):
+        if self.reload_handle is not None:
+            self.reload_handle.cancel()
+            self.reload_handle = None
+
+        if self.procfile_watcher is None:
+            return
+
+        if self.procfile_watcher.fileno() is not None:
+            self.loop.remove_reader(self.procfile_watcher.fileno())
+
+        self.procfile_watcher.close()
+        self.procfile_watcher = None
+
+    def get_affected_process_types(self, paths):
+        """
+        Return the watched process types that should be restarted because of
+        the given changed paths (relative to the directory of the
+        application); the ones without patterns, or with a pattern matching
+        any of the paths. All of them are affected when the changed paths are
+        unknown (`None`).
+        """
+        return [
+            process_type
+            for process_type, patterns in self.watch_process_types.items()
+            if paths is None or not patterns or any(
+                fnmatch.fnmatch(path, pattern)
+                for path in paths
+                for pattern in patterns
+            )
+        ]
+
+    def files_changed(self, paths):
+        process_types = self.get_affected_process_types(paths)
+
+        if process_types:
+            self.loop.create_task(
+                self.restart_process_types(process_types, paths),
+            )
+
+    async def restart_process_types(self, process_types, paths=None):
+        """
+        Restart the instances of the given process types, as they are, while
+        the rest of the processes keep running.
+        """
+        async with self.reload_lock:
+            if self.exited is None or self.exited.done():
+                return
+
+            stale = [
+                process for process in self.processes
+                if process.process_type in process_types
+            ]
+
+            if not stale:
+                return
+
+            if paths:
+                changed = ', '.join(sorted(paths)[:3])
+
+                if len(paths) > 3:
+                    changed += f' and {len(paths) - 3} more'
+            else:
+                changed = 'Files'
+
+            utils.log(
+                'PE17',
+                f'{changed} changed; restarting '
+                f'{", ".join(sorted({p.process_type for p in stale}))}',
+            )
+            await self.replace_processes(stale, [
+                ProcfileProcess(
+                    name=process.name,
+                    command=process.command,
+                    env=process.env,
+                    cwd=process.cwd,
+                    listen_socket=process.listen_socket,
+                ) if process in stale else process
+                for process in self.processes
+            ])
+
+    def watch_files(self):
+        """
+        Watch the files of the directory of the application with inotify, so
+        that the watched process types get restarted when files matching
+        their patterns change.
+        """
+        self.tree_watcher = inotify.TreeWatcher(
+            os.path.dirname(os.path.abspath(self.procfile)),
+            self.files_changed,
+            ignore=self.watch_ignore,
+            debounce=self.watch_debounce,
+            loop=self.loop,
+        )
+
+        try:
+            self.tree_watcher.start()
+        except OSError as err:
+            self.tree_watcher = None
+            utils.log(
+                'PE45',
+                'Cannot watch the files of the application for changes: '
+                f'{err.strerror}',
+            )
+            return
+
+        if self.tree_watcher.error is not None:
+            utils.log(
+                'PE45',
+                'Cannot watch all files of the application for changes: '
+                f'{self.tree_watcher.error.strerror} (watching '
+                f'{len(self.tree_watcher.directories)} directories)',
+            )
+
+    def unwatch_files(self):
+        if self.tree_watcher is not None:
+            self.tree_watcher.stop()
+            self.tree_watcher = None
+
+    def terminate(self):
+        for process in self.processes:
+            if process.returncode is None:
+                self.write_output(
+                    'system', f'sending SIGTERM to {process.name}',
+                )
+            process.terminate()
+
+    def kill(self):
+        for process in self.processes:
+            if process.returncode is None:
+                self.write_output(
+                    'system', f'sending SIGKILL to {process.name}',
+                )
+            process.kill()
 
     async def run_application(self):
+        """
+        Spawn every process of the Procfile and multiplex their output. When
+        the first process exits, terminate the rest of them and return its
+        exit code, as Honcho and Foreman do.
+        """
+        logs.current_app.set(self.name)
         utils.log(
             'PE10',
             f'Running application with Procfile "{self.procfile}"',
         )
-        process = await asyncio.create_subprocess_exec(
-            *self.cmd, stdout=sys.stdout, stderr=sys.stderr, loop=self.loop,
+        if self.socket_activation:
+            self.create_listen_sockets()
+
+        self.processes = self.build_processes()
+
+        if not self.processes:
+            return 0
+
+        self.output.name_width = self.output_name_width
+        self.started_at = time.monotonic()
+        metrics.application_uptime.set_function(
+            lambda: time.monotonic() - self.started_at, self.name,
         )
-        await process.wait()
+
+        self.exited = self.loop.create_future()
+
+        if tracing.tracer.enabled:
+            self.output.subscribe(self.trace_output)
+
+        for process in self.processes:
+            # Expose the restarts of every process, even before any of them.
+            metrics.process_restarts.inc(
+                self.qualify(process.name), amount=0,
+            )
+            await self.start_process(process)
+
+        if self.handle_signals:
+            self.add_signal_handlers()
+
+        if self.reload_procfile:
+            self.watch_procfile()
+
+        if self.watch_process_types:
+            self.watch_files()
+
+        try:
+            returncode = await self.exited
+            self.unwatch_procfile()
+            self.unwatch_files()
+
+            # Let a reload in progress complete first, so that the processes
+            # it starts get terminated as well.
+            async with self.reload_lock:
+                watchers = list(self.watchers.values())
+                self.terminate()
+                _, pending = await asyncio.wait(
+                    watchers, timeout=self.kill_timeout,
+                )
+
+                if pending:
+                    self.kill()
+                    await asyncio.gather(*watchers)
+        finally:
+            if self.handle_signals:
+                self.remove_signal_handlers()
+
+            self.unwatch_procfile()
+            self.unwatch_files()
+            self.close_listen_sockets()
+            await self.output.writer.flush()
+            tracing.tracer.add_span('run', self.trace_track, self.started_at)
+
+        return returncode
 
     def run_and_wait_for_application(self):
-        self.loop.run_until_complete(self.run_application())
+        return self.loop.run_until_complete(self.run_application())
+
+
+class ProcfileApplicationGroup(StopSignalsMixin):
+    """
+    The `ProcfileApplicationGroup` class runs many Procfile-based
+    applications from a single Procenv process. Every application keeps its
+    own environment, checks and output, while all of them share the event
+    loop and the scheduler of the `main` checks.
+
+    An application failing its preboot checks does not run, and an
+    application exiting stops just its own processes, so the group keeps
+    running until all of its applications exit.
+    """
+
+    def __init__(self, applications, loop=None):
+        self.applications = applications
+        self.loop = loop or asyncio.get_event_loop()
+        self.scheduler = None
+
+        for application in self.applications:
+            # Signals are handled once, for all applications.
+            application.handle_signals = False
+
+    async def gather_preboot_results(self):
+        return await asyncio.gather(*[
+            application.gather_preboot_results()
+            for application in self.applications
+        ])
+
+    def run_preboot_checks(self):
+        """
+        Run the preboot checks of all applications concurrently and keep
+        only the applications that passed them. Exit if none of them did.
+        """
+        utils.log('PE01', 'Running preboot checks for your applications')
+        results = self.loop.run_until_complete(self.gather_preboot_results())
+        passed = []
+
+        for application, application_results in zip(
+            self.applications, results,
+        ):
+            token = logs.current_app.set(application.name)
+
+            try:
+                if application.report_preboot_results(application_results):
+                    passed.append(application)
+                else:
+                    utils.log(
+                        'PE15',
+                        'Not running the application, because at least one '
+                        'preboot check failed',
+                    )
+            finally:
+                logs.current_app.reset(token)
+
+        if not passed:
+            utils.log(
+                'PE11', 'Exiting because at least one preboot check failed',
+            )
+            sys.exit(1)
+
+        self.applications = passed
+
+    async def gather_dependency_results(self):
+        async def gather(application):
+            if not application.wait_dependencies:
+                return True
+
+            return await application.gather_dependency_results()
+
+        return await asyncio.gather(*[
+            gather(application) for application in self.applications
+        ])
+
+    def wait_for_dependencies(self):
+        """
+        Wait for the dependencies of all applications concurrently and keep
+        only the applications whose dependencies answered. Exit if none of
+        them did.
+        """
+        results = self.loop.run_until_complete(
+            self.gather_dependency_results(),
+        )
+        passed = []
+
+        for application, answered in zip(self.applications, results):
+            if answered:
+                passed.append(application)
+                continue
+
+            token = logs.current_app.set(application.name)
+
+            try:
+                utils.log(
+                    'PE47',
+                    'Not running the application, because at least one '
+                    'dependency did not answer',
+                )
+            finally:
+                logs.current_app.reset(token)
+
+        if not passed:
+            utils.log(
+                'PE47',
+                'Exiting because at least one dependency did not answer',
+            )
+            sys.exit(1)
+
+        self.applications = passed
+
+    def setup_main_checks(self):
+        self.scheduler = CheckScheduler(
+            [
+                check
+                for application in self.applications
+                for check in application.main_checks
+            ],
+            loop=self.loop,
+        )
+
+        for application in self.applications:
+            application.scheduler = self.scheduler
+
+        self.loop.create_task(self.scheduler.run())
+
+    def terminate(self):
+        for application in self.applications:
+            application.terminate()
+
+    async def run_application(self, application):
+        """
+        Run the given application and stop its main checks once it exits,
+        while the checks of the rest of the applications keep running.
+        """
+        try:
+            return await application.run_application()
+        finally:
+            if self.scheduler is not None:
+                self.scheduler.remove(application.main_checks)
+
+    async def run_applications(self):
+        """
+        Run all applications until each one of them exits and return the
+        first non-zero exit code among them (if any).
+        """
+        self.add_signal_handlers()
+
+        try:
+            returncodes = await asyncio.gather(*[
+                self.run_application(application)
+                for application in self.applications
+            ])
+        finally:
+            self.remove_signal_handlers()
+
+        return next(
+            (returncode for returncode in returncodes if returncode), 0,
+        )
+
+    def run_and_wait_for_applications(self):
+        return self.loop.run_until_complete(self.run_applications())
@@ -1,10 +1,20 @@
 from unittest import mock
 import asyncio
+import os
+import signal
 import sys
+import tempfile
 import unittest
 
+from . import activation
 from . import applications
 from . import checks
+from . import dependencies
+from . import logs
+from . import tracing
+
+
+PROCFILE_ECHO = 'procenv/fixtures/procfile_echo/Procfile'
 
 
 class DummyPrebootCheck(checks.BaseCheck):
@@ -25,6 +35,58 @@ class DummyPrebootAndMainCheck(checks.BaseCheck):
         return True
 
 
+class FrozenLoop(asyncio.SelectorEventLoop):
+    """
+    An event loop whose clock does not advance, so that durations measured
+    with it are always zero.
+    """
+
+    def time(self):
+        return 0
+
+
+class ProcfileProcessTest(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.get_event_loop()
+
+    def test_cmd(self):
+        """
+        Ensure that the `cmd` property returns the command to spawn the
+        process with.
+        """
+        process = applications.ProcfileProcess('web.1', 'echo "$PORT"')
+        assert process.cmd == ['/bin/sh', '-c', 'echo "$PORT"']
+
+        # Socket-activated processes get `exec`-ed by a wrapper moving their
+        # socket to file descriptor 3 and exporting their PID.
+        listen_socket = mock.Mock(**{'fileno.return_value': 7})
+        process = applications.ProcfileProcess(
+            'web.1', 'echo "$PORT"', listen_socket=listen_socket,
+        )
+        assert process.cmd == [
+            sys.executable, '-I', '-S', '-c', activation.LISTEN_FDS_WRAPPER,
+            '7', 'exec echo "$PORT"',
+        ]
+
+    def test_start_and_terminate(self):
+        """
+        Ensure that a started process can be terminated, along with its
+        children.
+        """
+        process = applications.ProcfileProcess('web.1', 'sleep 30 && true')
+        assert process.pid is None
+        assert process.returncode is None
+
+        # Sending signals to processes that have not started yet is a no-op
+        process.terminate()
+
+        self.loop.run_until_complete(process.start())
+        assert process.pid == process.process.pid
+        process.terminate()
+        self.loop.run_until_complete(process.process.wait())
+        assert process.returncode == -signal.SIGTERM
+
+
 class ProcfileApplicationTest(unittest.TestCase):
     def setUp(self):
         self.loop = asyncio.get_event_loop()
@@ -40,6 +102,10 @@ class ProcfileApplicationTest(unittest.TestCase):
         self.app = applications.ProcfileApplication(
             procfile=self.procfile, checks=self.all_checks, loop=self.loop,
         )
+        self.frozen_loop = FrozenLoop()
+
+    def tearDown(self):
+        self.frozen_loop.close()
 
     def test_init(self):
         """
@@ -70,12 +136,152 @@ class ProcfileApplicationTest(unittest.TestCase):
         assert app_with_loop.checks == self.all_checks
         assert app_with_loop.loop == loop
 
-    def test_cmd(self):
+    def test_init_attaches_checks(self):
+        """
+        Ensure that checks get attached to the application on creation.
+        """
+        check = DummyMainCheck()
+
+        with mock.patch.object(check, 'attach') as attach_mock:
+            app = applications.ProcfileApplication(
+                procfile=self.procfile, checks=[check], loop=self.loop,
+            )
+
+        attach_mock.assert_called_once_with(app)
+
+    def test_process_types(self):
+        """
+        Ensure that the `process_types` property returns the process types of
+        the application's Procfile.
+        """
+        app = applications.ProcfileApplication(
+            procfile=PROCFILE_ECHO, checks=[], loop=self.loop,
+        )
+        assert list(app.process_types) == ['hello', 'world']
+
+    def test_build_processes(self):
+        """
+        Ensure that `build_processes` creates a process for each process type
+        of the Procfile, with the appropriate environment.
+        """
+        app = applications.ProcfileApplication(
+            procfile=PROCFILE_ECHO, checks=[], loop=self.loop,
+        )
+
+        with mock.patch(
+            'procenv.utils.read_env_file', return_value={},
+        ), mock.patch.dict('os.environ', {'PORT': '8000'}):
+            hello, world = app.build_processes()
+
+        assert hello.name == 'hello.1'
+        assert hello.command == app.process_types['hello']
+        assert hello.env['PORT'] == '8000'
+        assert hello.env['PS'] == 'hello.1'
+        assert world.name == 'world.1'
+        assert world.env['PORT'] == '8100'
+
+        # Variables of the `.env` file should be available, overriding the
+        # ones of the environment, so that each application gets its own
+        # `PORT`.
+        with mock.patch.dict('os.environ', {'PORT': '8000'}):
+            hello, world = app.build_processes()
+
+        assert hello.env['GREETING'] == 'hello'
+        assert hello.env['PORT'] == '1234'
+        assert world.env['PORT'] == '1334'
+
+        # Without a `PORT` anywhere, ports start from 5000.
+        with mock.patch(
+            'procenv.utils.read_env_file', return_value={},
+        ), mock.patch.dict('os.environ', clear=True):
+            hello, world = app.build_processes()
+
+        assert hello.env['PORT'] == '5000'
+        assert world.env['PORT'] == '5100'
+
+    def test_build_processes_with_concurrency(self):
+        """
+        Ensure that `build_processes` creates the requested number of
+        instances for each process type, each one with the next port of the
+        range of its process type.
+        """
+        app = applications.ProcfileApplication(
+            procfile=PROCFILE_ECHO, checks=[], loop=self.loop,
+            concurrency={'hello': 3},
+        )
+
+        processes = app.build_processes()
+
+        # Ports start from the `PORT` of the `.env` file.
+        assert [
+            (process.name, process.env['PORT'], process.process_type)
+            for process in processes
+        ] == [
+            ('hello.1', '1234', 'hello'),
+            ('hello.2', '1235', 'hello'),
+            ('hello.3', '1236', 'hello'),
+            ('world.1', '1334', 'world'),
+        ]
+
+    def test_create_listen_sockets(self):
+        """
+        Ensure that Procenv listens to the port of each instance of the web
+        process type, passes the sockets to them and logs the ports that
+        cannot be listened to.
+        """
+        app = applications.ProcfileApplication(
+            procfile=PROCFILE_ECHO, checks=[], loop=self.loop,
+            concurrency={'hello': 2},
+        )
+        sock = mock.Mock()
+
+        with mock.patch(
+            'procenv.activation.create_listening_socket',
+            side_effect=[sock, OSError(98, 'Address already in use')],
+        ), mock.patch('procenv.utils.log') as log_mock:
+            app.create_listen_sockets()
+            hello_1, hello_2, world = app.build_processes()
+
+        assert app.listen_sockets == {1234: sock}
+        assert log_mock.call_args_list == [
+            mock.call('PE14', 'Listening to port "1234" for hello.1'),
+            mock.call(
+                'PE42',
+                'Cannot listen to port "1235" for hello.2: Address already '
+                'in use. hello.2 has to bind to it on its own',
+            ),
+        ]
+        assert hello_1.listen_socket is sock
+        assert hello_1.env['LISTEN_FDS'] == '1'
+        assert hello_1.env['LISTEN_FDNAMES'] == 'hello.1'
+        assert hello_2.listen_socket is None
+        assert 'LISTEN_FDS' not in hello_2.env
+
+        app.close_listen_sockets()
+        sock.close.assert_called_once_with()
+        assert app.listen_sockets == {}
+
+    def test_get_web_ports(self):
         """
-        Ensure that the `cmd` property returns the appropriate command to run
-        to execute the application subprocess.
+        Ensure that `get_web_ports` returns the port of each instance of the
+        `web` process type, or the first process type without one.
         """
-        assert self.app.cmd == ['honcho', '-f', self.procfile, 'start']
+        app = applications.ProcfileApplication(
+            procfile=PROCFILE_ECHO, checks=[], loop=self.loop,
+            concurrency={'hello': 2},
+        )
+
+        assert app.web_process_type == 'hello'
+        assert list(app.get_web_ports().items()) == [
+            (1234, 'hello.1'), (1235, 'hello.2'),
+        ]
+
+        with mock.patch(
+            'procenv.utils.parse_procfile',
+            return_value={'worker': 'work', 'web': 'serve'},
+        ):
+            assert app.web_process_type == 'web'
+            assert list(app.get_web_ports().items()) == [(1334, 'web.1')]
 
     def test_preboot_checks(self):
         """
@@ -103,14 +309,15 @@ class ProcfileApplicationTest(unittest.TestCase):
         messages and runs the expected checks and that the process is NOT
         exiting afterwards.
         """
-        succeeding_preboot_check_a = mock.MagicMock()
+        succeeding_preboot_check_a = mock.MagicMock(timeout=10)
         succeeding_preboot_check_a.preboot.return_value = True
-        succeeding_preboot_check_b = mock.MagicMock()
+        succeeding_preboot_check_b = mock.MagicMock(timeout=10)
         succeeding_preboot_check_b.preboot.return_value = True
 
         app = applications.ProcfileApplication(
             procfile=self.procfile,
             checks=[succeeding_preboot_check_a, succeeding_preboot_check_b],
+            loop=self.frozen_loop,
         )
 
         with mock.patch('sys.exit') as exit_mock:
@@ -122,6 +329,8 @@ class ProcfileApplicationTest(unittest.TestCase):
                 'PE01',
                 'Running preboot checks for your application',
             ),
+            mock.call('PE12', 'Check MagicMock.preboot() took 0.000 seconds'),
+            mock.call('PE12', 'Check MagicMock.preboot() took 0.000 seconds'),
         ]
 
         succeeding_preboot_check_a.preboot.assert_called_once()
@@ -134,9 +343,9 @@ class ProcfileApplicationTest(unittest.TestCase):
         Ensure that the `run_preboot_checks` method prints the appropriate
         messages and that it exits with the appropriate exit code.
         """
-        succeeding_preboot_check = mock.MagicMock()
+        succeeding_preboot_check = mock.MagicMock(timeout=10)
         succeeding_preboot_check.preboot.return_value = True
-        failing_preboot_check = mock.MagicMock()
+        failing_preboot_check = mock.MagicMock(timeout=10)
         failing_preboot_check.preboot.return_value = (
             False, ('FB40', 'This fails lol'),
         )
@@ -144,6 +353,7 @@ class ProcfileApplicationTest(unittest.TestCase):
         app = applications.ProcfileApplication(
             procfile=self.procfile,
             checks=[succeeding_preboot_check, failing_preboot_check],
+            loop=self.frozen_loop,
         )
 
         with mock.patch('sys.exit') as exit_mock:
@@ -155,6 +365,8 @@ class ProcfileApplicationTest(unittest.TestCase):
                 'PE01',
                 'Running preboot checks for your application',
             ),
+            mock.call('PE12', 'Check MagicMock.preboot() took 0.000 seconds'),
+            mock.call('PE12', 'Check MagicMock.preboot() took 0.000 seconds'),
             mock.call(
                 'FB40',
                 'Check MagicMock.preboot() failed: This fails lol',
@@ -170,62 +382,403 @@ class ProcfileApplicationTest(unittest.TestCase):
         exit_mock.assert_called_once_with(1)
         assert log_mock.call_args_list == expected_log_mock_call_args_list
 
+    def test_run_preboot_checks_concurrently(self):
+        """
+        Ensure that preboot checks run concurrently, so that the total time
+        of the preboot stage is bound by the slowest check, and that their
+        results get reported in the order of the checks.
+        """
+        class SlowCheck(checks.BaseCheck):
+            def __init__(self, delay, result):
+                self.delay = delay
+                self.result = result
+
+            async def preboot(self):
+                await asyncio.sleep(self.delay)
+                return self.result
+
+        app = applications.ProcfileApplication(
+            procfile=self.procfile,
+            checks=[
+                SlowCheck(0.2, (False, ('SL40', 'slow'))),
+                SlowCheck(0.1, (False, ('SL41', 'fast'))),
+                SlowCheck(0.2, True),
+            ],
+            loop=self.loop,
+        )
+
+        with mock.patch('sys.exit') as exit_mock:
+            with mock.patch('procenv.utils.log') as log_mock:
+                started_at = self.loop.time()
+                app.run_preboot_checks()
+                assert self.loop.time() - started_at < 0.4
+
+        codes = [call[0][0] for call in log_mock.call_args_list]
+        assert codes == [
+            'PE01', 'PE12', 'SL40', 'PE12', 'SL41', 'PE12', 'PE11',
+        ]
+        exit_mock.assert_called_once_with(1)
+
+    def test_run_preboot_checks_timeouts(self):
+        """
+        Ensure that preboot checks that exceed their own timeout, or the
+        preboot deadline of the application, fail with the appropriate
+        messages.
+        """
+        class HangingCheck(checks.BaseCheck):
+            timeout = 0.05
+
+            async def preboot(self):
+                await asyncio.sleep(5)
+
+        class SlowCheck(checks.BaseCheck):
+            async def preboot(self):
+                await asyncio.sleep(5)
+
+        app = applications.ProcfileApplication(
+            procfile=self.procfile,
+            checks=[HangingCheck(), SlowCheck()],
+            loop=self.loop,
+        )
+        app.preboot_deadline = 0.1
+
+        with mock.patch('sys.exit') as exit_mock:
+            with mock.patch('procenv.utils.log') as log_mock:
+                app.run_preboot_checks()
+
+        logs = [
+            call for call in log_mock.call_args_list if call[0][0] != 'PE12'
+        ]
+        assert logs == [
+            mock.call('PE01', 'Running preboot checks for your application'),
+            mock.call(
+                'PE50',
+                'Check HangingCheck.preboot() failed: timed out after 0.05 '
+                'seconds',
+            ),
+            mock.call(
+                'PE52',
+                'Check SlowCheck.preboot() failed: did not complete within '
+                'the preboot deadline of 0.1 seconds',
+            ),
+            mock.call(
+                'PE11', 'Exiting because at least one preboot check failed',
+            ),
+        ]
+        exit_mock.assert_called_once_with(1)
+
+    def test_wait_for_dependencies(self):
+        """
+        Ensure that the dependencies of the application are waited for
+        concurrently, that the wait time of each one is logged as it answers
+        and that Procenv exits if any of them does not answer within the wait
+        timeout.
+        """
+        app = applications.ProcfileApplication(
+            procfile=self.procfile, checks=[], loop=self.loop,
+        )
+        database = dependencies.Dependency('db', 5432, None, 'the database')
+        database.attempts = 3
+        database.wait = mock.AsyncMock(return_value=1.5)
+        search = dependencies.Dependency('search', 9200)
+        search.attempts = 7
+        search.error = 'Connection refused'
+
+        async def wait_forever():
+            await asyncio.Event().wait()
+
+        search.wait = wait_forever
+
+        # Nothing gets waited for by default.
+        with mock.patch.object(app, 'get_dependencies') as get_mock:
+            app.wait_for_dependencies()
+
+        assert get_mock.called is False
+
+        app.wait_dependencies = True
+        app.wait_timeout = 0.05
+
+        with mock.patch.object(
+            app, 'get_dependencies', return_value=[database, search],
+        ):
+            with mock.patch('sys.exit') as exit_mock:
+                with mock.patch('procenv.utils.log') as log_mock:
+                    app.wait_for_dependencies()
+
+        exit_mock.assert_called_once_with(1)
+        assert log_mock.call_args_list == [
+            mock.call(
+                'PE02',
+                'Waiting for the dependencies of your application: the '
+                'database at "db:5432", "search:9200"',
+            ),
+            mock.call(
+                'PE18',
+                'Waited for the database at "db:5432" for 1.500 seconds (3 '
+                'attempts)',
+            ),
+            mock.call(
+                'PE46',
+                'Gave up waiting for "search:9200" after 0.05 seconds: '
+                'Connection refused',
+            ),
+            mock.call(
+                'PE47',
+                'Exiting because at least one dependency did not answer',
+            ),
+        ]
+
     def test_setup_main_checks(self):
         """
-        Ensure that the `setup_main_checks` method adds the `main_loop` tasks
-        to the event loop of the application.
+        Ensure that the `setup_main_checks` method adds a task running the
+        main checks through a scheduler to the event loop of the application.
         """
         some_check = mock.MagicMock()
         self.app.loop = mock.MagicMock()
         self.app.checks = [some_check]
 
-        self.app.setup_main_checks()
+        with mock.patch(
+            'procenv.applications.CheckScheduler',
+        ) as check_scheduler_mock:
+            self.app.setup_main_checks()
 
+        check_scheduler_mock.assert_called_once_with(
+            [some_check], loop=self.app.loop,
+        )
+        assert self.app.scheduler == check_scheduler_mock.return_value
         self.app.loop.create_task.assert_called_once_with(
-            some_check.main_loop.return_value,
+            check_scheduler_mock.return_value.run.return_value,
         )
 
     def test_run_application(self):
         """
-        Ensure that the `run_application` coroutine method creates the
-        appropriate subprocess and awaits for it.
+        Ensure that the `run_application` coroutine method spawns every
+        process of the Procfile, multiplexes their output and terminates the
+        rest of the processes when the first one exits.
+        """
+        app = applications.ProcfileApplication(
+            procfile=PROCFILE_ECHO, checks=[], loop=self.loop,
+        )
+
+        with mock.patch('sys.stdout') as stdout_mock:
+            with mock.patch('procenv.utils.log') as log_mock:
+                with mock.patch.dict('os.environ', {'PORT': '8000'}):
+                    returncode = self.loop.run_until_complete(
+                        app.run_application(),
+                    )
+
+        log_mock.assert_called_once_with(
+            'PE10', f'Running application with Procfile "{PROCFILE_ECHO}"',
+        )
+        output = b''.join(
+            call[0][0] for call in stdout_mock.buffer.write.call_args_list
+        ).decode()
+
+        assert returncode == 3
+        assert 'hello.1 | hello from hello.1 on port 1234 and hello' in output
+        assert 'world.1 | world\n' in output
+        assert 'world.1 stopped (rc=3)' in output
+        assert 'sending SIGTERM to hello.1' in output
+        assert f'hello.1 started (pid={app.processes[0].pid})' in output
+        assert app.processes[0].returncode == -signal.SIGTERM
+
+    def test_run_application_traced(self):
+        """
+        Ensure that spawning each process, its first output and its lifetime
+        get recorded as spans of its track, while tracing is enabled.
         """
-        # The `sync_mock_process_wait` will help us capture the
-        # call to the `wait` coroutine method, of the process returned by
-        # `asyncio.create_subprocess_exec`, after we wrap it in a coroutine
-        # function.
-        sync_mock_process_wait = mock.MagicMock()
+        app = applications.ProcfileApplication(
+            procfile=PROCFILE_ECHO, checks=[], loop=self.loop,
+        )
+        tracer = tracing.Tracer()
+        tracer.enabled = True
+
+        with mock.patch('procenv.tracing.tracer', tracer):
+            with mock.patch('sys.stdout'):
+                with mock.patch('procenv.utils.log'):
+                    self.loop.run_until_complete(app.run_application())
+
+        spans = {(span.track, span.name): span for span in tracer.spans}
+
+        assert set(spans) == {
+            ('hello.1', 'spawn'),
+            ('hello.1', 'first output'),
+            ('hello.1', 'running'),
+            ('world.1', 'spawn'),
+            ('world.1', 'first output'),
+            ('world.1', 'running'),
+            ('application', 'run'),
+        }
+        assert spans['world.1', 'running'].attributes == {
+            'pid': app.processes[1].pid, 'returncode': 3,
+        }
+
+        for name in ('hello.1', 'world.1'):
+            assert (
+                spans[name, 'spawn'].end <= spans[name, 'running'].start ==
+                spans[name, 'first output'].start
+            )
 
-        async def mock_process_wait(*args, **kwargs):
-            # Proxy the call to `sync_mock_process_wait`, to capture it.
-            sync_mock_process_wait(*args, **kwargs)
-            return True
+    def write_procfile(self, path, content):
+        # Replace the Procfile, as editors do.
+        with open(path + '.new', 'w') as procfile:
+            procfile.write(content)
 
-        mock_process = mock.MagicMock()
-        mock_process.wait = mock_process_wait
+        os.rename(path + '.new', path)
 
-        # The `sync_mock_create_subprocess_exec` will help us capture the
-        # call to `create_subprocess_exec`, after we wrap it in a coroutine
-        # function.
-        sync_mock_create_subprocess_exec = mock.MagicMock()
+    def test_reload(self):
+        """
+        Ensure that reloading the Procfile restarts only the process types
+        whose command changed, stops removed process types and starts new
+        ones, without making the application exit.
+        """
+        with tempfile.TemporaryDirectory() as temp_dir:
+            procfile = os.path.join(temp_dir, 'Procfile')
+            self.write_procfile(
+                procfile, 'web: sleep 30\nworker: sleep 30\nold: sleep 30\n',
+            )
+            app = applications.ProcfileApplication(
+                procfile=procfile, checks=[], loop=self.loop, name='reload',
+            )
 
-        async def mock_create_subprocess_exec(*args, **kwargs):
-            # Proxy the call to `sync_mock_create_subprocess_exec`, to capture
-            # it.
-            sync_mock_create_subprocess_exec(*args, **kwargs)
-            return mock_process
+            async def reload():
+                while len(app.watchers) < 3:
+                    await asyncio.sleep(0.01)
+
+                web, worker, old = app.processes
+                self.write_procfile(
+                    procfile,
+                    'web: sleep 30\nworker: sleep 31\nold2: sleep 30\n',
+                )
+                await app.reload()
+                assert [process.name for process in app.processes] == [
+                    'web.1', 'worker.1', 'old2.1',
+                ]
+                assert app.processes[0] is web
+                assert web.returncode is None
+                assert worker.returncode == -signal.SIGTERM
+                assert old.returncode == -signal.SIGTERM
+                assert app.processes[1].command == 'sleep 31'
+                assert app.exited.done() is False
+
+                # Reloading an unchanged Procfile does nothing.
+                await app.reload()
+                app.terminate()
+
+            with mock.patch('sys.stdout'):
+                with mock.patch('procenv.utils.log') as log_mock:
+                    returncode, _ = self.loop.run_until_complete(
+                        asyncio.gather(app.run_application(), reload()),
+                    )
+
+        assert returncode == -signal.SIGTERM
+        assert mock.call(
+            'PE16',
+            f'Procfile "{procfile}" changed; restarting worker; starting '
+            'old2; stopping old',
+        ) in log_mock.call_args_list
+        assert [
+            call for call in log_mock.call_args_list if call[0][0] == 'PE16'
+        ] == [log_mock.call_args_list[1]]
+        restarts = applications.metrics.process_restarts.series
+        assert restarts[('reload/worker.1',)] == 1
+        assert restarts[('reload/web.1',)] == 0
+        assert restarts[('reload/old2.1',)] == 0
+
+    def test_watch_procfile(self):
+        """
+        Ensure that the Procfile gets reloaded once after it gets written or
+        replaced, but not when other files change.
+        """
+        try:
+            applications.inotify.Inotify().close()
+        except OSError:
+            self.skipTest('inotify is not available')
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            procfile = os.path.join(temp_dir, 'Procfile')
+            self.write_procfile(procfile, 'web: sleep 30\n')
+            app = applications.ProcfileApplication(
+                procfile=procfile, checks=[], loop=self.loop,
+            )
+            app.reload_delay = 0.01
 
-        with mock.patch(
-            'asyncio.create_subprocess_exec', new=mock_create_subprocess_exec,
-        ):
-            run_application_coroutine = self.app.run_application()
-            self.loop.run_until_complete(run_application_coroutine)
+            async def watch():
+                app.watch_procfile()
 
-        sync_mock_create_subprocess_exec.assert_called_once_with(
-            *self.app.cmd,
-            stdout=sys.stdout, stderr=sys.stderr, loop=self.app.loop,
+                with open(procfile, 'a') as f:
+                    f.write('worker: sleep 30\n')
+
+                with open(os.path.join(temp_dir, '.env'), 'w') as f:
+                    f.write('PORT=1234\n')
+
+                self.write_procfile(procfile, 'web: sleep 31\n')
+                await asyncio.sleep(0.1)
+                app.unwatch_procfile()
+
+            with mock.patch.object(
+                app, 'reload', new_callable=mock.AsyncMock,
+            ) as reload_mock:
+                self.loop.run_until_complete(watch())
+
+        reload_mock.assert_awaited_once_with()
+
+    def test_get_affected_process_types(self):
+        """
+        Ensure that changed files affect the process types watching every
+        file and the ones with a pattern matching any of them.
+        """
+        self.app.watch_process_types = {
+            'web': [], 'worker': ['tasks/*.py'], 'clock': ['clock.py'],
+        }
+
+        assert self.app.get_affected_process_types({'tasks/email.py'}) == [
+            'web', 'worker',
+        ]
+        assert self.app.get_affected_process_types({'README'}) == ['web']
+        assert self.app.get_affected_process_types(None) == [
+            'web', 'worker', 'clock',
+        ]
+
+    def test_restart_process_types(self):
+        """
+        Ensure that restarting process types restarts just their instances,
+        as they are.
+        """
+        app = applications.ProcfileApplication(
+            procfile=PROCFILE_ECHO,
+            checks=[],
+            loop=self.loop,
+            concurrency={'hello': 2},
+        )
+
+        async def restart():
+            while len(app.watchers) < 3:
+                await asyncio.sleep(0.01)
+
+            hello_1, hello_2, world = app.processes
+            await app.restart_process_types(['hello'], {'app.py'})
+
+            assert [process.name for process in app.processes] == [
+                'hello.1', 'hello.2', 'world.1',
+            ]
+            assert app.processes[2] is world
+            assert hello_1.returncode == hello_2.returncode == -signal.SIGTERM
+            assert app.processes[0].command == hello_1.command
+            assert app.processes[0].env == hello_1.env
+            assert app.processes[0].pid != hello_1.pid
+
+        with mock.patch('sys.stdout'):
+            with mock.patch('procenv.utils.log') as log_mock:
+                with mock.patch.dict('os.environ', {'PORT': '8000'}):
+                    returncode, _ = self.loop.run_until_complete(
+                        asyncio.gather(app.run_application(), restart()),
+                    )
+
+        assert returncode == 3
+        assert log_mock.call_args_list[1] == mock.call(
+            'PE17', 'app.py changed; restarting hello',
         )
-        sync_mock_process_wait.assert_called_once_with()
 
     def test_run_and_wait_for_application(self):
         """
@@ -237,9 +790,200 @@ class ProcfileApplicationTest(unittest.TestCase):
 
         with mock.patch(
             'procenv.applications.ProcfileApplication.run_application',
+            new_callable=mock.MagicMock,
         ) as run_application_mock:
             self.app.run_and_wait_for_application()
 
         loop_mock.run_until_complete.assert_called_once_with(
             run_application_mock.return_value,
         )
+
+
+class ProcfileApplicationGroupTest(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.get_event_loop()
+        self.frozen_loop = FrozenLoop()
+
+    def tearDown(self):
+        self.frozen_loop.close()
+
+    def create_application(self, name, preboot_result=True, loop=None):
+        check = mock.MagicMock(timeout=10)
+        check.preboot.return_value = preboot_result
+        return applications.ProcfileApplication(
+            procfile=PROCFILE_ECHO,
+            checks=[check],
+            loop=loop or self.frozen_loop,
+            name=name,
+        )
+
+    def test_init(self):
+        """
+        Ensure that signals are handled by the group, instead of each one of
+        its applications.
+        """
+        blog = self.create_application('blog')
+        group = applications.ProcfileApplicationGroup([blog], loop=self.loop)
+
+        assert group.applications == [blog]
+        assert blog.handle_signals is False
+
+    def test_run_preboot_checks(self):
+        """
+        Ensure that applications failing their preboot checks get dropped,
+        without affecting the rest of them.
+        """
+        blog = self.create_application('blog')
+        shop = self.create_application(
+            'shop', preboot_result=(False, ('FB40', 'This fails lol')),
+        )
+        group = applications.ProcfileApplicationGroup(
+            [blog, shop], loop=self.frozen_loop,
+        )
+
+        messages = []
+
+        def log(code, message):
+            messages.append((logs.current_app.get(), code, message))
+
+        with mock.patch('sys.exit') as exit_mock:
+            with mock.patch('procenv.utils.log', side_effect=log):
+                group.run_preboot_checks()
+
+        assert exit_mock.called is False
+        assert group.applications == [blog]
+        assert messages == [
+            (None, 'PE01', 'Running preboot checks for your applications'),
+            ('blog', 'PE12', 'Check MagicMock.preboot() took 0.000 seconds'),
+            ('shop', 'PE12', 'Check MagicMock.preboot() took 0.000 seconds'),
+            (
+                'shop',
+                'FB40',
+                'Check MagicMock.preboot() failed: This fails lol',
+            ),
+            (
+                'shop',
+                'PE15',
+                'Not running the application, because at least one preboot '
+                'check failed',
+            ),
+        ]
+
+    def test_run_preboot_checks_all_failing(self):
+        """
+        Ensure that Procenv exits if no application passes its preboot
+        checks.
+        """
+        shop = self.create_application('shop', preboot_result=False)
+        group = applications.ProcfileApplicationGroup(
+            [shop], loop=self.frozen_loop,
+        )
+
+        with mock.patch('sys.exit') as exit_mock:
+            with mock.patch('procenv.utils.log') as log_mock:
+                group.run_preboot_checks()
+
+        exit_mock.assert_called_once_with(1)
+        assert log_mock.call_args_list[-1] == mock.call(
+            'PE11', 'Exiting because at least one preboot check failed',
+        )
+
+    def test_wait_for_dependencies(self):
+        """
+        Ensure that applications whose dependencies did not answer get
+        dropped, while applications that do not wait for dependencies run as
+        usual.
+        """
+        blog = self.create_application('blog')
+        shop = self.create_application('shop')
+        shop.wait_dependencies = True
+        group = applications.ProcfileApplicationGroup(
+            [blog, shop], loop=self.loop,
+        )
+
+        with mock.patch.object(
+            shop, 'gather_dependency_results',
+            mock.AsyncMock(return_value=False),
+        ):
+            with mock.patch('sys.exit') as exit_mock:
+                with mock.patch('procenv.utils.log') as log_mock:
+                    group.wait_for_dependencies()
+
+        assert exit_mock.called is False
+        assert group.applications == [blog]
+        log_mock.assert_called_once_with(
+            'PE47',
+            'Not running the application, because at least one dependency '
+            'did not answer',
+        )
+
+    def test_setup_main_checks(self):
+        """
+        Ensure that the main checks of all applications run through a single
+        scheduler.
+        """
+        blog = self.create_application('blog')
+        shop = self.create_application('shop')
+        loop_mock = mock.MagicMock()
+        group = applications.ProcfileApplicationGroup(
+            [blog, shop], loop=loop_mock,
+        )
+
+        with mock.patch(
+            'procenv.applications.CheckScheduler',
+        ) as check_scheduler_mock:
+            group.setup_main_checks()
+
+        check_scheduler_mock.assert_called_once_with(
+            blog.checks + shop.checks, loop=loop_mock,
+        )
+        assert blog.scheduler == check_scheduler_mock.return_value
+        assert shop.scheduler == check_scheduler_mock.return_value
+        loop_mock.create_task.assert_called_once_with(
+            check_scheduler_mock.return_value.run.return_value,
+        )
+
+    def test_run_application(self):
+        """
+        Ensure that the main checks of an application stop running once it
+        exits, even if it fails.
+        """
+        blog = self.create_application('blog', loop=self.loop)
+        group = applications.ProcfileApplicationGroup([blog], loop=self.loop)
+        group.scheduler = mock.Mock()
+
+        with mock.patch.object(
+            blog, 'run_application', mock.AsyncMock(side_effect=OSError),
+        ):
+            with self.assertRaises(OSError):
+                self.loop.run_until_complete(group.run_application(blog))
+
+        group.scheduler.remove.assert_called_once_with(blog.main_checks)
+
+    def test_run_applications(self):
+        """
+        Ensure that the `run_applications` coroutine method runs every
+        application, with its output labelled by the name of the application,
+        and returns the first non-zero exit code among them.
+        """
+        blog = self.create_application('blog', loop=self.loop)
+        shop = self.create_application('shop', loop=self.loop)
+        group = applications.ProcfileApplicationGroup(
+            [blog, shop], loop=self.loop,
+        )
+
+        with mock.patch('sys.stdout') as stdout_mock:
+            with mock.patch('procenv.utils.log'):
+                with mock.patch.dict('os.environ', {'PORT': '8000'}):
+                    returncode = self.loop.run_until_complete(
+                        group.run_applications(),
+                    )
+
+        output = b''.join(
+            call[0][0] for call in stdout_mock.buffer.write.call_args_list
+        ).decode()
+
+        assert returncode == 3
+        assert 'blog/world.1 | world\n' in output
+        assert 'shop/world.1 | world\n' in output
+        assert 'blog/hello.1 | hello from hello.1' in output
@@ -1,38 +1,263 @@
 import asyncio
+import collections
+import contextvars
 import errno
-import http.server
 import os
-import socketserver
+import queue
+import re
+import resource
+import socket
+import threading
+import time
+import urllib.parse
 
+from . import activation
 from . import exceptions
+from . import profiling
+from . import registry
+from . import states
+from . import stats
+from . import tracing
 from . import utils
 
 
+class CheckThreadPool:
+    """
+    A bounded pool of threads, running the synchronous methods of checks off
+    the event loop. Daemon threads are used, so that a check that never
+    returns cannot keep Procenv from exiting.
+    """
+
+    def __init__(self, max_workers):
+        self.max_workers = max_workers
+        self.queue = queue.Queue()
+        self.threads = []
+        self.idle_threads = threading.Semaphore(0)
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Schedule the given function to run in a thread of the pool and return
+        a `concurrent.futures.Future` of its result.
+        """
+        # Imported here, like the modules needed only by some checks.
+        import concurrent.futures
+
+        future = concurrent.futures.Future()
+        # Run in a copy of the caller's context, as `run_in_executor` does not
+        context = contextvars.copy_context()
+        self.queue.put((future, context.run, (fn,) + args, kwargs))
+
+        if (
+            not self.idle_threads.acquire(blocking=False) and
+            len(self.threads) < self.max_workers
+        ):
+            thread = threading.Thread(
+                target=self.work,
+                name=f'procenv-check-{len(self.threads)}',
+                daemon=True,
+            )
+            thread.start()
+            self.threads.append(thread)
+
+        return future
+
+    def work(self):
+        while True:
+            future, fn, args, kwargs = self.queue.get()
+
+            if future.set_running_or_notify_cancel():
+                try:
+                    result = fn(*args, **kwargs)
+                except BaseException as e:
+                    future.set_exception(e)
+                else:
+                    future.set_result(result)
+
+            self.idle_threads.release()
+
+
+check_thread_pool = CheckThreadPool(max_workers=4)
+
+
+def call_check_method(method):
+    """
+    Call the given method of a check and return an awaitable of its result.
+    Coroutine functions run on the event loop, while regular functions run in
+    the thread pool of the checks.
+    """
+    if asyncio.iscoroutinefunction(method):
+        return profiling.profiler.time_coroutine(
+            method(), method.__self__.qualified_name, method.__name__,
+        )
+
+    return asyncio.wrap_future(check_thread_pool.submit(method))
+
+
 class BaseCheck:
     """
     Base class for implementing checks. To run a check in the `preboot` stage,
     then implement the `preboot` method. To run a check in the `main` stage,
     then implement the `main` and the `should_main_check_run` method.
+
+    These methods can be either coroutine functions, which get awaited on the
+    event loop, or regular functions, which run in a bounded thread pool. Each
+    call should complete within `timeout` seconds.
+
+    The `main` method can return a result (e.g. `True` when satisfied and
+    `False` when not), which lets the scheduler of the checks run it as often
+    as every `min_interval` seconds while the result changes, or while it is
+    `False` during the `startup_period` of the application, and as rarely as
+    every `interval` seconds once the result is stable.
+
+    Checks report the state of what they monitor through `update_state`, so
+    that a message is logged only when the state changes; after it holds
+    for `hysteresis` seconds and, if `summary_interval` is set, every
+    `summary_interval` seconds that it stays the same.
     """
     interval = 5
+    min_interval = 0.1
+    startup_period = 30
+    timeout = 10
+    hysteresis = 0
+    summary_interval = None
+    application = None
+    state_machines = None
+
+    def attach(self, application):
+        """
+        Called with the `ProcfileApplication` the check runs for, before any
+        stage runs. Checks can override this to hook into the application
+        (e.g. to subscribe to its output).
+        """
+        self.application = application
+
+    @property
+    def app_name(self):
+        """
+        The name of the application of the check, when Procenv runs many
+        applications.
+        """
+        return self.application.name if self.application else None
+
+    @property
+    def qualified_name(self):
+        """
+        The name of the check, prefixed by the name of its application when
+        Procenv runs many applications (e.g. `blog/PortBindCheck`).
+        """
+        name = self.__class__.__name__
+        return f'{self.app_name}/{name}' if self.app_name else name
+
+    @property
+    def waits_for_dependencies(self):
+        """
+        Whether the application of the check waits for its dependencies (e.g.
+        its database) to answer after the preboot stage, in which case
+        preboot checks should leave reaching them to that stage.
+        """
+        return bool(
+            self.application and self.application.wait_dependencies,
+        )
 
-    async def main_loop(self):
-        if not hasattr(self, 'should_main_check_run'):
-            msg = (
-                f'Check "{self}" should implement the '
-                '"should_main_check_run" method, in order to run its "main" '
-                'check'
+    def getenv(self, key, default=None):
+        """
+        Return the given environment variable of the application of the
+        check, which includes the variables of its `.env` file, or of Procenv
+        without an application.
+        """
+        if self.application is not None:
+            return self.application.getenv(key, default)
+
+        return os.getenv(key, default)
+
+    def get_state_machine(self, key=None):
+        """
+        Return the state machine of the check for the given key (e.g. a
+        port), for checks monitoring many things at once.
+        """
+        if self.state_machines is None:
+            self.state_machines = {}
+
+        if key not in self.state_machines:
+            self.state_machines[key] = states.StateMachine(
+                self.hysteresis, self.summary_interval,
             )
-            raise NotImplementedError(msg)
 
-        while self.should_main_check_run():
-            await asyncio.sleep(self.interval)
-            self.main()
+        return self.state_machines[key]
+
+    @property
+    def state(self):
+        return self.get_state_machine().state
+
+    @state.setter
+    def state(self, state):
+        self.get_state_machine().reset(state)
+
+    def update_state(self, state, key=None, now=None):
+        """
+        Record the state observed by the check and return the
+        `StateChange` to report, or `None` if there is nothing to report.
+        """
+        return self.get_state_machine(key).update(state, now)
+
+    def log_state_change(self, change, code, message):
+        """
+        Log the message of the given state change. Summaries of a state
+        lasting mention for how long it has lasted.
+        """
+        if change.summary:
+            message = f'{message} (for {change.duration:.0f} seconds)'
+
+        utils.log(code, message)
+
+    async def run_method(self, name, default=None):
+        """
+        Run the method of the check with the given name and return its
+        result. If the method does not complete in time or raises an
+        exception, log the appropriate message and return `default` instead.
+        """
+        method = getattr(self, name)
+        method_name = f'{self.__class__.__name__}.{name}()'
+        running_calls = self.__dict__.setdefault('_running_calls', {})
+
+        if asyncio.iscoroutinefunction(method):
+            awaitable = profiling.profiler.time_coroutine(
+                method(), self.qualified_name, name,
+            )
+        elif name in running_calls and not running_calls[name].done():
+            # Threads cannot be interrupted, so a timed out call keeps
+            # running. Do not pile up more calls on the thread pool.
+            utils.log(
+                'PE50',
+                f'Check {method_name} is still running after timing out',
+            )
+            return default
+        else:
+            running_calls[name] = check_thread_pool.submit(method)
+            awaitable = asyncio.wrap_future(running_calls[name])
+
+        try:
+            return await asyncio.wait_for(awaitable, self.timeout)
+        except asyncio.TimeoutError:
+            utils.log(
+                'PE50',
+                f'Check {method_name} timed out after {self.timeout} seconds',
+            )
+        except Exception as e:
+            utils.log('PE51', f'Check {method_name} raised {e!r}')
+
+        return default
 
 
 class ProcfileCheck(BaseCheck):
     def preboot(self):
-        if not utils.detect_procfile():
+        if self.application is not None:
+            procfile = self.application.procfile
+            found = bool(procfile) and os.path.exists(procfile)
+        else:
+            found = bool(utils.detect_procfile())
+
+        if not found:
             message = (
                 'PF40',
                 f'Cannot find a Procfile to run your application',
@@ -43,56 +268,260 @@ class ProcfileCheck(BaseCheck):
 
 
 class DatabaseURLCheck(BaseCheck):
-    def preboot(self):
-        DATABASE_URL = os.getenv('DATABASE_URL')
+    """
+    The Database URL Check lets the user know where the application is
+    expected to find its database and, for PostgreSQL and MySQL databases,
+    makes sure that the database answers to a minimal protocol handshake.
+    """
+    connect_timeout = 5
 
-        if DATABASE_URL:
-            utils.log(
-                'DB10',
-                'Your application is expected to connect to its database at '
-                f'"{DATABASE_URL}"',
+    async def preboot(self):
+        from . import probes
+
+        DATABASE_URL = self.getenv('DATABASE_URL')
+
+        if not DATABASE_URL:
+            return True
+
+        utils.log(
+            'DB10',
+            'Your application is expected to connect to its database at '
+            f'"{DATABASE_URL}"',
+        )
+
+        if self.waits_for_dependencies:
+            return True
+
+        url = urllib.parse.urlsplit(DATABASE_URL)
+        # Schemes like `postgresql+psycopg2` declare the driver to use too
+        scheme = url.scheme.split('+')[0]
+
+        if scheme not in probes.DATABASE_HANDSHAKES or not url.hostname:
+            return True
+
+        handshake, default_port = probes.DATABASE_HANDSHAKES[scheme]
+        address = f'{url.hostname}:{url.port or default_port}'
+
+        try:
+            result = await probes.probe(
+                url.hostname,
+                url.port or default_port,
+                handshake,
+                timeout=self.connect_timeout,
             )
+        except (OSError, asyncio.TimeoutError) as e:
+            reason = str(e) or 'timed out'
+            message = (
+                f'Cannot connect to the database at "{address}": {reason}'
+            )
+            return False, ('DB40', message)
+        except exceptions.ProbeException as e:
+            message = f'The database at "{address}" failed to handshake: {e}'
+            return False, ('DB41', message)
 
+        utils.log(
+            'DB20',
+            f'Database at "{address}" is reachable ({result}, {result.info})',
+        )
         return True
 
 
 class RedisURLCheck(BaseCheck):
-    def preboot(self):
-        REDIS_URL = os.getenv('REDIS_URL')
+    """
+    The Redis URL Check lets the user know where the application is expected
+    to find Redis and keeps sending it pipelined `PING` commands, reporting
+    when Redis stops responding or its latency (p99) crosses
+    `latency_threshold` seconds.
+    """
+    connect_timeout = 5
+    pings = 3
+    latency_threshold = 0.1
 
-        if REDIS_URL:
-            utils.log(
-                'RD10',
-                'Your application is expected to connect to Redis at '
-                f'"{REDIS_URL}"',
+    def __init__(self):
+        self.client = None
+        self.latencies = stats.LatencyHistogram()
+
+    def get_client(self, redis_url):
+        from . import probes
+
+        if self.client is None:
+            url = urllib.parse.urlsplit(redis_url)
+            self.client = probes.RedisClient(
+                url.hostname or 'localhost',
+                url.port or 6379,
+                username=url.username or None,
+                password=url.password,
+                ssl=url.scheme == 'rediss',
+                timeout=self.connect_timeout,
             )
 
+        return self.client
+
+    async def ping(self, redis_url):
+        """
+        Ping Redis and return the state of its health: `"responding"`,
+        `"slow"` or `"not_responding"`, along with the reason of the latter.
+        """
+        client = self.get_client(redis_url)
+
+        try:
+            latencies = await client.ping(self.pings)
+        except (
+            OSError, asyncio.TimeoutError, exceptions.ProbeException,
+        ) as e:
+            return 'not_responding', str(e) or 'timed out'
+
+        for latency in latencies:
+            self.latencies.add(latency)
+
+        if self.latencies.p99 > self.latency_threshold:
+            return 'slow', None
+
+        return 'responding', None
+
+    @property
+    def latency_summary(self):
+        p50 = self.latencies.p50 * 1000
+        p99 = self.latencies.p99 * 1000
+        return f'p50: {p50:.1f}ms, p99: {p99:.1f}ms'
+
+    async def preboot(self):
+        REDIS_URL = self.getenv('REDIS_URL')
+
+        if not REDIS_URL:
+            return True
+
+        utils.log(
+            'RD10',
+            'Your application is expected to connect to Redis at '
+            f'"{REDIS_URL}"',
+        )
+
+        if self.waits_for_dependencies:
+            return True
+
+        self.state, reason = await self.ping(REDIS_URL)
+
+        if self.state == 'not_responding':
+            message = f'Redis is not responding: {reason}'
+            return False, ('RD40', message)
+
+        utils.log('RD20', f'Redis is responding ({self.latency_summary})')
         return True
 
+    def should_main_check_run(self):
+        return bool(self.getenv('REDIS_URL'))
+
+    async def main(self):
+        """
+        Ping Redis and log a message when the state of its health changes.
+        Return whether Redis is responding in time.
+        """
+        state, reason = await self.ping(self.getenv('REDIS_URL'))
+        change = self.update_state(state)
+
+        if change is not None:
+            if state == 'not_responding':
+                code, message = 'RD40', f'Redis is not responding: {reason}'
+            elif state == 'slow':
+                code = 'RD41'
+                message = (
+                    f'Redis is responding slowly ({self.latency_summary})'
+                )
+            else:
+                code = 'RD20'
+                message = f'Redis is responding ({self.latency_summary})'
+
+            self.log_state_change(change, code, message)
+
+        return state == 'responding'
+
 
 class PortBindCheck(BaseCheck):
     """
-    The Port Bind Check monitors if the port requested is available for
-    binding.
+    The Port Bind Check monitors if the application listens to the ports
+    requested; the port of each instance of its web process type, or the
+    port of the `PORT` environment variable without an application. Listening
+    sockets are looked up in `/proc/net/tcp{,6}` for all ports at once,
+    falling back to probing if each port is available for binding where these
+    are not available. For the ports that Procenv listens to on behalf of the
+    application (socket activation), the check monitors if the application
+    accepts connections on them instead.
     """
+    probe_timeout = 1
+    # Ports not being bound get reported after `interval` seconds, as the
+    # application may be still booting, while ports being bound get reported
+    # right away.
+    hysteresis = {'not_bound': BaseCheck.interval}
 
     def __init__(self, port=None):
         self.port = port or int(os.getenv('PORT', 0))
+        self.application_ports = None
+        self.bound_ports = set()
+        self.probes = {}
 
-    def get_tcp_server_for_port(self):
+    @property
+    def ports(self):
         """
-        Create a TCP server binding to the port of the check. This is used to
-        find out the availability of this port.
+        The names of the processes expected to bind to each port of the
+        check, by port (`None` without an application).
         """
+        if self.application_ports is None and self.application is not None:
+            try:
+                self.application_ports = self.application.get_web_ports()
+            except (OSError, TypeError):
+                # There is no readable Procfile to get the ports from.
+                self.application_ports = {}
+
+        if self.application_ports:
+            return self.application_ports
+
+        return {self.port: None} if self.port else {}
+
+    def describe_port(self, port):
+        name = self.ports.get(port)
+
+        if name is None or len(self.ports) == 1:
+            return f'"{port}"'
+
+        return f'"{port}" ({name})'
+
+    def get_tcp_server_for_port(self, port=None):
+        """
+        Create a TCP server binding to the given port (the port of the check
+        by default). This is used to find out the availability of this port.
+        """
+        # Imported here, as `http.server` is slow to import and this is
+        # needed only where `/proc/net/tcp` is not available.
+        import http.server
+        import socketserver
+
         server = socketserver.TCPServer(
-            ('', self.port), http.server.SimpleHTTPRequestHandler,
+            ('', port or self.port), http.server.SimpleHTTPRequestHandler,
         )
 
         return server
 
-    def port_is_being_used(self):
+    def port_is_being_used_via_proc(self, port=None):
+        """
+        Return whether a socket listens to the given port (the port of the
+        check by default) according to `/proc/net/tcp{,6}`, or `None` if these
+        cannot be read. This does not touch the port at all.
+        """
+        listening_ports = utils.get_listening_ports()
+
+        if listening_ports is None:
+            return None
+
+        return (port or self.port) in listening_ports
+
+    def port_is_being_used_via_bind(self, port=None):
+        """
+        Return whether the given port (the port of the check by default) is
+        being used, by attempting to bind to it.
+        """
         try:
-            with self.get_tcp_server_for_port():
+            with self.get_tcp_server_for_port(port):
                 return False
         except OSError as e:
             if e.errno == errno.EADDRINUSE:
@@ -101,37 +530,807 @@ class PortBindCheck(BaseCheck):
 
         return False
 
-    def should_main_check_run(self):
+    def port_is_being_used(self, port=None):
+        port_is_being_used = self.port_is_being_used_via_proc(port)
+
+        if port_is_being_used is None:
+            port_is_being_used = self.port_is_being_used_via_bind(port)
+
+        return port_is_being_used
+
+    def get_listening_ports(self, ports):
+        """
+        Return the subset of the given ports that sockets listen to, reading
+        `/proc/net/tcp{,6}` just once for all of them.
+        """
+        listening_ports = utils.get_listening_ports()
+
+        if listening_ports is None:
+            return {
+                port for port in ports
+                if self.port_is_being_used_via_bind(port)
+            }
+
+        return listening_ports & set(ports)
+
+    @property
+    def listen_sockets(self):
+        """
+        The sockets that Procenv listens to on behalf of the application, by
+        port.
         """
-        The check should only run as long as  the `PORT` environment variable
-        is available and the port defined in it is free to bind.
+        return getattr(self.application, 'listen_sockets', None) or {}
+
+    def is_accepting(self, port, listen_socket):
+        """
+        Return whether the application accepts connections on the given
+        socket that Procenv listens to on its behalf. A probe connection gets
+        queued on the socket and the application is considered to be
+        accepting once the accept queue of the socket has been drained, on a
+        later run of the check.
         """
-        if not bool(self.port):
+        if port not in self.probes:
+            try:
+                self.probes[port] = socket.create_connection(
+                    ('127.0.0.1', port), timeout=self.probe_timeout,
+                )
+            except OSError:
+                # The backlog of the socket is full.
+                pass
+
             return False
 
-        return not self.port_is_being_used()
+        try:
+            accepting = activation.get_accept_queue_length(listen_socket) == 0
+        except OSError:
+            # The accept queue cannot be inspected (e.g. not on Linux).
+            accepting = True
+
+        if accepting:
+            self.probes.pop(port).close()
+
+        return accepting
+
+    def get_bound_ports(self, ports):
+        """
+        Return the subset of the given ports that the application has bound
+        to, or accepts connections on, for the ports that Procenv listens to
+        on its behalf.
+        """
+        listen_sockets = self.listen_sockets
+        bound_ports = set()
+        other_ports = [port for port in ports if port not in listen_sockets]
+
+        if other_ports:
+            bound_ports |= self.get_listening_ports(other_ports)
+
+        for port in ports:
+            if port in listen_sockets and self.is_accepting(
+                port, listen_sockets[port],
+            ):
+                bound_ports.add(port)
+
+        return bound_ports
+
+    def should_main_check_run(self):
+        """
+        The check should only run as long as there are ports to check and the
+        application has not bound to all of them, as last found by `main`.
+        Ports are not looked up again here, so that a port getting bound
+        right after `main` still gets reported by its next run.
+        """
+        ports = set(self.ports)
+        return bool(ports) and self.bound_ports != ports
 
     def preboot(self):
-        message = (
-            f'Application is expected to bind to port "{self.port}"'
-        )
+        ports = self.ports
+
+        if len(ports) > 1:
+            ports = ', '.join(self.describe_port(port) for port in ports)
+            message = f'Application is expected to bind to ports {ports}'
+        else:
+            port = next(iter(ports), self.port)
+            message = f'Application is expected to bind to port "{port}"'
+
         utils.log('PB10', message)
         return True
 
+    def trace_bind(self, port, now):
+        """
+        Record the time from running the application until it bound to the
+        given port.
+        """
+        if (
+            tracing.tracer.enabled and self.application and
+            self.application.started_at is not None
+        ):
+            tracing.tracer.add_span(
+                f'bound to port {port}', self.application.trace_track,
+                self.application.started_at, now,
+            )
+
     def main(self):
-        if not self.port_is_being_used():
-            message = f'Application has not bound to port "{self.port}"'
-            utils.log('PB40', message)
-        else:
-            message = f'Application bound successfully to port "{self.port}"'
-            utils.log('PB20', message)
+        """
+        Log each port that the application binds to and return whether it has
+        bound to all of them. As the application may be still booting, the
+        ports not being bound are logged once they have not been bound for
+        `hysteresis` seconds.
+        """
+        from . import metrics
+
+        now = time.monotonic()
+        ports = self.ports
+        listen_sockets = self.listen_sockets
+        bound_ports = self.get_bound_ports(
+            [port for port in ports if port not in self.bound_ports],
+        )
+
+        for port in ports:
+            if port in self.bound_ports:
+                continue
+
+            if port in bound_ports:
+                self.bound_ports.add(port)
+                self.trace_bind(port, now)
+                change = self.update_state('bound', key=port, now=now)
+                message = (
+                    'Application accepts connections on port '
+                    f'{self.describe_port(port)}'
+                    if port in listen_sockets else
+                    'Application bound successfully to port '
+                    f'{self.describe_port(port)}'
+                )
+                code = 'PB20'
+            else:
+                change = self.update_state('not_bound', key=port, now=now)
+                message = (
+                    'Application has not accepted connections on port '
+                    f'{self.describe_port(port)}'
+                    if port in listen_sockets else
+                    'Application has not bound to port '
+                    f'{self.describe_port(port)}'
+                )
+                code = 'PB40'
+
+            if change is not None:
+                self.log_state_change(change, code, message)
+
+        if len(self.bound_ports) < len(ports):
+            return False
+
+        if self.application and self.application.started_at is not None:
+            metrics.time_to_bind.set(
+                time.monotonic() - self.application.started_at, self.app_name,
+            )
+
+        return True
+
+
+class NetlinkPortBindCheck(PortBindCheck):
+    """
+    A Port Bind Check that asks the kernel for listening sockets via
+    `NETLINK_SOCK_DIAG`, filtered by the range of its ports in the kernel. As
+    each query is very cheap, the ports are polled every few milliseconds
+    while they are not being used during the `startup_period`, so that the
+    application binding to them gets reported almost immediately, and every
+    `interval` seconds after it, for applications that never bind to them.
+    """
+    min_interval = 0.01
+    startup_period = 60
+
+    def __init__(self, port=None):
+        super().__init__(port)
+        self._sock_diag = None
+
+    @property
+    def sock_diag(self):
+        from . import netlink
+
+        if self._sock_diag is None:
+            self._sock_diag = netlink.SockDiagSocket()
+
+        return self._sock_diag
+
+    def port_is_being_used_via_netlink(self, port=None):
+        """
+        Return whether a socket listens to the given port (the port of the
+        check by default) according to the kernel, or `None` if
+        `NETLINK_SOCK_DIAG` is not available.
+        """
+        try:
+            return self.sock_diag.is_listening(port or self.port)
+        except (AttributeError, OSError):
+            # `AF_NETLINK` is available only on Linux
+            return None
+
+    def port_is_being_used(self, port=None):
+        port_is_being_used = self.port_is_being_used_via_netlink(port)
+
+        if port_is_being_used is None:
+            port_is_being_used = super().port_is_being_used(port)
+
+        return port_is_being_used
+
+    def get_listening_ports(self, ports):
+        try:
+            return self.sock_diag.get_listening_ports(ports)
+        except (AttributeError, OSError):
+            return super().get_listening_ports(ports)
+
+
+class HttpHealthCheck(BaseCheck):
+    """
+    The HTTP Health Check keeps sending requests for `path` to the port of the
+    application (the port of the first instance of its web process type, or
+    `PORT`) over a keep-alive connection, reporting when the application
+    stops responding, responds with errors, or its latency (p99) crosses
+    `latency_threshold` seconds.
+    """
+    path = '/'
+    method = 'GET'
+    host = 'localhost'
+    min_interval = 1
+    request_timeout = 5
+    latency_threshold = 1
+
+    def __init__(self, port=None, path=None):
+        self.port = port or int(os.getenv('PORT', 0))
+        self.path = path or os.getenv('HEALTH_CHECK_PATH') or self.path
+        self.client = None
+        self.latencies = stats.LatencyHistogram()
+        self.status_codes = collections.Counter()
+
+    def get_port(self):
+        if self.application is not None:
+            try:
+                web_ports = self.application.get_web_ports()
+            except (OSError, TypeError):
+                # There is no readable Procfile to get the ports from.
+                web_ports = {}
+
+            if web_ports:
+                return next(iter(web_ports))
+
+        return self.port
+
+    def get_client(self):
+        from . import probes
+
+        if self.client is None:
+            self.client = probes.HttpClient(
+                '127.0.0.1', self.get_port(), timeout=self.request_timeout,
+            )
+
+        return self.client
+
+    @property
+    def request_line(self):
+        return f'"{self.method} {self.path}"'
+
+    @property
+    def latency_summary(self):
+        p50 = self.latencies.p50 * 1000
+        p99 = self.latencies.p99 * 1000
+        return f'p50: {p50:.1f}ms, p99: {p99:.1f}ms'
+
+    async def request(self):
+        """
+        Send a request to the application and return the state of its
+        health: `"responding"`, `"slow"`, `"failing"` or `"not_responding"`,
+        along with the status of the response or the reason of the latter.
+        """
+        from . import metrics
+
+        client = self.get_client()
+
+        try:
+            response = await client.request(
+                self.path, self.method, host=self.host,
+            )
+        except (
+            OSError, asyncio.TimeoutError, exceptions.ProbeException,
+        ) as e:
+            return 'not_responding', str(e) or 'timed out'
+
+        self.latencies.add(response.latency)
+        self.status_codes[response.status] += 1
+        metrics.http_responses.inc(str(response.status))
+        metrics.http_latency.observe(response.latency)
+        status = f'{response.status} {response.reason}'.strip()
+
+        if not response.ok:
+            return 'failing', status
+
+        if self.latencies.p99 > self.latency_threshold:
+            return 'slow', status
+
+        return 'responding', status
+
+    def should_main_check_run(self):
+        return bool(self.get_port())
+
+    async def main(self):
+        """
+        Send a request to the application and log a message when the state
+        of its health changes. Return whether the application responds
+        successfully in time. Not responding before responding at all is not
+        reported, as the application may be still booting.
+        """
+        state, detail = await self.request()
+
+        if state == 'not_responding' and self.state is None:
+            return False
+
+        change = self.update_state(state)
+
+        if change is not None:
+            if state == 'not_responding':
+                code = 'HC40'
+                message = (
+                    f'Application is not responding to {self.request_line}: '
+                    f'{detail}'
+                )
+            elif state == 'failing':
+                errors = sum(
+                    count for status, count in self.status_codes.items()
+                    if status >= 400
+                )
+                total = sum(self.status_codes.values())
+                code = 'HC42'
+                message = (
+                    f'Application responded to {self.request_line} with '
+                    f'"{detail}" ({errors} of {total} responses failed)'
+                )
+            elif state == 'slow':
+                code = 'HC41'
+                message = (
+                    'Application is responding slowly to '
+                    f'{self.request_line} ({self.latency_summary})'
+                )
+            else:
+                code = 'HC20'
+                message = (
+                    f'Application is responding to {self.request_line} '
+                    f'({self.latency_summary})'
+                )
+
+            self.log_state_change(change, code, message)
+
+        return state == 'responding'
+
+
+class OutputPatternCheck(BaseCheck):
+    """
+    The Output Pattern Check scans the output of the application for known
+    signs of trouble, logging a message for each match. Each pattern is a
+    `(code, regex, message)` tuple; all of them get combined into a single
+    regular expression, which scans each batch of output in a single pass,
+    keeping the flags and the group references of each pattern to itself.
+    Each code gets logged at most once every `interval` seconds, along with
+    the number of matches in between.
+    """
+    patterns = (
+        (
+            'OP40',
+            rb'Address already in use|EADDRINUSE',
+            'Your application tried to bind to a port that is already in use',
+        ),
+        (
+            'OP41',
+            rb'ECONNREFUSED|Connection refused|could not connect to server',
+            'Your application could not connect to a service',
+        ),
+        (
+            'OP42',
+            rb'Traceback \(most recent call last\)',
+            'Your application raised an exception',
+        ),
+    )
+    max_line_length = 200
+
+    def __init__(self):
+        pattern_regexes = [
+            self.compile_pattern(code, pattern)
+            for code, pattern, _ in self.patterns
+        ]
+        # Patterns get joined as they are to find matches, as any group around
+        # them keeps `re` from skipping ahead to their possible first
+        # characters, which makes scanning several times slower. Each match
+        # gets then told apart by matching it again with every pattern in a
+        # named group of its own.
+        finder_patterns = []
+        grouped_patterns = []
+        finder_groups = grouped_groups = 0
+
+        for index, regex in enumerate(pattern_regexes):
+            prefix = b'p%d_' % index
+            finder_patterns.append(
+                self.scope_pattern(regex, prefix, finder_groups),
+            )
+            grouped_patterns.append(b'(?P<p%d>%s)' % (
+                index, self.scope_pattern(regex, prefix, grouped_groups + 1),
+            ))
+            finder_groups += regex.groups
+            grouped_groups += regex.groups + 1
+
+        self.regex = re.compile(b'|'.join(finder_patterns))
+        self.grouped_regex = re.compile(b'|'.join(grouped_patterns))
+        self.last_logged_at = {}
+        self.suppressed_matches = {}
+
+    def compile_pattern(self, code, pattern):
+        """
+        Compile the given pattern on its own, raising an
+        `InvalidCheckException` naming its code if it is invalid.
+        """
+        try:
+            return re.compile(pattern)
+        except re.error as e:
+            msg = f'Pattern of "{code}" is not a valid regular expression: {e}'
+            raise exceptions.InvalidCheckException(msg)
+
+    def scope_pattern(self, regex, prefix, group_offset):
+        """
+        Return the pattern of the given compiled regular expression, rewritten
+        to keep its meaning when combined with others; its leading global
+        flags (e.g. `(?i)`) get scoped to it, the names of its groups get
+        prefixed with `prefix` and its numbered group references get shifted
+        by `group_offset`.
+        """
+        pattern = regex.pattern
+        flags = b''
+
+        while True:
+            match = re.match(rb'\(\?([aiLmsux]+)\)', pattern)
+
+            if match is None:
+                break
+
+            flags += match.group(1)
+            pattern = pattern[match.end():]
+
+        verbose = regex.flags & re.VERBOSE
+        rewritten = []
+        position = 0
+
+        def shift(number):
+            number = int(number) + group_offset
+
+            if number > 99:
+                msg = (
+                    f'Pattern {regex.pattern!r} refers to a group that cannot '
+                    'be referred to by number, once combined with the rest'
+                )
+                raise exceptions.InvalidCheckException(msg)
+
+            return b'%d' % number
+
+        while position < len(pattern):
+            char = pattern[position:position + 1]
+            rest = pattern[position:]
+
+            if char == b'\\':
+                match = re.match(rb'\\([1-9][0-9]?)', rest)
+
+                if match is None or re.match(rb'\\[0-7]{3}', rest):
+                    # An escape, or an octal one
+                    rewritten.append(rest[:2])
+                    position += 2
+                    continue
+
+                # Wrapped, so that any digit following it stays apart.
+                rewritten.append(b'(?:\\%s)' % shift(match.group(1)))
+                position += match.end()
+                continue
+
+            if char == b'[':
+                # Character sets get copied as they are, along with a `]`
+                # right after their start, which is a literal one.
+                match = re.match(rb'\[\^?\]?(?:\\.|[^\]])*\]?', rest, re.S)
+                rewritten.append(match.group())
+                position += match.end()
+                continue
+
+            if char == b'#' and verbose:
+                end = pattern.find(b'\n', position)
+                end = len(pattern) if end < 0 else end
+                rewritten.append(pattern[position:end])
+                position = end
+                continue
+
+            match = re.match(rb'\(\?P(<|=)([^>)]*)', rest)
+
+            if match is not None:
+                rewritten.append(b'(?P%s%s%s' % (
+                    match.group(1), prefix, match.group(2),
+                ))
+                position += match.end()
+                continue
+
+            match = re.match(rb'\(\?\(([0-9]+)\)', rest)
+
+            if match is not None:
+                rewritten.append(b'(?(%s)' % shift(match.group(1)))
+                position += match.end()
+                continue
+
+            match = re.match(rb'\(\?\((\w+)\)', rest)
+
+            if match is not None:
+                rewritten.append(b'(?(%s%s)' % (prefix, match.group(1)))
+                position += match.end()
+                continue
+
+            rewritten.append(char)
+            position += 1
+
+        pattern = b''.join(rewritten)
+
+        if verbose:
+            # Ends any comment, which would hide the end of the scoped flags.
+            pattern += b'\n'
+
+        if flags:
+            return b'(?%s:%s)' % (flags, pattern)
+
+        return pattern
+
+    def get_pattern_index(self, output, position):
+        """
+        Return the index of the first pattern matching at the given position
+        of the output, as the combined regular expression does, or `None` if
+        none of them does.
+        """
+        match = self.grouped_regex.match(output, position)
+
+        if match is None:
+            return None
+
+        return int(match.lastgroup[1:])
+
+    def attach(self, application):
+        super().attach(application)
+        scan = self.scan
+
+        if profiling.profiler.enabled:
+            scan = profiling.profiler.time_callback(
+                scan, self.qualified_name, 'scan',
+            )
+
+        application.output.subscribe(scan)
+
+    def scan(self, process_name, lines):
+        """
+        Scan a batch of lines of output of the given process and log the
+        matching patterns.
+        """
+        output = b'\n'.join(lines)
+
+        for match in self.regex.finditer(output):
+            line_start = output.rfind(b'\n', 0, match.start()) + 1
+            line_end = output.find(b'\n', match.end())
+            line = output[line_start:line_end if line_end >= 0 else None]
+            index = self.get_pattern_index(output, match.start())
+
+            if index is not None:
+                self.report(index, process_name, line)
+
+    def report(self, index, process_name, line):
+        code, _, message = self.patterns[index]
+        now = time.monotonic()
+        last_logged_at = self.last_logged_at.get(code)
+
+        if (
+            last_logged_at is not None and
+            now - last_logged_at < self.interval
+        ):
+            self.suppressed_matches[code] = (
+                self.suppressed_matches.get(code, 0) + 1
+            )
+            return
+
+        line = line[:self.max_line_length].decode(errors='replace').strip()
+        message = f'{message}; {process_name} printed "{line}"'
+        suppressed_matches = self.suppressed_matches.pop(code, 0)
+
+        if suppressed_matches:
+            message += (
+                f' ({suppressed_matches} more matches since the last message)'
+            )
+
+        self.last_logged_at[code] = now
+        utils.log(code, message, check=self.__class__.__name__)
+
+
+class ResourceUsageCheck(BaseCheck):
+    """
+    The Resource Usage Check samples the CPU time, memory and open files of
+    every process of the application and its descendants from `/proc`,
+    logging a message when they cross a fraction of their limits, or grow by
+    more than `growth_threshold` within `growth_period` seconds. Each message
+    is logged once, until its condition clears, as the state of each
+    condition is tracked separately.
+
+    The memory of each process is its proportional set size where available,
+    which counts the pages shared among processes once. It is costly to read,
+    so it gets read once every `pss_interval` seconds per process, while the
+    rest gets sampled every time.
+    """
+    memory_threshold = 0.9
+    fds_threshold = 0.8
+    cpu_threshold = 0.9
+    growth_threshold = 0.5
+    growth_period = 300
+    min_memory_growth = 50 * 1024 * 1024
+    min_fds_growth = 50
+    pss_interval = 60
+
+    def __init__(self):
+        from . import procfs
+
+        self.history = collections.deque()
+        self.memory_limit = procfs.get_memory_limit()
+        self.cpu_limit = procfs.get_cpu_limit()
+        self.fds_limit = resource.getrlimit(resource.RLIMIT_NOFILE)[0]
+        self.last_cpu_time = None
+        self.last_sampled_at = None
+        self.memory = None
+        self.fds = None
+        self.cpu_usage = None
+        self.pss = {}
+
+    def should_main_check_run(self):
+        from . import procfs
+
+        return (
+            self.application is not None and
+            os.path.isdir(f'{procfs.PROC_ROOT}/self/task')
+        )
+
+    def sample(self):
+        """
+        Return a `(name, ProcessSample)` tuple for every running process of
+        the application and its descendants, with the name of the process of
+        the application they descend from.
+        """
+        from . import procfs
+
+        now = time.monotonic()
+        samples = []
+        pss = {}
+
+        for process in self.application.processes:
+            if process.pid is None or process.returncode is not None:
+                continue
+
+            for pid in procfs.get_descendants(process.pid):
+                sample = procfs.sample_process(pid)
+
+                if sample is None:
+                    continue
+
+                read_at, memory = self.pss.get(pid, (None, None))
+
+                if read_at is None or now - read_at >= self.pss_interval:
+                    read_at, memory = now, procfs.read_pss(pid)
+
+                # Processes that exited get dropped, along with their PSS.
+                pss[pid] = (read_at, memory)
+
+                if memory is not None:
+                    sample.memory = memory
+
+                samples.append((process.name, sample))
+
+        self.pss = pss
+        return samples
+
+    def report(self, code, breached, message):
+        change = self.update_state(breached, key=code)
+
+        if change is not None and breached:
+            self.log_state_change(change, code, message)
+
+    def get_baseline(self, now, memory, fds):
+        """
+        Record the given totals and return the ones from `growth_period`
+        seconds ago, or `None` if there is not enough history yet.
+        """
+        self.history.append((now, memory, fds))
+
+        # Keep just the latest sample that is older than the growth period.
+        while (
+            len(self.history) > 1 and
+            self.history[1][0] <= now - self.growth_period
+        ):
+            self.history.popleft()
+
+        if now - self.history[0][0] < self.growth_period:
+            return None
+
+        return self.history[0][1:]
+
+    def main(self):
+        """
+        Sample the resource usage of the application and log the limits
+        being approached and the unusual growth.
+        """
+        now = time.monotonic()
+        samples = self.sample()
+
+        if not samples:
+            return None
+
+        memory = sum(sample.memory for _, sample in samples)
+        # Processes whose open files cannot be listed are not counted.
+        fds = sum(sample.fds or 0 for _, sample in samples)
+        cpu_time = sum(sample.cpu_time for _, sample in samples)
+        self.memory, self.fds = memory, fds
+        mib = 1024 * 1024
+
+        self.report(
+            'RU40',
+            memory > self.memory_limit * self.memory_threshold,
+            f'Your application uses {memory // mib} MiB of memory, over '
+            f'{self.memory_threshold:.0%} of its limit of '
+            f'{self.memory_limit // mib} MiB',
+        )
+
+        name, busiest = max(samples, key=lambda item: item[1].fds or 0)
+        self.report(
+            'RU42',
+            (busiest.fds or 0) > self.fds_limit * self.fds_threshold,
+            f'Process {busiest.pid} of {name} has {busiest.fds} open files, '
+            f'over {self.fds_threshold:.0%} of its limit of {self.fds_limit}',
+        )
+
+        if self.last_sampled_at is not None and now > self.last_sampled_at:
+            # The CPU time of processes that exited in the meantime is lost.
+            cpu_time_delta = max(cpu_time - self.last_cpu_time, 0)
+            self.cpu_usage = cpu_time_delta / (now - self.last_sampled_at)
+            self.report(
+                'RU44',
+                self.cpu_usage > self.cpu_limit * self.cpu_threshold,
+                f'Your application uses {self.cpu_usage:.1f} CPUs, over '
+                f'{self.cpu_threshold:.0%} of the {self.cpu_limit:g} CPUs '
+                'available to it',
+            )
+
+        self.last_cpu_time, self.last_sampled_at = cpu_time, now
+        baseline = self.get_baseline(now, memory, fds)
+
+        if baseline is not None:
+            previous_memory, previous_fds = baseline
+            minutes = f'{self.growth_period / 60:g}'
+            self.report(
+                'RU41',
+                memory - previous_memory > max(
+                    previous_memory * self.growth_threshold,
+                    self.min_memory_growth,
+                ),
+                f'Memory usage of your application grew from '
+                f'{previous_memory // mib} MiB to {memory // mib} MiB in the '
+                f'last {minutes} minutes',
+            )
+            self.report(
+                'RU43',
+                fds - previous_fds > max(
+                    previous_fds * self.growth_threshold,
+                    self.min_fds_growth,
+                ),
+                f'Open files of your application grew from {previous_fds} to '
+                f'{fds} in the last {minutes} minutes',
+            )
+
+        return None
 
 
-def load_check(dotted_path):
+def load_check(name):
     """
-    Return a Check instance, given a dotted path.
+    Return a Check instance, given a dotted path or the short name of a check
+    (e.g. `PortBindCheck`).
     """
-    check_class = utils.import_string(dotted_path)
+    check_class = utils.import_string(registry.resolve_check(name))
 
     if not issubclass(check_class, BaseCheck):
         msg = (
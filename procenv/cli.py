@@ -1,18 +1,48 @@
+import os
+
 import click
 
+from . import logs
 from . import utils
-from .applications import ProcfileApplication
-from .checks import load_check
 
 
 DEFAULT_CHECKS = [
-    'procenv.checks.ProcfileCheck',
-    'procenv.checks.PortBindCheck',
-    'procenv.checks.DatabaseURLCheck',
-    'procenv.checks.RedisURLCheck',
+    'ProcfileCheck',
+    'PortBindCheck',
+    'DatabaseURLCheck',
+    'RedisURLCheck',
+    'OutputPatternCheck',
+    'ResourceUsageCheck',
 ]
 
 
+def validate_concurrency(ctx, param, value):
+    try:
+        return utils.parse_concurrency(value)
+    except ValueError as err:
+        raise click.BadParameter(str(err))
+
+
+def validate_watch(ctx, param, value):
+    try:
+        return utils.parse_watch(value)
+    except ValueError as err:
+        raise click.BadParameter(str(err))
+
+
+def validate_apps(ctx, param, value):
+    names = [os.path.basename(os.path.abspath(path)) for path in value]
+    duplicates = {name for name in names if names.count(name) > 1}
+
+    if duplicates:
+        raise click.BadParameter(
+            'Applications should have distinct directory names: ' +
+            ', '.join(sorted(duplicates)),
+        )
+
+    return list(zip(names, value))
+
+
 @click.command()
 @click.option(
     '-c',
@@ -20,21 +50,338 @@ DEFAULT_CHECKS = [
     default=DEFAULT_CHECKS,
     multiple=True,
     show_default=True,
-    help='Checks to use when running the Procfile-based application'
+    help='Checks to use when running the Procfile-based application, as '
+    'short names or dotted paths'
+)
+@click.option(
+    '--check-timeout',
+    type=float,
+    default=None,
+    help='Seconds after which a run of a check times out (overrides the '
+    'timeout of each check)',
+)
+@click.option(
+    '--summary-interval',
+    type=float,
+    default=None,
+    help='Seconds after which checks report again the state of what they '
+    'monitor, if it has not changed (disabled by default)',
+)
+@click.option(
+    '--preboot-deadline',
+    type=float,
+    default=None,
+    help='Seconds within which all preboot checks should complete (60 by '
+    'default)',
+)
+@click.option(
+    '--wait-for-dependencies',
+    is_flag=True,
+    help='Wait for the database and Redis of the application (DATABASE_URL '
+    'and REDIS_URL) to answer before running it',
+)
+@click.option(
+    '--wait-for',
+    multiple=True,
+    metavar='ENDPOINT',
+    help='Endpoint to wait for before running the application, as HOST:PORT '
+    'or as a database or Redis URL (implies --wait-for-dependencies)',
+)
+@click.option(
+    '--wait-timeout',
+    type=float,
+    default=None,
+    help='Seconds within which all dependencies should answer (60 by '
+    'default)',
+)
+@click.option(
+    '--concurrency',
+    multiple=True,
+    callback=validate_concurrency,
+    metavar='TYPE=N',
+    help='Number of instances to run for each process type (e.g. '
+    '"web=4,worker=2"), one by default',
+)
+@click.option(
+    '--socket-activation',
+    is_flag=True,
+    help='Listen to the ports of the web process type on behalf of the '
+    'application and pass the sockets to it (LISTEN_FDS)',
+)
+@click.option(
+    '--reload-procfile',
+    is_flag=True,
+    help='Restart the processes of the process types whose command changes '
+    'in the Procfile, while the rest of them keep running',
+)
+@click.option(
+    '--watch',
+    multiple=True,
+    callback=validate_watch,
+    metavar='TYPE[=GLOB]',
+    help='Process type to restart when the files of the application change '
+    '(e.g. "web"), or just the files matching the given pattern (e.g. '
+    '"worker=tasks/*.py")',
+)
+@click.option(
+    '--watch-ignore',
+    multiple=True,
+    metavar='GLOB',
+    help='Pattern of files or directories not to watch, in addition to '
+    'version control, dependency and cache directories (e.g. "dist")',
+)
+@click.option(
+    '--app',
+    'apps',
+    multiple=True,
+    callback=validate_apps,
+    type=click.Path(exists=True, file_okay=False),
+    metavar='DIR',
+    help='Directory of a Procfile-based application to run; give it more '
+    'than once to run many applications (the current directory by default)',
+)
+@click.option(
+    '--log-dir',
+    type=click.Path(file_okay=False, writable=True),
+    default=None,
+    help='Directory to write the output and the messages of each '
+    'application given with --app to, as {name}.log (stdout and stderr by '
+    'default)',
+)
+@click.option(
+    '--log-format',
+    type=click.Choice(['text', 'json']),
+    default='text',
+    show_default=True,
+    help='Format of the messages of Procenv',
+)
+@click.option(
+    '--loop-lag-threshold',
+    type=float,
+    default=None,
+    help='Monitor the event loop of Procenv and report lags of at least the '
+    'given seconds, along with the slowest callbacks of checks (disabled by '
+    'default)',
 )
-def main(check):
+@click.option(
+    '--sample-stacks',
+    is_flag=True,
+    help='Sample the stack of the event loop of Procenv when it lags, to '
+    'find out what blocks it (implies monitoring lags of 0.1 seconds, unless '
+    '--loop-lag-threshold is given)',
+)
+@click.option(
+    '--trace-file',
+    type=click.Path(dir_okay=False, writable=True),
+    default=None,
+    help='File to write the spans of the lifecycle of the application to, on '
+    'exit and on SIGUSR1 (disabled by default)',
+)
+@click.option(
+    '--trace-format',
+    type=click.Choice(['chrome', 'otlp']),
+    default='chrome',
+    show_default=True,
+    help='Format of the trace file; Chrome trace events or OTLP-JSON',
+)
+@click.option(
+    '--metrics-port',
+    type=int,
+    default=None,
+    help='Port to serve Prometheus metrics at /metrics on (disabled by '
+    'default)',
+)
+@click.option(
+    '--metrics-host',
+    default='127.0.0.1',
+    show_default=True,
+    help='Address to serve Prometheus metrics on',
+)
+def main(check, check_timeout, summary_interval, preboot_deadline,
+         wait_for_dependencies, wait_for, wait_timeout, concurrency,
+         socket_activation, reload_procfile, watch, watch_ignore, apps,
+         log_dir, log_format, loop_lag_threshold, sample_stacks, trace_file,
+         trace_format, metrics_port, metrics_host):
     """
     Procenv lets you run, manage and monitor Procfile-based applications.
     """
+    logs.sink.configure(log_format)
     utils.log('PE00', '👋 Welcome to Procenv')
-    checks = [load_check(path) for path in check]
-    app = ProcfileApplication(
-        procfile=utils.detect_procfile(),
-        checks=checks,
-    )
-    app.run_preboot_checks()
-    app.setup_main_checks()
-    app.run_and_wait_for_application()
+
+    # Imported after the welcome message, as they pull in asyncio and the
+    # modules of the checks.
+    import asyncio
+    import signal
+    from . import dependencies
+    from . import metrics
+    from . import profiling
+    from . import tracing
+    from .applications import ProcfileApplication
+    from .applications import ProcfileApplicationGroup
+    from .checks import load_check
+    from .streams import OutputPipeline
+    from .streams import OutputWriter
+
+    def write_trace():
+        try:
+            count = tracing.tracer.write(trace_file, trace_format)
+        except OSError as err:
+            utils.log(
+                'PE48', f'Cannot write the trace to "{trace_file}": {err}',
+            )
+        else:
+            utils.log('PE19', f'Wrote {count} spans to "{trace_file}"')
+
+    if trace_file:
+        tracing.tracer.enabled = True
+
+    profile = loop_lag_threshold is not None or sample_stacks
+
+    if profile:
+        # Enabled before loading the checks, so that their callbacks get
+        # timed.
+        profiling.profiler.enabled = True
+        profiling.profiler.sample_stacks = sample_stacks
+
+        if loop_lag_threshold is not None:
+            profiling.profiler.threshold = loop_lag_threshold
+
+    def load_checks():
+        checks = [load_check(name) for name in check]
+
+        for _check in checks:
+            if check_timeout:
+                _check.timeout = check_timeout
+
+            if summary_interval:
+                _check.summary_interval = summary_interval
+
+        return checks
+
+    if apps:
+        procfiles = [
+            (name, os.path.join(path, 'Procfile'), path)
+            for name, path in apps
+        ]
+    else:
+        procfiles = [(None, utils.detect_procfile(), None)]
+
+    process_types = set()
+
+    for _, procfile, _ in procfiles:
+        if procfile and os.path.exists(procfile):
+            process_types.update(utils.parse_procfile(procfile))
+
+    for option, value in (('--concurrency', concurrency), ('--watch', watch)):
+        unknown = set(value) - process_types
+
+        if process_types and unknown:
+            raise click.BadParameter(
+                'Unknown process types: ' + ', '.join(sorted(unknown)),
+                param_hint=f"'{option}'",
+            )
+
+    if log_dir and not apps:
+        raise click.BadParameter(
+            'Can only be used along with --app', param_hint="'--log-dir'",
+        )
+
+    for endpoint in wait_for:
+        try:
+            dependencies.parse_endpoint(endpoint)
+        except ValueError as err:
+            raise click.BadParameter(str(err), param_hint="'--wait-for'")
+
+    loop = asyncio.get_event_loop()
+    applications = []
+    log_files = []
+
+    for name, procfile, cwd in procfiles:
+        output = None
+
+        if name and log_dir:
+            os.makedirs(log_dir, exist_ok=True)
+            log_path = os.path.join(log_dir, f'{name}.log')
+            # Both files get opened for appending, so that the output of the
+            # processes and the messages of Procenv do not overwrite each
+            # other.
+            output_file = open(log_path, 'ab')
+            log_files.append(output_file)
+            output = OutputPipeline(
+                loop=loop, writer=OutputWriter(loop=loop, stream=output_file),
+            )
+            logs.sink.add_stream(name, open(log_path, 'a'))
+
+        app = ProcfileApplication(
+            procfile=procfile,
+            checks=load_checks(),
+            loop=loop,
+            concurrency=concurrency,
+            name=name,
+            cwd=cwd,
+            output=output,
+        )
+
+        if preboot_deadline:
+            app.preboot_deadline = preboot_deadline
+
+        if wait_for_dependencies or wait_for:
+            app.wait_dependencies = True
+            app.wait_endpoints = wait_for
+
+        if wait_timeout:
+            app.wait_timeout = wait_timeout
+
+        if socket_activation:
+            app.socket_activation = True
+
+        if reload_procfile:
+            app.reload_procfile = True
+
+        if watch:
+            app.watch_process_types = watch
+            app.watch_ignore += watch_ignore
+
+        applications.append(app)
+
+    if len(applications) > 1:
+        app = ProcfileApplicationGroup(applications, loop=loop)
+    else:
+        app = applications[0]
+
+    if metrics_port:
+        metrics_server = metrics.MetricsServer(metrics_host, metrics_port)
+        loop.run_until_complete(metrics_server.start())
+
+    if trace_file:
+        loop.add_signal_handler(signal.SIGUSR1, write_trace)
+
+    if profile:
+        profiling.profiler.start(loop)
+
+    try:
+        app.run_preboot_checks()
+        app.wait_for_dependencies()
+        app.setup_main_checks()
+
+        if len(applications) > 1:
+            app.run_and_wait_for_applications()
+        else:
+            app.run_and_wait_for_application()
+    finally:
+        profiling.profiler.stop()
+
+        if trace_file:
+            write_trace()
+
+        if log_files:
+            for application in applications:
+                loop.run_until_complete(application.output.writer.flush())
+
+            for log_file in log_files:
+                log_file.close()
+
+            logs.sink.close_streams(timeout=5)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,104 @@
+import subprocess
+import sys
+import tempfile
+
+from click.testing import CliRunner
+
+from . import cli
+
+
+# The share of the cumulative import time of click that importing the CLI of
+# Procenv may take on top of it, before printing the welcome message. It is
+# relative to click, so that it holds on slow and busy machines alike.
+IMPORT_TIME_BUDGET = 0.5
+
+
+def get_import_times(statement):
+    """
+    Run the given statement in a new interpreter with `-X importtime` and
+    return the cumulative import time of each module in microseconds.
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        stderr=subprocess.PIPE,
+        check=True,
+    )
+    import_times = {}
+
+    for line in result.stderr.decode().splitlines()[1:]:
+        _, cumulative, module = line.split('|')
+        import_times[module.strip()] = int(cumulative)
+
+    return import_times
+
+
+def get_imported_modules(statement):
+    """
+    Run the given statement in a new interpreter and return the names of the
+    modules imported by then.
+    """
+    result = subprocess.run(
+        [
+            sys.executable, '-c',
+            f'{statement}; import sys; print(*sorted(sys.modules))',
+        ],
+        stdout=subprocess.PIPE,
+        check=True,
+    )
+    return set(result.stdout.decode().split())
+
+
+def test_cli_imports():
+    """
+    Make sure that importing the CLI does not pull in asyncio, the checks or
+    the modules they need, which are imported after the welcome message.
+    """
+    modules = get_imported_modules('import procenv.cli')
+
+    for module in (
+        'asyncio', 'concurrent.futures', 'procenv.checks',
+        'procenv.applications', 'procenv.probes', 'procenv.netlink',
+    ):
+        assert module not in modules
+
+
+def test_cli_import_time():
+    """
+    Make sure that importing the CLI takes a small share of the time of
+    importing click, taking the best of a few runs to spare noise.
+    """
+    shares = []
+
+    for _ in range(3):
+        import_times = get_import_times('import procenv.cli')
+        own_import_time = import_times['procenv.cli'] - import_times['click']
+        shares.append(own_import_time / import_times['click'])
+
+    assert min(shares) < IMPORT_TIME_BUDGET
+
+
+def test_checks_lazy_imports():
+    """
+    Make sure that slow modules needed only by some checks do not get
+    imported along with the checks.
+    """
+    modules = get_imported_modules('import procenv.checks')
+
+    for module in (
+        'http.server', 'socketserver', 'procenv.probes', 'procenv.netlink',
+        'procenv.procfs', 'procenv.metrics',
+    ):
+        assert module not in modules
+
+
+def test_log_dir_without_app():
+    """
+    Make sure that `--log-dir` gets rejected without `--app`, instead of
+    being ignored.
+    """
+    with tempfile.TemporaryDirectory() as log_dir:
+        result = CliRunner().invoke(cli.main, ['--log-dir', log_dir])
+
+    assert result.exit_code == 2
+    assert "Invalid value for '--log-dir'" in result.output
+    assert 'Can only be used along with --app' in result.output
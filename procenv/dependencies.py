@@ -0,0 +1,141 @@
+import asyncio
+import time
+import urllib.parse
+
+from . import exceptions
+from . import probes
+
+
+class Dependency:
+    """
+    A service the application needs in order to start (e.g. its database),
+    reachable at the given host and port, which answers the given handshake
+    coroutine function (if any) once it is ready.
+    """
+
+    def __init__(self, host, port, handshake=None, description=None):
+        self.host = host
+        self.port = port
+        self.handshake = handshake
+        self.description = description
+        self.attempts = 0
+        self.error = None
+
+    @property
+    def address(self):
+        return f'{self.host}:{self.port}'
+
+    def __str__(self):
+        if self.description:
+            return f'{self.description} at "{self.address}"'
+
+        return f'"{self.address}"'
+
+    async def wait(self, probe_timeout=5, initial_delay=0.1, max_delay=1):
+        """
+        Probe the dependency until it answers, doubling the delay between
+        attempts from `initial_delay` up to `max_delay` seconds, and return
+        the seconds it took. The error of the last attempt is kept in
+        `error`, for when the wait gets cancelled.
+        """
+        started_at = time.perf_counter()
+        delay = initial_delay
+
+        while True:
+            self.attempts += 1
+
+            try:
+                await probes.probe(
+                    self.host, self.port, self.handshake,
+                    timeout=probe_timeout,
+                )
+            except (
+                OSError, asyncio.TimeoutError, exceptions.ProbeException,
+            ) as e:
+                self.error = str(e) or 'timed out'
+            else:
+                return time.perf_counter() - started_at
+
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, max_delay)
+
+
+def parse_database_url(database_url):
+    """
+    Return the `Dependency` of the given database URL, or `None` if its
+    scheme is not a known one.
+    """
+    url = urllib.parse.urlsplit(database_url)
+    # Schemes like `postgresql+psycopg2` declare the driver to use too
+    scheme = url.scheme.split('+')[0]
+
+    if scheme not in probes.DATABASE_HANDSHAKES or not url.hostname:
+        return None
+
+    handshake, default_port = probes.DATABASE_HANDSHAKES[scheme]
+    return Dependency(
+        url.hostname, url.port or default_port, handshake, 'the database',
+    )
+
+
+def parse_redis_url(redis_url):
+    url = urllib.parse.urlsplit(redis_url)
+    # Redis over TLS gets just connected to, as probes speak plain TCP.
+    handshake = probes.handshake_redis if url.scheme == 'redis' else None
+    return Dependency(
+        url.hostname or 'localhost', url.port or 6379, handshake, 'Redis',
+    )
+
+
+def parse_endpoint(value):
+    """
+    Return the `Dependency` of the given endpoint; either `HOST:PORT`, or a
+    database or Redis URL. Raise `ValueError` if it is neither.
+    """
+    if '://' in value:
+        scheme = urllib.parse.urlsplit(value).scheme.split('+')[0]
+
+        if scheme in ('redis', 'rediss'):
+            return parse_redis_url(value)
+
+        dependency = parse_database_url(value)
+
+        if dependency is None:
+            raise ValueError(f'Unknown scheme of URL "{value}"')
+
+        return dependency
+
+    url = urllib.parse.urlsplit(f'//{value}')
+
+    try:
+        port = url.port
+    except ValueError:
+        port = None
+
+    if not url.hostname or not port:
+        raise ValueError(f'Expected HOST:PORT, not "{value}"')
+
+    return Dependency(url.hostname, port)
+
+
+def get_dependencies(getenv, endpoints=()):
+    """
+    Return the dependencies of an application; its database and Redis, as
+    declared by its `DATABASE_URL` and `REDIS_URL` environment variables
+    (through the given `getenv` function), and the given endpoints.
+    """
+    dependencies = []
+    database_url = getenv('DATABASE_URL')
+    redis_url = getenv('REDIS_URL')
+
+    if database_url:
+        dependency = parse_database_url(database_url)
+
+        if dependency is not None:
+            dependencies.append(dependency)
+
+    if redis_url:
+        dependencies.append(parse_redis_url(redis_url))
+
+    dependencies.extend(parse_endpoint(endpoint) for endpoint in endpoints)
+    return dependencies
@@ -0,0 +1,96 @@
+from unittest import mock
+import asyncio
+import socket
+import unittest
+
+from . import dependencies
+from . import probes
+
+
+def test_parse_endpoint():
+    """
+    Make sure that endpoints are parsed either as `HOST:PORT` or as database
+    and Redis URLs, with the handshake and default port of their scheme.
+    """
+    dependency = dependencies.parse_endpoint('cache:11211')
+    assert (dependency.host, dependency.port) == ('cache', 11211)
+    assert dependency.handshake is None
+    assert str(dependency) == '"cache:11211"'
+
+    dependency = dependencies.parse_endpoint('postgresql+psycopg2://db/app')
+    assert dependency.address == 'db:5432'
+    assert dependency.handshake is probes.handshake_postgres
+    assert str(dependency) == 'the database at "db:5432"'
+
+    dependency = dependencies.parse_endpoint('redis://:secret@queue:6380')
+    assert dependency.address == 'queue:6380'
+    assert dependency.handshake is probes.handshake_redis
+    assert str(dependency) == 'Redis at "queue:6380"'
+
+    for value in ('cache', 'cache:port', 'http://web:80'):
+        try:
+            dependencies.parse_endpoint(value)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f'"{value}" should not be valid')
+
+
+def test_get_dependencies():
+    """
+    Make sure that the dependencies of an application are the ones declared
+    by `DATABASE_URL` and `REDIS_URL`, followed by the given endpoints, while
+    databases without a known scheme are left out.
+    """
+    env = {'DATABASE_URL': 'mysql://db/app', 'REDIS_URL': 'rediss://queue'}
+    _dependencies = dependencies.get_dependencies(env.get, ['search:9200'])
+
+    assert [dependency.address for dependency in _dependencies] == [
+        'db:3306', 'queue:6379', 'search:9200',
+    ]
+    # Probes do not speak TLS, so Redis over TLS gets just connected to.
+    assert _dependencies[1].handshake is None
+
+    env = {'DATABASE_URL': 'sqlite:///app.db'}
+    assert dependencies.get_dependencies(env.get) == []
+
+
+class DependencyTest(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.get_event_loop()
+
+    def test_wait(self):
+        """
+        Ensure that waiting for a dependency keeps probing it with an
+        exponential backoff until it answers, and returns the time it took.
+        """
+        # Reserve a port that refuses connections, until a server starts
+        # listening to it.
+        sock = socket.socket()
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+        sock.close()
+        dependency = dependencies.Dependency('127.0.0.1', port)
+        delays = []
+        sleep = asyncio.sleep
+
+        async def sleep_mock(delay):
+            delays.append(delay)
+
+            if len(delays) == 4:
+                server = await asyncio.start_server(
+                    lambda reader, writer: writer.close(), '127.0.0.1', port,
+                )
+                self.addCleanup(server.close)
+
+            await sleep(0)
+
+        with mock.patch('asyncio.sleep', sleep_mock):
+            waited = self.loop.run_until_complete(
+                dependency.wait(initial_delay=0.1, max_delay=0.5),
+            )
+
+        assert delays == [0.1, 0.2, 0.4, 0.5]
+        assert dependency.attempts == 5
+        assert dependency.error.startswith('[Errno 111]')
+        assert waited > 0
@@ -4,3 +4,7 @@ class CheckException(Exception):
 
 class InvalidCheckException(CheckException):
     pass
+
+
+class ProbeException(Exception):
+    pass
@@ -0,0 +1,270 @@
+import asyncio
+import collections
+import errno
+import fnmatch
+import functools
+import os
+import struct
+
+
+IN_MODIFY = 0x2
+IN_ATTRIB = 0x4
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_DELETE_SELF = 0x400
+IN_MOVE_SELF = 0x800
+IN_Q_OVERFLOW = 0x4000
+IN_IGNORED = 0x8000
+IN_ONLYDIR = 0x1000000
+IN_ISDIR = 0x40000000
+
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+
+# struct inotify_event, followed by `len` bytes of the NUL-padded name
+INOTIFY_EVENT = struct.Struct('=iIII')
+READ_SIZE = 65536
+
+Event = collections.namedtuple('Event', ['wd', 'mask', 'cookie', 'name'])
+
+
+@functools.lru_cache()
+def load_libc():
+    # Imported lazily, as most runs of Procenv do not watch files.
+    import ctypes
+    import ctypes.util
+
+    libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+    libc.inotify_init1.argtypes = [ctypes.c_int]
+    libc.inotify_add_watch.argtypes = [
+        ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32,
+    ]
+    libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+    return libc
+
+
+def check_call(result):
+    if result < 0:
+        import ctypes
+
+        error = ctypes.get_errno()
+        raise OSError(error, os.strerror(error))
+
+    return result
+
+
+def parse_events(data):
+    """
+    Parse the `inotify_event` structs read from an inotify file descriptor
+    into `Event` tuples.
+    """
+    events = []
+    offset = 0
+
+    while offset + INOTIFY_EVENT.size <= len(data):
+        wd, mask, cookie, length = INOTIFY_EVENT.unpack_from(data, offset)
+        offset += INOTIFY_EVENT.size
+        name = data[offset:offset + length].rstrip(b'\0')
+        offset += length
+        events.append(Event(wd, mask, cookie, os.fsdecode(name)))
+
+    return events
+
+
+class Inotify:
+    """
+    A non-blocking inotify instance (Linux only), whose file descriptor can
+    be watched by the event loop. Creating one raises `OSError` where inotify
+    is not available.
+    """
+
+    def __init__(self):
+        try:
+            self.libc = load_libc()
+            init = self.libc.inotify_init1
+        except (AttributeError, OSError, TypeError):
+            raise OSError(errno.ENOSYS, 'inotify is not available')
+
+        self.fd = check_call(init(IN_NONBLOCK | IN_CLOEXEC))
+
+    def fileno(self):
+        return self.fd
+
+    def add_watch(self, path, mask):
+        """
+        Watch the given path for the events of the given mask and return the
+        watch descriptor, which identifies the events of the path.
+        """
+        return check_call(
+            self.libc.inotify_add_watch(self.fd, os.fsencode(path), mask),
+        )
+
+    def rm_watch(self, wd):
+        try:
+            check_call(self.libc.inotify_rm_watch(self.fd, wd))
+        except OSError:
+            # The watch is gone already (e.g. its path got deleted).
+            pass
+
+    def read_events(self):
+        """
+        Return the events queued up so far, without blocking.
+        """
+        events = []
+
+        while True:
+            try:
+                data = os.read(self.fd, READ_SIZE)
+            except BlockingIOError:
+                return events
+
+            if not data:
+                return events
+
+            events.extend(parse_events(data))
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+class TreeWatcher:
+    """
+    The `TreeWatcher` class watches a directory tree for changes with a
+    single inotify instance and a watch for each directory that is not being
+    ignored. The tree gets walked once, when starting; directories created
+    later get watched as their creation gets reported, so that large trees
+    never get scanned again.
+
+    Changes get reported to `callback` as a set of paths relative to the
+    root, once no more changes have happened for `debounce` seconds, so that
+    bursts of changes (e.g. checking out a branch) get reported at once. The
+    paths are `None` when changes might have been missed, as the event queue
+    of inotify overflowed.
+    """
+    mask = (
+        IN_CLOSE_WRITE | IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO |
+        IN_ONLYDIR
+    )
+
+    def __init__(self, root, callback, ignore=(), debounce=0.2, loop=None):
+        self.root = root
+        self.callback = callback
+        self.ignore = tuple(ignore)
+        self.debounce = debounce
+        self.loop = loop or asyncio.get_event_loop()
+        self.inotify = None
+        self.directories = {}
+        self.changes = set()
+        self.handle = None
+        self.error = None
+
+    def is_ignored(self, path):
+        """
+        Return whether the given relative path, or any of its components,
+        matches any of the ignore patterns (e.g. `node_modules` or `*.pyc`).
+        """
+        parts = path.split(os.sep)
+        return any(
+            fnmatch.fnmatch(name, pattern)
+            for pattern in self.ignore
+            for name in [path] + parts
+        )
+
+    def add_tree(self, path):
+        """
+        Watch the directory at the given relative path and all directories
+        under it, apart from the ignored ones and symbolic links. Errors
+        (e.g. reaching the limit of watches) are kept in `error`, leaving the
+        rest of the tree unwatched.
+        """
+        stack = [path]
+
+        while stack:
+            path = stack.pop()
+
+            try:
+                wd = self.inotify.add_watch(
+                    os.path.join(self.root, path), self.mask,
+                )
+                entries = list(os.scandir(os.path.join(self.root, path)))
+            except OSError as err:
+                if err.errno == errno.ENOSPC:
+                    self.error = err
+                    return
+
+                # The directory got deleted or replaced in the meantime.
+                continue
+
+            self.directories[wd] = path
+
+            for entry in entries:
+                child = os.path.normpath(os.path.join(path, entry.name))
+
+                if (
+                    entry.is_dir(follow_symlinks=False) and
+                    not self.is_ignored(child)
+                ):
+                    stack.append(child)
+
+    def start(self):
+        self.inotify = Inotify()
+        self.add_tree('.')
+        self.loop.add_reader(self.inotify.fileno(), self.read_events)
+
+    def stop(self):
+        if self.handle is not None:
+            self.handle.cancel()
+            self.handle = None
+
+        if self.inotify is not None:
+            self.loop.remove_reader(self.inotify.fileno())
+            self.inotify.close()
+            self.inotify = None
+
+    def read_events(self):
+        for event in self.inotify.read_events():
+            if event.mask & IN_Q_OVERFLOW:
+                # Directories created meanwhile might have been missed too.
+                self.changes = None
+                self.add_tree('.')
+                continue
+
+            if event.mask & IN_IGNORED:
+                self.directories.pop(event.wd, None)
+                continue
+
+            directory = self.directories.get(event.wd)
+
+            if directory is None or not event.name:
+                continue
+
+            path = os.path.normpath(os.path.join(directory, event.name))
+
+            if self.is_ignored(path):
+                continue
+
+            created = event.mask & (IN_CREATE | IN_MOVED_TO)
+
+            if event.mask & IN_ISDIR and created:
+                self.add_tree(path)
+
+            if self.changes is not None:
+                self.changes.add(path)
+
+            if self.handle is not None:
+                self.handle.cancel()
+
+            self.handle = self.loop.call_later(self.debounce, self.flush)
+
+        if self.changes is None and self.handle is None:
+            self.handle = self.loop.call_later(self.debounce, self.flush)
+
+    def flush(self):
+        changes, self.changes = self.changes, set()
+        self.handle = None
+        self.callback(changes)
@@ -0,0 +1,140 @@
+import asyncio
+import os
+import struct
+import tempfile
+import unittest
+
+from . import inotify
+
+
+def test_parse_events():
+    """
+    Make sure that events are parsed along with their names, stripped of
+    their NUL padding.
+    """
+    data = (
+        struct.pack('=iIII', 1, inotify.IN_CLOSE_WRITE, 0, 16) +
+        b'Procfile\0\0\0\0\0\0\0\0' +
+        struct.pack('=iIII', 2, inotify.IN_DELETE_SELF, 0, 0)
+    )
+
+    assert inotify.parse_events(data) == [
+        inotify.Event(1, inotify.IN_CLOSE_WRITE, 0, 'Procfile'),
+        inotify.Event(2, inotify.IN_DELETE_SELF, 0, ''),
+    ]
+
+
+class InotifyTest(unittest.TestCase):
+    def setUp(self):
+        try:
+            self.inotify = inotify.Inotify()
+        except OSError:
+            raise unittest.SkipTest('inotify is not available')
+
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.inotify.close()
+        self.temp_dir.cleanup()
+
+    def test_read_events(self):
+        """
+        Ensure that the events of a watched directory are read without
+        blocking.
+        """
+        wd = self.inotify.add_watch(
+            self.temp_dir.name, inotify.IN_CLOSE_WRITE | inotify.IN_MOVED_TO,
+        )
+        assert self.inotify.read_events() == []
+
+        path = os.path.join(self.temp_dir.name, 'Procfile')
+
+        with open(path, 'w') as procfile:
+            procfile.write('web: sleep 1\n')
+
+        os.rename(path, path + '.dev')
+        events = self.inotify.read_events()
+
+        assert [(event.wd, event.mask, event.name) for event in events] == [
+            (wd, inotify.IN_CLOSE_WRITE, 'Procfile'),
+            (wd, inotify.IN_MOVED_TO, 'Procfile.dev'),
+        ]
+
+    def test_add_watch_inexistent(self):
+        """
+        Ensure that watching a path that does not exist raises `OSError`.
+        """
+        path = os.path.join(self.temp_dir.name, 'inexistent')
+        self.assertRaises(OSError, self.inotify.add_watch, path, 0xfff)
+
+
+class TreeWatcherTest(unittest.TestCase):
+    def setUp(self):
+        try:
+            inotify.Inotify().close()
+        except OSError:
+            raise unittest.SkipTest('inotify is not available')
+
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.loop = asyncio.new_event_loop()
+        self.changes = []
+        self.watcher = inotify.TreeWatcher(
+            self.temp_dir.name,
+            self.changes.append,
+            ignore=('node_modules', '*.pyc'),
+            debounce=0.05,
+            loop=self.loop,
+        )
+
+        for path in ('app/models', 'node_modules/left-pad'):
+            os.makedirs(os.path.join(self.temp_dir.name, path))
+
+    def tearDown(self):
+        self.watcher.stop()
+        self.loop.close()
+        self.temp_dir.cleanup()
+
+    def write(self, path):
+        with open(os.path.join(self.temp_dir.name, path), 'w') as f:
+            f.write('hello')
+
+    def test_is_ignored(self):
+        """
+        Ensure that paths are ignored if any of their components matches any
+        of the ignore patterns.
+        """
+        assert self.watcher.is_ignored('node_modules') is True
+        assert self.watcher.is_ignored('node_modules/left-pad/index.js')
+        assert self.watcher.is_ignored('app/models/user.pyc') is True
+        assert self.watcher.is_ignored('app/models/user.py') is False
+
+    def test_watch(self):
+        """
+        Ensure that the directories of the tree are watched, apart from the
+        ignored ones, and that bursts of changes get reported at once,
+        including the ones in directories created later.
+        """
+        self.watcher.start()
+
+        assert sorted(self.watcher.directories.values()) == [
+            '.', 'app', 'app/models',
+        ]
+
+        async def change():
+            self.write('app/models/user.py')
+            self.write('app/models/user.pyc')
+            self.write('node_modules/left-pad/index.js')
+            os.mkdir(os.path.join(self.temp_dir.name, 'app/views'))
+            await asyncio.sleep(0.01)
+            self.write('app/views/user.py')
+            await asyncio.sleep(0.2)
+            self.write('README')
+            await asyncio.sleep(0.2)
+
+        self.loop.run_until_complete(change())
+
+        assert self.changes == [
+            {'app/models/user.py', 'app/views', 'app/views/user.py'},
+            {'README'},
+        ]
+        assert 'app/views' in self.watcher.directories.values()
@@ -0,0 +1,185 @@
+import atexit
+import collections
+import contextvars
+import datetime
+import json
+import sys
+import threading
+
+
+# The name of the check running in the current context (if any), so that
+# messages logged by checks can be attributed to them.
+current_check = contextvars.ContextVar('current_check', default=None)
+# The name of the application of the current context (if any), when Procenv
+# runs many applications.
+current_app = contextvars.ContextVar('current_app', default=None)
+
+
+def format_text(code, message, check, timestamp, app=None):
+    message_prefix = '[Procenv Message]'
+
+    if app:
+        message_prefix = f'{message_prefix} [{app}]'
+
+    code_prefix = f' ({code})' if code else ''
+    prefix = f'{message_prefix}{code_prefix}'
+    return f'{prefix} {message}\n'
+
+
+def format_json(code, message, check, timestamp, app=None):
+    record = {
+        'timestamp': timestamp.isoformat(timespec='milliseconds'),
+        'code': code,
+        'component': code[:2] if code else None,
+        'status': f'{code[2]}X' if code else None,
+        'check': check,
+        'message': message,
+    }
+
+    if app:
+        record['app'] = app
+
+    return json.dumps(record, ensure_ascii=False) + '\n'
+
+
+FORMATTERS = {
+    'text': format_text,
+    'json': format_json,
+}
+
+
+class LogSink:
+    """
+    The `LogSink` class buffers Procenv messages in a bounded queue and
+    writes them to stderr in batches from a background thread, so that a slow
+    stderr (e.g. a pipe to a container log driver) never blocks the event
+    loop. When the queue is full, messages get dropped and counted, instead
+    of blocking their caller.
+
+    Messages of applications with a stream of their own (see `add_stream`)
+    get written to it, instead of stderr.
+    """
+
+    def __init__(self, log_format='text', max_queue_size=10000):
+        self.format = FORMATTERS[log_format]
+        self.max_queue_size = max_queue_size
+        self.queue = collections.deque()
+        self.condition = threading.Condition()
+        self.dropped = 0
+        self.writing = False
+        self.thread = None
+        self.streams = {}
+
+    def configure(self, log_format):
+        self.format = FORMATTERS[log_format]
+
+    def add_stream(self, app, stream):
+        """
+        Write the messages of the application with the given name to the
+        given text stream, instead of stderr.
+        """
+        self.streams[app] = stream
+
+    def emit(self, code, message, check=None, app=None):
+        timestamp = datetime.datetime.now(datetime.timezone.utc)
+        app = app or current_app.get()
+        line = self.format(code, message, check, timestamp, app=app)
+
+        with self.condition:
+            if len(self.queue) >= self.max_queue_size:
+                self.dropped += 1
+                return
+
+            self.queue.append((app, line))
+            self.condition.notify_all()
+
+            if self.thread is None:
+                self.thread = threading.Thread(
+                    target=self.run, name='procenv-log-sink', daemon=True,
+                )
+                self.thread.start()
+
+    def take_batch(self):
+        """
+        Wait for queued messages and return all of them, along with the number
+        of messages dropped since the last batch.
+        """
+        with self.condition:
+            self.condition.wait_for(lambda: self.queue or self.dropped)
+            batch = list(self.queue)
+            self.queue.clear()
+            dropped, self.dropped = self.dropped, 0
+            self.writing = True
+
+        return batch, dropped
+
+    def write(self, batch, dropped):
+        if dropped:
+            batch.append((
+                None,
+                self.format(
+                    'PE53',
+                    f'{dropped} Procenv messages were dropped, because '
+                    'stderr could not keep up',
+                    None,
+                    datetime.datetime.now(datetime.timezone.utc),
+                ),
+            ))
+
+        lines_by_stream = collections.OrderedDict()
+
+        for app, line in batch:
+            # Look up stderr on every write, as it might have been replaced.
+            stream = self.streams.get(app) or sys.stderr
+            lines_by_stream.setdefault(stream, []).append(line)
+
+        for stream, lines in lines_by_stream.items():
+            stream.write(''.join(lines))
+            stream.flush()
+
+    def run(self):
+        while True:
+            batch, dropped = self.take_batch()
+
+            try:
+                self.write(batch, dropped)
+            except Exception:
+                # There is nowhere left to report errors of stderr to.
+                pass
+            finally:
+                with self.condition:
+                    self.writing = False
+                    self.condition.notify_all()
+
+    def flush(self, timeout=None):
+        """
+        Wait until all queued messages have been written, for up to `timeout`
+        seconds. Return whether the queue got flushed.
+        """
+        with self.condition:
+            return self.condition.wait_for(
+                lambda: not (self.queue or self.dropped or self.writing),
+                timeout,
+            )
+
+    def close_streams(self, timeout=None):
+        """
+        Wait until all queued messages have been written, for up to `timeout`
+        seconds, and close the streams of applications; any later messages
+        of theirs get written to stderr.
+        """
+        with self.condition:
+            self.condition.wait_for(
+                lambda: not (self.queue or self.dropped or self.writing),
+                timeout,
+            )
+            # Swapped while no batch is being written, so that no batch gets
+            # written to a closed stream.
+            streams, self.streams = self.streams, {}
+
+        for stream in streams.values():
+            stream.close()
+
+
+sink = LogSink()
+atexit.register(sink.flush, timeout=5)
@@ -0,0 +1,167 @@
+from unittest import mock
+import datetime
+import json
+import threading
+import time
+import unittest
+
+from . import logs
+
+
+TIMESTAMP = datetime.datetime(
+    2018, 2, 1, 13, 4, 24, tzinfo=datetime.timezone.utc,
+)
+
+
+def test_format_text():
+    """
+    Make sure that the text format is the one of Procenv Messages.
+    """
+    line = logs.format_text('PB20', 'Hey mark', 'PortBindCheck', TIMESTAMP)
+    assert line == '[Procenv Message] (PB20) Hey mark\n'
+
+    line = logs.format_text(None, 'Hey mark', None, TIMESTAMP)
+    assert line == '[Procenv Message] Hey mark\n'
+
+    # Messages of applications get tagged with their name, when Procenv runs
+    # many applications.
+    line = logs.format_text('PB20', 'Hey mark', None, TIMESTAMP, app='blog')
+    assert line == '[Procenv Message] [blog] (PB20) Hey mark\n'
+
+
+def test_format_json():
+    """
+    Make sure that the JSON format writes a JSON object per line, with the
+    components of the code of the message split out.
+    """
+    line = logs.format_json('PB40', 'Hey mark', 'PortBindCheck', TIMESTAMP)
+    assert line.endswith('\n')
+    assert json.loads(line) == {
+        'timestamp': '2018-02-01T13:04:24.000+00:00',
+        'code': 'PB40',
+        'component': 'PB',
+        'status': '4X',
+        'check': 'PortBindCheck',
+        'message': 'Hey mark',
+    }
+
+    line = logs.format_json('PB40', 'Hey mark', None, TIMESTAMP, app='blog')
+    assert json.loads(line)['app'] == 'blog'
+
+
+class LogSinkTest(unittest.TestCase):
+    def test_emit_and_flush(self):
+        """
+        Ensure that emitted messages get written in order and in batches by
+        a background thread.
+        """
+        sink = logs.LogSink()
+
+        with mock.patch('sys.stderr') as stderr_mock:
+            for i in range(100):
+                sink.emit('PE99', f'Message {i}')
+
+            assert sink.flush(timeout=5) is True
+
+        written = ''.join(
+            call[0][0] for call in stderr_mock.write.call_args_list
+        )
+        assert written == ''.join(
+            f'[Procenv Message] (PE99) Message {i}\n' for i in range(100)
+        )
+        assert stderr_mock.write.call_count < 100
+        assert sink.thread.daemon is True
+
+    def test_emit_does_not_block(self):
+        """
+        Ensure that a blocked stderr does not block emitting messages and
+        that messages exceeding the size of the queue get dropped and
+        reported.
+        """
+        sink = logs.LogSink(log_format='json', max_queue_size=10)
+        unblock = threading.Event()
+        writes = []
+
+        def blocking_write(data):
+            unblock.wait(5)
+            writes.append(data)
+
+        with mock.patch('sys.stderr') as stderr_mock:
+            stderr_mock.write.side_effect = blocking_write
+            sink.emit('PE99', 'First message')
+
+            # Wait for the writer thread to block on the first batch
+            while not writes and not stderr_mock.write.called:
+                time.sleep(0.001)
+
+            for i in range(20):
+                sink.emit('PE99', f'Message {i}')
+
+            unblock.set()
+            assert sink.flush(timeout=5) is True
+
+        records = [
+            json.loads(line)
+            for line in ''.join(writes).splitlines()
+        ]
+        assert len(records) == 12
+        assert records[-1]['code'] == 'PE53'
+        assert records[-1]['message'] == (
+            '10 Procenv messages were dropped, because stderr could not keep '
+            'up'
+        )
+
+    def test_add_stream(self):
+        """
+        Ensure that messages of applications with a stream of their own get
+        written to it and the rest of them to stderr, attributed to the
+        application of the current context by default.
+        """
+        sink = logs.LogSink()
+        blog_stream = mock.MagicMock()
+        sink.add_stream('blog', blog_stream)
+
+        with mock.patch('sys.stderr') as stderr_mock:
+            sink.emit('PE99', 'To stderr')
+            sink.emit('PE99', 'To the blog', app='blog')
+            token = logs.current_app.set('blog')
+            sink.emit('PE99', 'To the blog too')
+            logs.current_app.reset(token)
+            sink.emit('PE99', 'To the shop', app='shop')
+            assert sink.flush(timeout=5) is True
+
+        stderr = ''.join(
+            call[0][0] for call in stderr_mock.write.call_args_list
+        )
+        blog = ''.join(call[0][0] for call in blog_stream.write.call_args_list)
+        assert stderr == (
+            '[Procenv Message] (PE99) To stderr\n'
+            '[Procenv Message] [shop] (PE99) To the shop\n'
+        )
+        assert blog == (
+            '[Procenv Message] [blog] (PE99) To the blog\n'
+            '[Procenv Message] [blog] (PE99) To the blog too\n'
+        )
+
+    def test_close_streams(self):
+        """
+        Ensure that the streams of applications get closed once the queued
+        messages get written, with any later messages going to stderr.
+        """
+        sink = logs.LogSink()
+        blog_stream = mock.MagicMock()
+        sink.add_stream('blog', blog_stream)
+
+        with mock.patch('sys.stderr') as stderr_mock:
+            sink.emit('PE99', 'To the blog', app='blog')
+            sink.close_streams(timeout=5)
+            sink.emit('PE99', 'To stderr', app='blog')
+            assert sink.flush(timeout=5) is True
+
+        blog_stream.write.assert_called_once_with(
+            '[Procenv Message] [blog] (PE99) To the blog\n',
+        )
+        blog_stream.close.assert_called_once_with()
+        stderr_mock.write.assert_called_once_with(
+            '[Procenv Message] [blog] (PE99) To stderr\n',
+        )
@@ -0,0 +1,350 @@
+import asyncio
+import bisect
+import math
+
+from . import utils
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10)
+
+
+def format_value(value):
+    if isinstance(value, int):
+        return str(value)
+    if math.isnan(value):
+        return 'NaN'
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(value)
+
+
+def escape_label_value(value):
+    return (
+        str(value)
+        .replace('\\', '\\\\')
+        .replace('"', '\\"')
+        .replace('\n', '\\n')
+    )
+
+
+class Metric:
+    """
+    Base class of metrics in the Prometheus text format. Each metric keeps
+    its samples by the values of its labels and caches its rendered text,
+    until one of its samples changes, so that scrapes of metrics that have
+    not changed cost just a lookup.
+    """
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.labelnames = labelnames
+        self.header = (
+            f'# HELP {name} {documentation}\n# TYPE {name} {self.type}\n'
+        ).encode()
+        self.series = {}
+        self.labels = {}
+        self.rendered = None
+
+    def format_labels(self, label_values, extra=''):
+        # Labels whose value is `None` are left out, which Prometheus treats
+        # as empty (e.g. the application, when Procenv runs just one).
+        labels = ','.join(
+            f'{name}="{escape_label_value(value)}"'
+            for name, value in zip(self.labelnames, label_values)
+            if value is not None
+        )
+
+        if extra:
+            labels = f'{labels},{extra}' if labels else extra
+
+        return f'{{{labels}}}' if labels else ''
+
+    def get_labels(self, label_values):
+        labels = self.labels.get(label_values)
+
+        if labels is None:
+            labels = self.labels[label_values] = self.format_labels(
+                label_values,
+            )
+
+        return labels
+
+    def render_series(self):
+        for label_values, value in self.series.items():
+            yield (
+                f'{self.name}{self.get_labels(label_values)} '
+                f'{format_value(value)}\n'
+            )
+
+    def render(self):
+        if self.rendered is None:
+            self.rendered = self.header + ''.join(
+                self.render_series(),
+            ).encode()
+
+        return self.rendered
+
+
+class Gauge(Metric):
+    """
+    A metric whose value can go up and down. The series of a gauge can be
+    bound to a function instead, which gets called on every scrape.
+    """
+    type = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self.functions = {}
+
+    def set(self, value, *label_values):
+        self.series[label_values] = value
+        self.rendered = None
+
+    def set_function(self, function, *label_values):
+        self.functions[label_values] = function
+        self.rendered = None
+
+    def render_series(self):
+        yield from super().render_series()
+
+        for label_values, function in self.functions.items():
+            yield (
+                f'{self.name}{self.get_labels(label_values)} '
+                f'{format_value(function())}\n'
+            )
+
+    def render(self):
+        if not self.functions:
+            return super().render()
+
+        return self.header + ''.join(self.render_series()).encode()
+
+
+class Counter(Metric):
+    """
+    A metric whose value only goes up.
+    """
+    type = 'counter'
+
+    def inc(self, *label_values, amount=1):
+        self.series[label_values] = self.series.get(label_values, 0) + amount
+        self.rendered = None
+
+
+class Histogram(Metric):
+    """
+    A metric counting observations in cumulative buckets, along with their
+    sum and count.
+    """
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(),
+                 buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        self.bucket_labels = {}
+
+    def observe(self, value, *label_values):
+        series = self.series.get(label_values)
+
+        if series is None:
+            # The counts of every bucket (plus `+Inf`), followed by the sum.
+            series = self.series[label_values] = [0] * (len(self.buckets) + 2)
+
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+        self.rendered = None
+
+    def get_bucket_labels(self, label_values):
+        bucket_labels = self.bucket_labels.get(label_values)
+
+        if bucket_labels is None:
+            bucket_labels = self.bucket_labels[label_values] = [
+                self.format_labels(label_values, f'le="{format_value(le)}"')
+                for le in self.buckets + (float('inf'),)
+            ]
+
+        return bucket_labels
+
+    def render_series(self):
+        for label_values, series in self.series.items():
+            count = 0
+
+            for labels, bucket_count in zip(
+                self.get_bucket_labels(label_values), series,
+            ):
+                count += bucket_count
+                yield f'{self.name}_bucket{labels} {count}\n'
+
+            labels = self.get_labels(label_values)
+            yield f'{self.name}_sum{labels} {format_value(series[-1])}\n'
+            yield f'{self.name}_count{labels} {count}\n'
+
+
+class Registry:
+    """
+    A collection of metrics, rendered together on every scrape.
+    """
+
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        return b''.join([metric.render() for metric in self.metrics])
+
+
+registry = Registry()
+
+check_status = registry.register(
+    Gauge(
+        'procenv_check_status',
+        'Last result of each check (1 for success, 0 for failure).',
+        ('check',),
+    ),
+)
+check_duration = registry.register(
+    Histogram(
+        'procenv_check_duration_seconds',
+        'Duration of the runs of each check, by stage.',
+        ('check', 'stage'),
+    ),
+)
+time_to_bind = registry.register(
+    Gauge(
+        'procenv_time_to_bind_seconds',
+        'Seconds from starting each application until it bound to its port.',
+        ('app',),
+    ),
+)
+process_restarts = registry.register(
+    Counter(
+        'procenv_process_restarts_total',
+        'Number of times each process of the application got restarted.',
+        ('process',),
+    ),
+)
+http_responses = registry.register(
+    Counter(
+        'procenv_http_responses_total',
+        'Responses of the application to the requests of HttpHealthCheck, '
+        'by status code.',
+        ('status',),
+    ),
+)
+http_latency = registry.register(
+    Histogram(
+        'procenv_http_latency_seconds',
+        'Latency of the responses of the application to the requests of '
+        'HttpHealthCheck.',
+    ),
+)
+check_blocking = registry.register(
+    Histogram(
+        'procenv_check_blocking_seconds',
+        'Time each step of the checks held the event loop of Procenv for, by '
+        'method.',
+        ('check', 'method'),
+    ),
+)
+event_loop_lag = registry.register(
+    Histogram(
+        'procenv_event_loop_lag_seconds',
+        'Delay of the timers of the event loop of Procenv.',
+    ),
+)
+application_uptime = registry.register(
+    Gauge(
+        'procenv_application_uptime_seconds',
+        'Seconds since each application got started.',
+        ('app',),
+    ),
+)
+
+
+class MetricsServer:
+    """
+    A minimal HTTP/1.1 server, serving the metrics of a registry at
+    `/metrics` from the event loop of Procenv, with keep-alive connections
+    so that frequent scrapes do not need a new connection each.
+    """
+
+    def __init__(self, host, port, registry=registry):
+        self.host = host
+        self.port = port
+        self.registry = registry
+        self.server = None
+
+    def build_response(self, status, body, content_type=CONTENT_TYPE):
+        headers = (
+            f'HTTP/1.1 {status}\r\n'
+            f'Content-Type: {content_type}\r\n'
+            f'Content-Length: {len(body)}\r\n'
+            '\r\n'
+        )
+        return headers.encode() + body
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+
+                if not request_line:
+                    break
+
+                # Skip the headers; requests to the metrics have no body.
+                while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    pass
+
+                method, path, *_ = request_line.decode('latin-1').split()
+
+                if method != 'GET':
+                    response = self.build_response(
+                        '405 Method Not Allowed', b'', 'text/plain',
+                    )
+                elif path.split('?', 1)[0] == '/metrics':
+                    response = self.build_response(
+                        '200 OK', self.registry.render(),
+                    )
+                else:
+                    response = self.build_response(
+                        '404 Not Found', b'', 'text/plain',
+                    )
+
+                writer.write(response)
+                await writer.drain()
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self):
+        """
+        Start serving the metrics. Log a message and carry on without them if
+        the port cannot be bound.
+        """
+        try:
+            self.server = await asyncio.start_server(
+                self.handle, self.host, self.port,
+            )
+        except OSError as e:
+            utils.log(
+                'PE41',
+                f'Cannot serve metrics on {self.host}:{self.port}: '
+                f'{e.strerror}',
+            )
+            return
+
+        utils.log(
+            'PE13',
+            f'Serving metrics on http://{self.host}:{self.port}/metrics',
+        )
+
+    def close(self):
+        if self.server is not None:
+            self.server.close()
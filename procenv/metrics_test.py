@@ -0,0 +1,175 @@
+from unittest import mock
+import asyncio
+import socket
+import unittest
+
+from . import metrics
+
+
+def test_format_value():
+    """
+    Make sure that values are formatted as the Prometheus text format
+    expects.
+    """
+    assert metrics.format_value(3) == '3'
+    assert metrics.format_value(0.25) == '0.25'
+    assert metrics.format_value(float('nan')) == 'NaN'
+    assert metrics.format_value(float('inf')) == '+Inf'
+
+
+def test_gauge():
+    """
+    Make sure that gauges render a sample per set of labels, with their
+    values escaped, and that rendering is cached until a sample changes.
+    """
+    gauge = metrics.Gauge('procenv_test', 'A test gauge.', ('check',))
+    gauge.set(1, 'PortBindCheck')
+    gauge.set(0, 'My "quoted"\\Check')
+    rendered = gauge.render()
+
+    assert rendered == (
+        b'# HELP procenv_test A test gauge.\n'
+        b'# TYPE procenv_test gauge\n'
+        b'procenv_test{check="PortBindCheck"} 1\n'
+        b'procenv_test{check="My \\"quoted\\"\\\\Check"} 0\n'
+    )
+    assert gauge.render() is rendered
+
+    gauge.set(0, 'PortBindCheck')
+    assert b'procenv_test{check="PortBindCheck"} 0\n' in gauge.render()
+
+
+def test_gauge_function():
+    """
+    Make sure that gauges bound to a function call it on every render.
+    """
+    gauge = metrics.Gauge('procenv_uptime', 'Uptime.')
+    gauge.set_function(mock.Mock(side_effect=[1.5, 2.5]))
+
+    assert gauge.render().endswith(b'procenv_uptime 1.5\n')
+    assert gauge.render().endswith(b'procenv_uptime 2.5\n')
+
+
+def test_gauge_function_labels():
+    """
+    Make sure that each series of a gauge can be bound to a function of its
+    own, with labels whose value is `None` left out.
+    """
+    gauge = metrics.Gauge('procenv_uptime', 'Uptime.', ('app',))
+    gauge.set_function(lambda: 1.5, 'blog')
+    gauge.set_function(lambda: 2.5, 'shop')
+    gauge.set_function(lambda: 3.5, None)
+
+    assert gauge.render().endswith(
+        b'procenv_uptime{app="blog"} 1.5\n'
+        b'procenv_uptime{app="shop"} 2.5\n'
+        b'procenv_uptime 3.5\n',
+    )
+
+
+def test_counter():
+    """
+    Make sure that counters add up per set of labels.
+    """
+    counter = metrics.Counter('procenv_restarts_total', 'Restarts.', ('p',))
+    counter.inc('web.1', amount=0)
+    counter.inc('worker.1')
+    counter.inc('worker.1')
+
+    assert counter.render().endswith(
+        b'procenv_restarts_total{p="web.1"} 0\n'
+        b'procenv_restarts_total{p="worker.1"} 2\n'
+    )
+
+
+def test_histogram():
+    """
+    Make sure that histograms render cumulative buckets, their sum and
+    their count.
+    """
+    histogram = metrics.Histogram(
+        'procenv_duration_seconds', 'Durations.', ('check',),
+        buckets=(0.1, 1),
+    )
+
+    for value in (0.05, 0.1, 0.5, 2):
+        histogram.observe(value, 'PortBindCheck')
+
+    assert histogram.render().endswith(
+        b'procenv_duration_seconds_bucket{check="PortBindCheck",le="0.1"} 2\n'
+        b'procenv_duration_seconds_bucket{check="PortBindCheck",le="1"} 3\n'
+        b'procenv_duration_seconds_bucket{check="PortBindCheck",le="+Inf"} 4\n'
+        b'procenv_duration_seconds_sum{check="PortBindCheck"} 2.65\n'
+        b'procenv_duration_seconds_count{check="PortBindCheck"} 4\n'
+    )
+
+
+def test_registry():
+    """
+    Make sure that the registry renders all of its metrics.
+    """
+    registry = metrics.Registry()
+    gauge = registry.register(metrics.Gauge('procenv_a', 'A.'))
+    counter = registry.register(metrics.Counter('procenv_b', 'B.'))
+    gauge.set(1)
+    counter.inc()
+
+    assert registry.render() == gauge.render() + counter.render()
+
+
+class MetricsServerTest(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.get_event_loop()
+        self.registry = metrics.Registry()
+        gauge = self.registry.register(metrics.Gauge('procenv_a', 'A.'))
+        gauge.set(1)
+
+    def test_serve(self):
+        """
+        Integration test: Make sure that metrics get served at `/metrics`,
+        over a connection that is kept alive across requests.
+        """
+        server = metrics.MetricsServer('127.0.0.1', 0, self.registry)
+
+        async def scrape():
+            await server.start()
+            port = server.server.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            responses = []
+
+            for path in ('/metrics', '/metrics?x=1', '/'):
+                writer.write(
+                    f'GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n'.encode(),
+                )
+                headers = await reader.readuntil(b'\r\n\r\n')
+                length = int(headers.split(b'Content-Length: ')[1].split()[0])
+                responses.append((headers, await reader.readexactly(length)))
+
+            writer.close()
+            server.close()
+            return responses
+
+        with mock.patch('procenv.utils.log'):
+            responses = self.loop.run_until_complete(scrape())
+
+        for headers, body in responses[:2]:
+            assert headers.startswith(b'HTTP/1.1 200 OK\r\n')
+            assert body == self.registry.render()
+
+        assert responses[2][0].startswith(b'HTTP/1.1 404 Not Found\r\n')
+
+    def test_start_port_in_use(self):
+        """
+        Ensure that a message is logged when the port cannot be bound.
+        """
+        sock = socket.socket()
+        sock.bind(('127.0.0.1', 0))
+        sock.listen()
+        port = sock.getsockname()[1]
+        server = metrics.MetricsServer('127.0.0.1', port, self.registry)
+
+        with sock, mock.patch('procenv.utils.log') as log_mock:
+            self.loop.run_until_complete(server.start())
+
+        assert server.server is None
+        assert log_mock.call_args[0][0] == 'PE41'
@@ -0,0 +1,153 @@
+import socket
+import struct
+
+
+NETLINK_SOCK_DIAG = 4
+SOCK_DIAG_BY_FAMILY = 20
+
+NLM_F_REQUEST = 0x1
+NLM_F_DUMP = 0x300
+NLMSG_ERROR = 0x2
+NLMSG_DONE = 0x3
+
+TCP_LISTEN = 10
+INET_DIAG_REQ_BYTECODE = 1
+INET_DIAG_BC_S_GE = 2
+INET_DIAG_BC_S_LE = 3
+
+# struct nlmsghdr
+NLMSGHDR = struct.Struct('=IHHII')
+# struct inet_diag_req_v2, with an empty struct inet_diag_sockid
+INET_DIAG_REQ_V2 = struct.Struct('=BBBxI48x')
+# struct rtattr
+RTATTR = struct.Struct('=HH')
+# struct inet_diag_bc_op
+INET_DIAG_BC_OP = struct.Struct('=BBH')
+# The source port of struct inet_diag_msg, in network byte order
+INET_DIAG_MSG_SPORT = struct.Struct('!4xH')
+
+
+def build_port_filter(port, max_port=None):
+    """
+    Return the `inet_diag` bytecode that makes the kernel report only the
+    sockets with the given source port, or with a source port in the range
+    from `port` up to `max_port` (i.e. `port <= sport <= max_port`).
+    """
+    max_port = port if max_port is None else max_port
+    op_size = INET_DIAG_BC_OP.size
+    length = op_size * 4
+    # On a failed comparison, jump past the end of the bytecode to reject
+    # the socket.
+    return b''.join([
+        INET_DIAG_BC_OP.pack(INET_DIAG_BC_S_GE, op_size * 2, length + 4),
+        INET_DIAG_BC_OP.pack(0, 0, port),
+        INET_DIAG_BC_OP.pack(
+            INET_DIAG_BC_S_LE, op_size * 2, length - op_size * 2 + 4,
+        ),
+        INET_DIAG_BC_OP.pack(0, 0, max_port),
+    ])
+
+
+def build_listening_sockets_request(family, port, seq=0, max_port=None):
+    """
+    Return a `SOCK_DIAG_BY_FAMILY` request dumping the TCP sockets of the
+    given address family in the LISTEN state, filtered by port (or range of
+    ports) in the kernel.
+    """
+    bytecode = build_port_filter(port, max_port)
+    attribute = RTATTR.pack(
+        RTATTR.size + len(bytecode), INET_DIAG_REQ_BYTECODE,
+    )
+    request = INET_DIAG_REQ_V2.pack(
+        family, socket.IPPROTO_TCP, 0, 1 << TCP_LISTEN,
+    )
+    payload = request + attribute + bytecode
+    header = NLMSGHDR.pack(
+        NLMSGHDR.size + len(payload),
+        SOCK_DIAG_BY_FAMILY,
+        NLM_F_REQUEST | NLM_F_DUMP,
+        seq,
+        0,
+    )
+    return header + payload
+
+
+class SockDiagSocket:
+    """
+    A client of the `NETLINK_SOCK_DIAG` interface of the Linux kernel, which
+    finds out if a TCP socket listens to a port, without touching the port or
+    reading the whole socket table of the system. The netlink socket is kept
+    open, so that each query costs just a couple of system calls.
+    """
+    families = (socket.AF_INET, socket.AF_INET6)
+    buffer_size = 8192
+
+    def __init__(self):
+        self.sock = socket.socket(
+            socket.AF_NETLINK, socket.SOCK_DGRAM, NETLINK_SOCK_DIAG,
+        )
+        self.seq = 0
+
+    def receive_ports(self, seq):
+        """
+        Receive the response of the request with the given sequence number
+        and return the source ports of the sockets reported in it.
+        """
+        ports = set()
+
+        while True:
+            data = self.sock.recv(self.buffer_size)
+            offset = 0
+
+            while offset + NLMSGHDR.size <= len(data):
+                length, msg_type, _, msg_seq, _ = NLMSGHDR.unpack_from(
+                    data, offset,
+                )
+
+                if msg_seq == seq:
+                    if msg_type == NLMSG_DONE:
+                        return ports
+                    if msg_type == NLMSG_ERROR:
+                        (error,) = struct.unpack_from(
+                            '=i', data, offset + NLMSGHDR.size,
+                        )
+                        raise OSError(-error, 'NETLINK_SOCK_DIAG error')
+                    if msg_type == SOCK_DIAG_BY_FAMILY:
+                        (port,) = INET_DIAG_MSG_SPORT.unpack_from(
+                            data, offset + NLMSGHDR.size,
+                        )
+                        ports.add(port)
+
+                # Messages are aligned to 4 bytes
+                offset += (length + 3) & ~3
+
+    def get_listening_ports(self, ports):
+        """
+        Return the subset of the given ports that TCP sockets listen to, with
+        a single query per address family for the range of the ports.
+        """
+        ports = set(ports)
+        listening_ports = set()
+
+        for family in self.families:
+            self.seq += 1
+            self.sock.send(
+                build_listening_sockets_request(
+                    family, min(ports), self.seq, max_port=max(ports),
+                ),
+            )
+            listening_ports |= self.receive_ports(self.seq) & ports
+
+            if listening_ports == ports:
+                break
+
+        return listening_ports
+
+    def is_listening(self, port):
+        """
+        Return whether a TCP socket listens to the given port.
+        """
+        return bool(self.get_listening_ports([port]))
+
+    def close(self):
+        self.sock.close()
@@ -0,0 +1,111 @@
+import socket
+import struct
+import unittest
+
+from . import netlink
+
+
+def test_build_port_filter():
+    """
+    Make sure that the port filter compares the source port of sockets
+    against the given port and rejects them by jumping past its end.
+    """
+    bytecode = netlink.build_port_filter(8000)
+    ops = [
+        struct.unpack_from('=BBH', bytecode, offset)
+        for offset in range(0, len(bytecode), 4)
+    ]
+    assert ops == [
+        (netlink.INET_DIAG_BC_S_GE, 8, 20),
+        (0, 0, 8000),
+        (netlink.INET_DIAG_BC_S_LE, 8, 12),
+        (0, 0, 8000),
+    ]
+
+
+def test_build_listening_sockets_request():
+    """
+    Make sure that the request dumps the listening TCP sockets of the given
+    family and carries the port filter as an attribute.
+    """
+    request = netlink.build_listening_sockets_request(
+        socket.AF_INET6, 8000, seq=42,
+    )
+    length, msg_type, flags, seq, pid = struct.unpack_from('=IHHII', request)
+
+    assert length == len(request) == 16 + 56 + 4 + 16
+    assert msg_type == netlink.SOCK_DIAG_BY_FAMILY
+    assert flags == netlink.NLM_F_REQUEST | netlink.NLM_F_DUMP
+    assert seq == 42
+    assert pid == 0
+
+    family, protocol, ext, states = struct.unpack_from('=BBBxI', request, 16)
+    assert family == socket.AF_INET6
+    assert protocol == socket.IPPROTO_TCP
+    assert states == 1 << netlink.TCP_LISTEN
+    assert request[-16:] == netlink.build_port_filter(8000)
+
+
+def test_build_port_filter_range():
+    """
+    Make sure that the port filter can compare against a range of ports.
+    """
+    bytecode = netlink.build_port_filter(8000, 8003)
+    assert struct.unpack_from('=H', bytecode, 6) == (8000,)
+    assert struct.unpack_from('=H', bytecode, 14) == (8003,)
+
+
+class SockDiagSocketTest(unittest.TestCase):
+    def setUp(self):
+        try:
+            self.sock_diag = netlink.SockDiagSocket()
+        except (AttributeError, OSError):
+            raise unittest.SkipTest('NETLINK_SOCK_DIAG is not available')
+
+    def tearDown(self):
+        self.sock_diag.close()
+
+    def test_is_listening(self):
+        """
+        Integration test: Make sure that `is_listening` reports only the ports
+        that sockets listen to.
+        """
+        for family, host in [
+            (socket.AF_INET, '127.0.0.1'), (socket.AF_INET6, '::1'),
+        ]:
+            try:
+                sock = socket.socket(family)
+                sock.bind((host, 0))
+            except OSError:
+                continue
+
+            with sock:
+                port = sock.getsockname()[1]
+                assert self.sock_diag.is_listening(port) is False
+                sock.listen()
+                assert self.sock_diag.is_listening(port) is True
+                assert self.sock_diag.is_listening(port + 1) is False
+
+    def test_get_listening_ports(self):
+        """
+        Integration test: Make sure that `get_listening_ports` reports the
+        listening ones of the given ports, ignoring the rest of the ports of
+        their range.
+        """
+        sockets = [socket.socket() for _ in range(3)]
+
+        for sock in sockets:
+            sock.bind(('127.0.0.1', 0))
+            sock.listen()
+
+        ports = sorted(sock.getsockname()[1] for sock in sockets)
+
+        try:
+            listening_ports = self.sock_diag.get_listening_ports(
+                [ports[0], ports[2], ports[2] + 1],
+            )
+        finally:
+            for sock in sockets:
+                sock.close()
+
+        assert listening_ports == {ports[0], ports[2]}
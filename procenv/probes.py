@@ -0,0 +1,448 @@
+import asyncio
+import struct
+import time
+
+from . import exceptions
+
+
+# The SSLRequest packet of the PostgreSQL protocol; the server answers it
+# with a single byte, before any authentication takes place.
+POSTGRES_SSL_REQUEST = struct.pack('!II', 8, 80877103)
+MYSQL_PROTOCOL_VERSION = 10
+MYSQL_ERROR_PACKET = 0xff
+
+
+class ProbeResult:
+    """
+    The outcome of a successful probe of a service, with its latencies in
+    seconds.
+    """
+
+    def __init__(self, host, port, connect_latency, handshake_latency=None,
+                 info=None):
+        self.host = host
+        self.port = port
+        self.connect_latency = connect_latency
+        self.handshake_latency = handshake_latency
+        self.info = info
+
+    def __str__(self):
+        latencies = f'connect: {self.connect_latency * 1000:.1f}ms'
+
+        if self.handshake_latency is not None:
+            latencies += f', handshake: {self.handshake_latency * 1000:.1f}ms'
+
+        return latencies
+
+
+async def handshake_postgres(reader, writer):
+    """
+    Send an SSLRequest to a PostgreSQL server and make sure it answers with
+    either `S` (SSL supported) or `N` (SSL not supported).
+    """
+    writer.write(POSTGRES_SSL_REQUEST)
+    await writer.drain()
+    response = await reader.read(1)
+
+    if response not in (b'S', b'N'):
+        raise exceptions.ProbeException(
+            f'unexpected response to SSLRequest {response!r}',
+        )
+
+    return 'SSL supported' if response == b'S' else 'SSL not supported'
+
+
+async def handshake_mysql(reader, writer):
+    """
+    Read the initial handshake packet of a MySQL server and return its
+    version.
+    """
+    header = await reader.readexactly(4)
+    length = int.from_bytes(header[:3], 'little')
+    payload = await reader.readexactly(length)
+
+    if not payload:
+        raise exceptions.ProbeException('empty handshake packet')
+
+    if payload[0] == MYSQL_ERROR_PACKET:
+        message = payload[3:].decode(errors='replace')
+        raise exceptions.ProbeException(
+            f'server refused connection: {message}',
+        )
+
+    if payload[0] != MYSQL_PROTOCOL_VERSION:
+        raise exceptions.ProbeException(
+            f'unsupported protocol version {payload[0]}',
+        )
+
+    version_end = payload.find(b'\0', 1)
+
+    if version_end < 0:
+        raise exceptions.ProbeException('truncated handshake packet')
+
+    version = payload[1:version_end].decode(errors='replace')
+    return f'server version {version}'
+
+
+# The handshake and the default port of each scheme of database URLs.
+DATABASE_HANDSHAKES = {
+    'postgres': (handshake_postgres, 5432),
+    'postgresql': (handshake_postgres, 5432),
+    'postgis': (handshake_postgres, 5432),
+    'mysql': (handshake_mysql, 3306),
+    'mysql2': (handshake_mysql, 3306),
+    'mysqlgis': (handshake_mysql, 3306),
+    'mariadb': (handshake_mysql, 3306),
+}
+
+
+async def probe(host, port, handshake=None, timeout=5):
+    """
+    Open a TCP connection to the given host and port and perform the given
+    handshake coroutine function (if any) on it, within `timeout` seconds.
+    Return a `ProbeResult`, or raise `OSError` if the service cannot be
+    reached, `asyncio.TimeoutError` if it does not respond in time and
+    `ProbeException` if the handshake fails.
+    """
+    started_at = time.perf_counter()
+    reader, writer = await asyncio.wait_for(
+        asyncio.open_connection(host, port), timeout,
+    )
+    connected_at = time.perf_counter()
+    result = ProbeResult(host, port, connected_at - started_at)
+
+    try:
+        if handshake:
+            remaining = max(timeout - result.connect_latency, 0)
+            result.info = await asyncio.wait_for(
+                handshake(reader, writer), remaining,
+            )
+            result.handshake_latency = time.perf_counter() - connected_at
+    except asyncio.IncompleteReadError:
+        raise exceptions.ProbeException('connection closed by the server')
+    finally:
+        writer.close()
+
+    return result
+
+
+def encode_redis_command(*args):
+    """
+    Encode the given command as a RESP array of bulk strings.
+    """
+    parts = [f'*{len(args)}\r\n'.encode()]
+
+    for arg in args:
+        arg = arg.encode() if isinstance(arg, str) else arg
+        parts.append(f'${len(arg)}\r\n'.encode() + arg + b'\r\n')
+
+    return b''.join(parts)
+
+
+REDIS_PING = encode_redis_command('PING')
+
+
+async def handshake_redis(reader, writer):
+    """
+    Send a `PING` to a Redis server and make sure it answers with a RESP
+    reply; an error reply (e.g. authentication being required) counts too,
+    as it comes from Redis itself.
+    """
+    writer.write(REDIS_PING)
+    await writer.drain()
+    line = await reader.readline()
+
+    if line[:1] not in (b'+', b'-') or not line.endswith(b'\r\n'):
+        raise exceptions.ProbeException(f'unexpected reply {line!r}')
+
+    return line[1:-2].decode(errors='replace')
+
+
+class RedisClient:
+    """
+    A minimal Redis client speaking raw RESP, just enough to authenticate and
+    send pipelined `PING` commands over a persistent connection.
+    """
+
+    def __init__(self, host, port=6379, username=None, password=None,
+                 ssl=False, timeout=5):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.ssl = ssl
+        self.timeout = timeout
+        self.reader = None
+        self.writer = None
+
+    @property
+    def connected(self):
+        return self.writer is not None and not self.writer.is_closing()
+
+    async def read_reply(self):
+        """
+        Read a simple string, error or integer reply and return its value.
+        Raise `ProbeException` on error replies.
+        """
+        line = await self.reader.readline()
+
+        if not line.endswith(b'\r\n'):
+            raise exceptions.ProbeException('connection closed by the server')
+
+        kind, value = line[:1], line[1:-2].decode(errors='replace')
+
+        if kind == b'-':
+            raise exceptions.ProbeException(value)
+
+        if kind not in (b'+', b':'):
+            raise exceptions.ProbeException(f'unexpected reply {line!r}')
+
+        return value
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port, ssl=self.ssl),
+            self.timeout,
+        )
+
+        if self.password:
+            credentials = [self.username, self.password]
+            command = encode_redis_command(
+                'AUTH', *[value for value in credentials if value],
+            )
+
+            try:
+                self.writer.write(command)
+                await asyncio.wait_for(self.read_reply(), self.timeout)
+            except BaseException:
+                # An unauthenticated connection must not be used for pings.
+                self.close()
+                raise
+
+    async def ping(self, count=1):
+        """
+        Send `count` pipelined `PING` commands and return the latency of each
+        reply in seconds, measured from sending the pipeline.
+        """
+        if not self.connected:
+            await self.connect()
+
+        latencies = []
+
+        try:
+            started_at = time.perf_counter()
+            self.writer.write(REDIS_PING * count)
+            await self.writer.drain()
+
+            for _ in range(count):
+                await asyncio.wait_for(self.read_reply(), self.timeout)
+                latencies.append(time.perf_counter() - started_at)
+        except BaseException:
+            # The connection is in an unknown state; start over next time.
+            self.close()
+            raise
+
+        return latencies
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+        self.reader = self.writer = None
+
+
+class HttpResponse:
+    """
+    The status of a response to an HTTP request, with its latency in seconds,
+    measured from sending the request until reading the whole response.
+    """
+
+    def __init__(self, status, reason, latency):
+        self.status = status
+        self.reason = reason
+        self.latency = latency
+
+    @property
+    def ok(self):
+        return self.status < 400
+
+
+class ConnectionLost(exceptions.ProbeException):
+    """
+    Raised when the server closes the connection before sending any byte of
+    its response.
+    """
+
+    def __init__(self):
+        super().__init__('connection closed by the server')
+
+
+class HttpClient:
+    """
+    A minimal HTTP/1.1 client sending requests over a persistent keep-alive
+    connection, so that frequent requests do not need a new connection (and
+    its TCP handshake) each. The connection gets opened again whenever the
+    server closes it; a request on a connection the server closed while idle
+    gets sent again on a new one.
+    """
+    max_header_size = 65536
+
+    def __init__(self, host, port, timeout=5):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.reader = None
+        self.writer = None
+        self.connections = 0
+
+    @property
+    def connected(self):
+        return self.writer is not None and not self.writer.is_closing()
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), self.timeout,
+        )
+        self.connections += 1
+
+    async def read_body(self, headers):
+        """
+        Read and discard the body of a response, delimited either by its
+        `Content-Length`, by chunked encoding or by the server closing the
+        connection. Return whether the connection can be reused.
+        """
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            while True:
+                line = await self.reader.readline()
+
+                try:
+                    size = int(line.split(b';', 1)[0], 16)
+                except ValueError:
+                    raise exceptions.ProbeException(
+                        f'unexpected chunk size {line!r}',
+                    )
+
+                # Each chunk, as well as the trailers after the last one,
+                # ends by CRLF.
+                if size == 0:
+                    while await self.reader.readline() not in (b'\r\n', b''):
+                        pass
+                    break
+
+                await self.reader.readexactly(size + 2)
+        elif 'content-length' in headers:
+            await self.reader.readexactly(int(headers['content-length']))
+        else:
+            await self.reader.read()
+            return False
+
+        return headers.get('connection', '').lower() != 'close'
+
+    async def read_response(self, method):
+        try:
+            status_line = await self.reader.readline()
+        except ConnectionError as e:
+            raise ConnectionLost() from e
+
+        if not status_line:
+            raise ConnectionLost()
+
+        try:
+            version, status, *reason = status_line.decode().split(None, 2)
+            status = int(status)
+        except ValueError:
+            raise exceptions.ProbeException(
+                f'unexpected status line {status_line!r}',
+            )
+
+        headers = {}
+        header_size = 0
+
+        while True:
+            line = await self.reader.readline()
+            header_size += len(line)
+
+            if line in (b'\r\n', b'\n', b''):
+                break
+
+            if header_size > self.max_header_size:
+                raise exceptions.ProbeException('response headers too long')
+
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        if version == 'HTTP/1.0' and (
+            headers.get('connection', '').lower() != 'keep-alive'
+        ):
+            headers.setdefault('connection', 'close')
+
+        if method == 'HEAD' or status in (204, 304) or 100 <= status < 200:
+            reusable = headers.get('connection', '').lower() != 'close'
+        else:
+            reusable = await self.read_body(headers)
+
+        return status, ' '.join(reason).strip(), reusable
+
+    async def request(self, path='/', method='GET', host=None):
+        """
+        Send a request for the given path and return an `HttpResponse`, or
+        raise `OSError` if the server cannot be reached,
+        `asyncio.TimeoutError` if it does not respond in time and
+        `ProbeException` if its response is not valid HTTP.
+        """
+        reused = self.connected
+
+        if not reused:
+            await self.connect()
+
+        request = (
+            f'{method} {path} HTTP/1.1\r\n'
+            f'Host: {host or self.host}:{self.port}\r\n'
+            'User-Agent: Procenv\r\n'
+            '\r\n'
+        ).encode()
+
+        try:
+            return await self.send(request, method)
+        except ConnectionLost:
+            # The server may close an idle connection at any time, which
+            # goes unnoticed until the next request on it; only then is the
+            # request worth sending again.
+            if not reused:
+                raise
+
+        await self.connect()
+        return await self.send(request, method)
+
+    async def send(self, request, method):
+        try:
+            started_at = time.perf_counter()
+
+            try:
+                self.writer.write(request)
+                await self.writer.drain()
+            except ConnectionError as e:
+                raise ConnectionLost() from e
+
+            status, reason, reusable = await asyncio.wait_for(
+                self.read_response(method), self.timeout,
+            )
+            latency = time.perf_counter() - started_at
+        except asyncio.IncompleteReadError:
+            self.close()
+            raise exceptions.ProbeException('connection closed by the server')
+        except BaseException:
+            # The connection is in an unknown state; start over next time.
+            self.close()
+            raise
+
+        if not reusable:
+            self.close()
+
+        return HttpResponse(status, reason, latency)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+        self.reader = self.writer = None
@@ -0,0 +1,291 @@
+import asyncio
+import http.server
+import threading
+import unittest
+
+from . import exceptions
+from . import probes
+
+
+class ProbeTest(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.get_event_loop()
+
+    def start_server(self, response):
+        async def handle(reader, writer):
+            writer.write(response)
+            await writer.drain()
+            writer.close()
+
+        server = self.loop.run_until_complete(
+            asyncio.start_server(handle, '127.0.0.1', 0),
+        )
+        self.addCleanup(server.close)
+        return server.sockets[0].getsockname()[1]
+
+    def test_probe_without_handshake(self):
+        """
+        Ensure that probing without a handshake only measures the latency of
+        connecting.
+        """
+        port = self.start_server(b'')
+        result = self.loop.run_until_complete(probes.probe('127.0.0.1', port))
+
+        assert result.connect_latency > 0
+        assert result.handshake_latency is None
+        assert str(result).startswith('connect: ')
+
+    def test_probe_mysql_error_packet(self):
+        """
+        Ensure that a MySQL server refusing the connection with an error
+        packet fails the handshake with its error message.
+        """
+        message = b'\xff\x6a\x04Host is not allowed'
+        packet = len(message).to_bytes(3, 'little') + b'\x00' + message
+        port = self.start_server(packet)
+
+        with self.assertRaises(exceptions.ProbeException) as context:
+            self.loop.run_until_complete(
+                probes.probe('127.0.0.1', port, probes.handshake_mysql),
+            )
+
+        assert str(context.exception) == (
+            'server refused connection: Host is not allowed'
+        )
+
+    def test_probe_mysql_malformed_handshake(self):
+        """
+        Ensure that an empty or truncated handshake packet of a MySQL server
+        fails the handshake, instead of raising another exception.
+        """
+        for payload, message in (
+            (b'', 'empty handshake packet'),
+            (b'\x0a8.0.36', 'truncated handshake packet'),
+        ):
+            packet = len(payload).to_bytes(3, 'little') + b'\x00' + payload
+            port = self.start_server(packet)
+
+            with self.assertRaises(exceptions.ProbeException) as context:
+                self.loop.run_until_complete(
+                    probes.probe('127.0.0.1', port, probes.handshake_mysql),
+                )
+
+            assert str(context.exception) == message
+
+        packet = b'\x08\x00\x00\x00\x0a8.0.36\x00'
+        port = self.start_server(packet)
+        result = self.loop.run_until_complete(
+            probes.probe('127.0.0.1', port, probes.handshake_mysql),
+        )
+        assert result.info == 'server version 8.0.36'
+
+    def test_probe_redis(self):
+        """
+        Ensure that Redis answering the `PING`, even with an error as
+        authentication is required, passes the handshake.
+        """
+        for reply, info in (
+            (b'+PONG\r\n', 'PONG'),
+            (b'-NOAUTH Authentication required.\r\n',
+             'NOAUTH Authentication required.'),
+        ):
+            port = self.start_server(reply)
+            result = self.loop.run_until_complete(
+                probes.probe('127.0.0.1', port, probes.handshake_redis),
+            )
+            assert result.info == info
+
+    def test_redis_client_auth_error(self):
+        """
+        Ensure that the connection of the Redis client gets closed when
+        authentication fails.
+        """
+        port = self.start_server(b'-WRONGPASS invalid password\r\n')
+        client = probes.RedisClient('127.0.0.1', port, password='wrong')
+
+        with self.assertRaises(exceptions.ProbeException) as context:
+            self.loop.run_until_complete(client.connect())
+
+        assert str(context.exception) == 'WRONGPASS invalid password'
+        assert client.writer is None
+
+    def test_probe_closed_connection(self):
+        """
+        Ensure that a server closing the connection in the middle of the
+        handshake fails it.
+        """
+        port = self.start_server(b'\x0e\x00')
+
+        with self.assertRaises(exceptions.ProbeException) as context:
+            self.loop.run_until_complete(
+                probes.probe('127.0.0.1', port, probes.handshake_mysql),
+            )
+
+        assert str(context.exception) == 'connection closed by the server'
+
+
+class HealthHandler(http.server.BaseHTTPRequestHandler):
+    """
+    Responds to `/` with `200 OK` and to `/error` with `500`, over keep-alive
+    connections, counting the connections made to it.
+    """
+    protocol_version = 'HTTP/1.1'
+    connections = 0
+
+    def setup(self):
+        super().setup()
+        type(self).connections += 1
+
+    def do_GET(self):
+        status = 500 if self.path == '/error' else 200
+        body = b'ok'
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class HttpClientTest(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.get_event_loop()
+
+    def start_http_server(self, handler):
+        server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        server.daemon_threads = True
+        threading.Thread(
+            target=server.serve_forever, args=(0.05,), daemon=True,
+        ).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server.server_address[1]
+
+    def request_all(self, client, paths):
+        async def request_all():
+            try:
+                return [await client.request(path) for path in paths]
+            finally:
+                client.close()
+
+        return self.loop.run_until_complete(request_all())
+
+    def test_request_keep_alive(self):
+        """
+        Integration test: Ensure that requests reuse a single connection and
+        that their status and latency get returned.
+        """
+        handler = type('Handler', (HealthHandler,), {'connections': 0})
+        port = self.start_http_server(handler)
+        client = probes.HttpClient('127.0.0.1', port)
+        responses = self.request_all(client, ['/', '/error', '/'])
+
+        assert [response.status for response in responses] == [200, 500, 200]
+        assert responses[0].reason == 'OK'
+        assert responses[0].ok is True
+        assert responses[1].ok is False
+        assert all(response.latency > 0 for response in responses)
+        assert client.connections == 1
+        assert handler.connections == 1
+
+    def test_request_connection_close(self):
+        """
+        Ensure that the connection gets opened again, when an HTTP/1.0 server
+        closes it after each response.
+        """
+        handler = type(
+            'Handler',
+            (HealthHandler,),
+            {'connections': 0, 'protocol_version': 'HTTP/1.0'},
+        )
+        port = self.start_http_server(handler)
+        client = probes.HttpClient('127.0.0.1', port)
+        responses = self.request_all(client, ['/', '/'])
+
+        assert [response.status for response in responses] == [200, 200]
+        assert client.connections == 2
+
+    def test_request_chunked(self):
+        """
+        Ensure that chunked responses get read whole, keeping the connection
+        usable for the next request.
+        """
+        async def handle(reader, writer):
+            while await reader.readuntil(b'\r\n\r\n'):
+                writer.write(
+                    b'HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n'
+                    b'2\r\nok\r\n3;x=y\r\n!!!\r\n0\r\nX-Trailer: 1\r\n\r\n',
+                )
+
+        server = self.loop.run_until_complete(
+            asyncio.start_server(handle, '127.0.0.1', 0),
+        )
+        self.addCleanup(server.close)
+        port = server.sockets[0].getsockname()[1]
+        client = probes.HttpClient('127.0.0.1', port)
+        responses = self.request_all(client, ['/', '/'])
+
+        assert [response.status for response in responses] == [200, 200]
+        assert client.connections == 1
+
+    def test_request_idle_connection_closed(self):
+        """
+        Ensure that a request on a keep-alive connection that the server
+        closed while idle gets sent again on a new connection.
+        """
+        connections = []
+
+        async def handle(reader, writer):
+            connections.append(writer)
+            await reader.readuntil(b'\r\n\r\n')
+            writer.write(b'HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nok')
+            await writer.drain()
+            # Closes the connection as if it timed out while idle.
+            writer.close()
+
+        server = self.loop.run_until_complete(
+            asyncio.start_server(handle, '127.0.0.1', 0),
+        )
+        self.addCleanup(server.close)
+        port = server.sockets[0].getsockname()[1]
+        client = probes.HttpClient('127.0.0.1', port)
+
+        async def request_twice():
+            try:
+                first = await client.request()
+                await asyncio.sleep(0.05)
+                assert client.connected is True
+                second = await client.request()
+                return first, second
+            finally:
+                client.close()
+
+        responses = self.loop.run_until_complete(request_twice())
+
+        assert [response.status for response in responses] == [200, 200]
+        assert client.connections == 2
+        assert len(connections) == 2
+
+    def test_request_invalid_response(self):
+        """
+        Ensure that responses that are not HTTP fail the request.
+        """
+        async def handle(reader, writer):
+            writer.write(b'+PONG\r\n')
+            writer.close()
+
+        server = self.loop.run_until_complete(
+            asyncio.start_server(handle, '127.0.0.1', 0),
+        )
+        self.addCleanup(server.close)
+        port = server.sockets[0].getsockname()[1]
+        client = probes.HttpClient('127.0.0.1', port)
+
+        with self.assertRaises(exceptions.ProbeException) as context:
+            self.request_all(client, ['/'])
+
+        assert str(context.exception) == (
+            "unexpected status line b'+PONG\\r\\n'"
+        )
+        assert client.connected is False
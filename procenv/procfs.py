@@ -0,0 +1,225 @@
+import os
+
+
+PROC_ROOT = '/proc'
+CGROUP_ROOT = '/sys/fs/cgroup'
+# Fields of `/proc/<pid>/stat`, counting from the state of the process, which
+# follows the command name in parentheses.
+STAT_PPID = 1
+STAT_UTIME = 11
+STAT_STIME = 12
+STAT_RSS = 21
+
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK')
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+
+
+def read_file(path, size=4096):
+    """
+    Read a small file with plain system calls, skipping the buffering and
+    decoding of `open()`. Files of `/proc` get generated on each read, so one
+    read returns them whole, as long as they fit in `size` bytes.
+    """
+    fd = os.open(path, os.O_RDONLY)
+
+    try:
+        return os.read(fd, size)
+    finally:
+        os.close(fd)
+
+
+def parse_stat(stat):
+    """
+    Return the fields of the contents of `/proc/<pid>/stat` following the
+    command name, which might contain spaces and parentheses itself.
+    """
+    return stat[stat.rfind(b')') + 2:].split()
+
+
+class ProcessSample:
+    """
+    The resource usage of a process at a point in time; its CPU time in
+    seconds, its resident memory in bytes, its memory in bytes and its number
+    of open files (`None` if they cannot be listed).
+
+    The memory is the resident memory, unless given (e.g. the proportional
+    set size of the process, from `read_pss`). The resident memory counts the
+    pages shared with other processes (e.g. the workers forked by Gunicorn)
+    once for each process, so its sum is an upper bound.
+    """
+
+    def __init__(self, pid, cpu_time, rss, fds, memory=None):
+        self.pid = pid
+        self.cpu_time = cpu_time
+        self.rss = rss
+        self.fds = fds
+        self.memory = rss if memory is None else memory
+
+
+def read_pss(pid, proc_root=PROC_ROOT):
+    """
+    Return the proportional set size of the process with the given pid in
+    bytes, from `/proc/<pid>/smaps_rollup` (Linux 4.14 and later), or `None`
+    if it cannot be read. The kernel walks all the memory mappings of the
+    process to generate it, holding their lock, which takes milliseconds for
+    processes using hundreds of MiB, so it should be read sparingly.
+    """
+    try:
+        smaps = read_file(f'{proc_root}/{pid}/smaps_rollup')
+    except OSError:
+        return None
+
+    for line in smaps.splitlines():
+        if line.startswith(b'Pss:'):
+            return int(line.split()[1]) * 1024
+
+    return None
+
+
+def sample_process(pid, proc_root=PROC_ROOT):
+    """
+    Return a `ProcessSample` of the process with the given pid, or `None` if
+    it does not exist any more. The CPU time and the resident memory are both
+    read from `/proc/<pid>/stat`, which is cheap to generate, and the memory
+    of the sample is the resident one.
+    The open files of processes of other users (e.g. after `setuid`) cannot
+    be listed, so they are not counted.
+    """
+    try:
+        fields = parse_stat(read_file(f'{proc_root}/{pid}/stat'))
+    except (FileNotFoundError, ProcessLookupError):
+        return None
+
+    try:
+        fds = len(os.listdir(f'{proc_root}/{pid}/fd'))
+    except PermissionError:
+        fds = None
+    except (FileNotFoundError, ProcessLookupError):
+        return None
+
+    cpu_ticks = int(fields[STAT_UTIME]) + int(fields[STAT_STIME])
+    return ProcessSample(
+        pid=pid,
+        cpu_time=cpu_ticks / CLOCK_TICKS,
+        rss=int(fields[STAT_RSS]) * PAGE_SIZE,
+        fds=fds,
+    )
+
+
+def get_children(pid, proc_root=PROC_ROOT):
+    """
+    Return the pids of the children of the process with the given pid, via
+    the `children` file of each of its threads. Raise `FileNotFoundError` if
+    the kernel does not provide these files.
+    """
+    children = []
+
+    try:
+        tids = os.listdir(f'{proc_root}/{pid}/task')
+    except FileNotFoundError:
+        return children
+
+    for tid in tids:
+        path = f'{proc_root}/{pid}/task/{tid}/children'
+
+        try:
+            children.extend(int(child) for child in read_file(path).split())
+        except FileNotFoundError:
+            if not os.path.exists(f'{proc_root}/{pid}/task/{tid}'):
+                # The thread exited in the meantime.
+                continue
+            raise
+
+    return children
+
+
+def get_parents(proc_root=PROC_ROOT):
+    """
+    Return a dictionary mapping the pid of each process to the pid of its
+    parent, by reading the `stat` file of every process.
+    """
+    parents = {}
+
+    for name in os.listdir(proc_root):
+        if not name.isdigit():
+            continue
+
+        try:
+            stat = read_file(f'{proc_root}/{name}/stat')
+        except (FileNotFoundError, ProcessLookupError):
+            continue
+
+        parents[int(name)] = int(parse_stat(stat)[STAT_PPID])
+
+    return parents
+
+
+def get_descendants(pid, proc_root=PROC_ROOT):
+    """
+    Return the pids of the given process and all of its descendants. Children
+    are looked up just for the processes of the tree, falling back to reading
+    the parent of every process of the system on kernels without
+    `/proc/<pid>/task/<tid>/children`.
+    """
+    pids = [pid]
+
+    try:
+        for parent in pids:
+            pids.extend(get_children(parent, proc_root=proc_root))
+    except FileNotFoundError:
+        children = {}
+
+        for child, parent in get_parents(proc_root=proc_root).items():
+            children.setdefault(parent, []).append(child)
+
+        pids = [pid]
+
+        for parent in pids:
+            pids.extend(children.get(parent, ()))
+
+    return pids
+
+
+def get_memory_limit(cgroup_root=CGROUP_ROOT):
+    """
+    Return the memory limit of the cgroup of Procenv in bytes (cgroup v2 or
+    v1), or the physical memory of the system if there is no limit.
+    """
+    physical_memory = os.sysconf('SC_PHYS_PAGES') * PAGE_SIZE
+    paths = (
+        f'{cgroup_root}/memory.max',
+        f'{cgroup_root}/memory/memory.limit_in_bytes',
+    )
+
+    for path in paths:
+        try:
+            limit = read_file(path).strip()
+        except OSError:
+            continue
+
+        if limit.isdigit():
+            # cgroup v1 reports a huge number when there is no limit.
+            return min(int(limit), physical_memory)
+
+        break
+
+    return physical_memory
+
+
+def get_cpu_limit(cgroup_root=CGROUP_ROOT):
+    """
+    Return the number of CPUs available to the cgroup of Procenv, according
+    to its CPU quota (cgroup v2), or the number of CPUs of the system if
+    there is no quota.
+    """
+    cpu_count = os.cpu_count() or 1
+
+    try:
+        quota, period = read_file(f'{cgroup_root}/cpu.max').split()
+    except (OSError, ValueError):
+        return cpu_count
+
+    if not quota.isdigit():
+        return cpu_count
+
+    return min(int(quota) / int(period), cpu_count)
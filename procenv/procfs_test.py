@@ -0,0 +1,166 @@
+from unittest import mock
+import os
+import tempfile
+import unittest
+
+from . import procfs
+
+
+def build_stat(pid, comm, ppid, utime, stime, rss):
+    fields = [
+        'S', ppid, pid, pid, 0, -1, 4194560, 100, 0, 0, 0, utime, stime,
+        0, 0, 20, 0, 1, 0, 1000, 10000000, rss,
+    ]
+    return f'{pid} ({comm}) ' + ' '.join(str(field) for field in fields)
+
+
+class ProcfsTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.proc_root = self.temp_dir.name
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def add_process(self, pid, ppid, children=(), fds=3, comm='sh'):
+        """
+        Add a fake process with a single thread to the fake `/proc`.
+        """
+        task = os.path.join(self.proc_root, str(pid), 'task', str(pid))
+        os.makedirs(task)
+        os.makedirs(os.path.join(self.proc_root, str(pid), 'fd'))
+
+        with open(os.path.join(self.proc_root, str(pid), 'stat'), 'w') as f:
+            f.write(build_stat(pid, comm, ppid, 150, 50, 2560))
+
+        if children is not None:
+            with open(os.path.join(task, 'children'), 'w') as f:
+                f.write(''.join(f'{child} ' for child in children))
+
+        for fd in range(fds):
+            open(os.path.join(self.proc_root, str(pid), 'fd', str(fd)), 'w')
+
+    def test_parse_stat(self):
+        """
+        Ensure that fields are split correctly after command names with
+        spaces and parentheses.
+        """
+        stat = build_stat(100, 'web (1)', 1, 150, 50, 2560).encode()
+        fields = procfs.parse_stat(stat)
+
+        assert fields[0] == b'S'
+        assert fields[procfs.STAT_PPID] == b'1'
+        assert fields[procfs.STAT_RSS] == b'2560'
+
+    def test_sample_process(self):
+        """
+        Ensure that the CPU time, resident memory and open files of a process
+        are being sampled and that missing processes return `None`.
+        """
+        self.add_process(100, 1, fds=5)
+
+        with mock.patch.object(procfs, 'CLOCK_TICKS', 100), mock.patch.object(
+            procfs, 'PAGE_SIZE', 4096,
+        ):
+            sample = procfs.sample_process(100, proc_root=self.proc_root)
+
+        assert sample.pid == 100
+        assert sample.cpu_time == 2
+        assert sample.rss == 2560 * 4096
+        assert sample.memory == sample.rss
+        assert sample.fds == 5
+        assert procfs.sample_process(101, proc_root=self.proc_root) is None
+
+    def test_read_pss(self):
+        """
+        Ensure that the proportional set size of a process is being read
+        from `smaps_rollup`, or `None` where it is not available.
+        """
+        self.add_process(100, 1)
+        assert procfs.read_pss(100, proc_root=self.proc_root) is None
+
+        path = os.path.join(self.proc_root, '100', 'smaps_rollup')
+
+        with open(path, 'w') as f:
+            f.write(
+                '00400000-7ffc0e5c1000 ---p 00000000 00:00 0    [rollup]\n'
+                'Rss:               10240 kB\n'
+                'Pss:                4096 kB\n',
+            )
+
+        assert procfs.read_pss(100, proc_root=self.proc_root) == 4096 * 1024
+        # Sampling spares reading it.
+        sample = procfs.sample_process(100, proc_root=self.proc_root)
+        assert sample.memory == sample.rss
+
+    def test_sample_process_without_fd_permission(self):
+        """
+        Ensure that processes whose open files cannot be listed still get
+        sampled, without their open files.
+        """
+        self.add_process(100, 1)
+
+        with mock.patch('os.listdir', side_effect=PermissionError):
+            sample = procfs.sample_process(100, proc_root=self.proc_root)
+
+        assert sample.cpu_time > 0
+        assert sample.fds is None
+
+    def test_get_descendants(self):
+        """
+        Ensure that the descendants of a process are being found via the
+        `children` files of its threads.
+        """
+        self.add_process(100, 1, children=[101, 102])
+        self.add_process(101, 100, children=[103])
+        self.add_process(102, 100)
+        self.add_process(103, 101)
+        self.add_process(200, 1)
+
+        descendants = procfs.get_descendants(100, proc_root=self.proc_root)
+        assert descendants == [100, 101, 102, 103]
+
+    def test_get_descendants_without_children_files(self):
+        """
+        Ensure that the parents of all processes are being used, when the
+        kernel does not provide `children` files.
+        """
+        self.add_process(100, 1, children=None)
+        self.add_process(101, 100, children=None)
+        self.add_process(102, 101, children=None)
+        self.add_process(200, 1, children=None)
+
+        descendants = procfs.get_descendants(100, proc_root=self.proc_root)
+        assert sorted(descendants) == [100, 101, 102]
+
+    def test_get_memory_limit(self):
+        """
+        Ensure that the memory limit of the cgroup is preferred over the
+        physical memory of the system.
+        """
+        physical_memory = os.sysconf('SC_PHYS_PAGES') * procfs.PAGE_SIZE
+        memory_max = os.path.join(self.proc_root, 'memory.max')
+
+        assert procfs.get_memory_limit(self.proc_root) == physical_memory
+
+        with open(memory_max, 'w') as f:
+            f.write('max\n')
+
+        assert procfs.get_memory_limit(self.proc_root) == physical_memory
+
+        with open(memory_max, 'w') as f:
+            f.write('536870912\n')
+
+        assert procfs.get_memory_limit(self.proc_root) == 536870912
+
+    def test_get_cpu_limit(self):
+        """
+        Ensure that the CPU quota of the cgroup is preferred over the number
+        of CPUs of the system.
+        """
+        with open(os.path.join(self.proc_root, 'cpu.max'), 'w') as f:
+            f.write('50000 100000\n')
+
+        with mock.patch('os.cpu_count', return_value=4):
+            assert procfs.get_cpu_limit(self.proc_root) == 0.5
+            assert procfs.get_cpu_limit('/nonexistent') == 4
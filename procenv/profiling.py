@@ -0,0 +1,249 @@
+import asyncio
+import functools
+import os
+import sys
+import threading
+import time
+import traceback
+
+from . import utils
+
+
+class TimedCoroutine:
+    """
+    An awaitable running the given coroutine and calling `record` with the
+    duration of each one of its steps; the time it held the event loop for
+    between two suspensions, which is time no other callback could run.
+    """
+
+    def __init__(self, coroutine, record):
+        self.coroutine = coroutine
+        self.record = record
+
+    def __await__(self):
+        value, error = None, None
+
+        while True:
+            started_at = time.perf_counter()
+
+            try:
+                if error is None:
+                    yielded = self.coroutine.send(value)
+                else:
+                    yielded = self.coroutine.throw(error)
+            except StopIteration as stop:
+                return stop.value
+            finally:
+                self.record(time.perf_counter() - started_at)
+
+            try:
+                value, error = (yield yielded), None
+            except GeneratorExit:
+                self.coroutine.close()
+                raise
+            except BaseException as e:
+                value, error = None, e
+
+
+def format_stack(frame, depth=8):
+    """
+    Return the innermost `depth` frames of the stack of the given frame on a
+    single line, from the outermost to the innermost one.
+    """
+    return ' > '.join(
+        f'{os.path.basename(frame.filename)}:{frame.lineno} in {frame.name}'
+        for frame in traceback.extract_stack(frame)[-depth:]
+    )
+
+
+class LoopProfiler:
+    """
+    The `LoopProfiler` class measures the lag of the event loop of Procenv
+    continuously, with a timer every `interval` seconds, and times every
+    step of the checks running on it, so that a check blocking the event
+    loop (e.g. with a synchronous call in a coroutine) can be told apart.
+
+    Lags of at least `threshold` seconds get reported, along with the
+    slowest callbacks of checks since the last report, at most every
+    `report_interval` seconds. With `sample_stacks`, a watchdog thread also
+    samples the stack of the event loop while it is blocked, pointing to the
+    exact line blocking it.
+
+    Nothing gets measured until the profiler is enabled.
+    """
+    interval = 0.05
+    threshold = 0.1
+    report_interval = 60
+    max_offenders = 3
+
+    def __init__(self):
+        self.enabled = False
+        self.sample_stacks = False
+        self.loop = None
+        self.handle = None
+        self.expected_at = None
+        self.heartbeat_at = None
+        self.reported_at = None
+        self.lags = 0
+        self.max_lag = 0
+        self.longest_steps = {}
+        self.stack_sample = None
+        self.thread = None
+        self.thread_id = None
+        self.stopped = threading.Event()
+
+    def record(self, check, method, duration):
+        from . import metrics
+
+        metrics.check_blocking.observe(duration, check, method)
+        name = f'{check}.{method}()'
+
+        if duration > self.longest_steps.get(name, 0):
+            self.longest_steps[name] = duration
+
+    def time_coroutine(self, coroutine, check, method):
+        """
+        Return an awaitable of the given coroutine of a check, which times
+        each one of its steps while the profiler is enabled.
+        """
+        if not self.enabled:
+            return coroutine
+
+        record = functools.partial(self.record, check, method)
+        return TimedCoroutine(coroutine, record)
+
+    def time_callback(self, callback, check, method):
+        """
+        Return a function calling the given callback of a check (e.g. a
+        subscriber of the output of the application) and timing it while the
+        profiler is enabled.
+        """
+        @functools.wraps(callback)
+        def timed_callback(*args, **kwargs):
+            if not self.enabled:
+                return callback(*args, **kwargs)
+
+            started_at = time.perf_counter()
+
+            try:
+                return callback(*args, **kwargs)
+            finally:
+                self.record(check, method, time.perf_counter() - started_at)
+
+        return timed_callback
+
+    def get_offenders(self):
+        offenders = sorted(
+            self.longest_steps.items(), key=lambda item: item[1],
+            reverse=True,
+        )
+        return offenders[:self.max_offenders]
+
+    def report(self, now):
+        message = f'Event loop lagged by {self.max_lag:.3f} seconds'
+
+        if self.lags > 1:
+            message += f' ({self.lags} times)'
+
+        offenders = self.get_offenders()
+
+        if offenders:
+            message += '; slowest check callbacks: ' + ', '.join(
+                f'{name} ({duration:.3f} seconds)'
+                for name, duration in offenders
+            )
+
+        utils.log('PE54', message)
+
+        if self.stack_sample is not None:
+            stalled, stack = self.stack_sample
+            utils.log(
+                'PE55',
+                f'Event loop was blocked for over {stalled:.3f} seconds at '
+                f'{stack}',
+            )
+
+        self.reported_at = now
+        self.lags = 0
+        self.max_lag = 0
+        self.longest_steps = {}
+        self.stack_sample = None
+
+    def tick(self):
+        from . import metrics
+
+        now = self.loop.time()
+        lag = max(now - self.expected_at, 0)
+        metrics.event_loop_lag.observe(lag)
+
+        if lag >= self.threshold:
+            self.lags += 1
+            self.max_lag = max(self.max_lag, lag)
+
+        if self.lags and (
+            self.reported_at is None or
+            now - self.reported_at >= self.report_interval
+        ):
+            self.report(now)
+
+        self.heartbeat_at = time.monotonic()
+        self.expected_at = now + self.interval
+        self.handle = self.loop.call_at(self.expected_at, self.tick)
+
+    def watch(self):
+        """
+        Sample the stack of the event loop thread, once for each time it does
+        not run the timer of the profiler in time.
+        """
+        sampled_heartbeat_at = None
+
+        while not self.stopped.wait(self.interval):
+            heartbeat_at = self.heartbeat_at
+
+            if (
+                heartbeat_at is None or
+                heartbeat_at == sampled_heartbeat_at or
+                not self.loop.is_running()
+            ):
+                continue
+
+            stalled = time.monotonic() - heartbeat_at - self.interval
+
+            if stalled < self.threshold:
+                continue
+
+            frame = sys._current_frames().get(self.thread_id)
+
+            if frame is not None:
+                sampled_heartbeat_at = heartbeat_at
+                self.stack_sample = (stalled, format_stack(frame))
+
+    def start(self, loop=None):
+        self.loop = loop or asyncio.get_event_loop()
+        self.enabled = True
+        self.expected_at = self.loop.time() + self.interval
+        self.heartbeat_at = time.monotonic()
+        self.handle = self.loop.call_at(self.expected_at, self.tick)
+
+        if self.sample_stacks:
+            self.thread_id = threading.get_ident()
+            self.stopped.clear()
+            self.thread = threading.Thread(
+                target=self.watch, name='procenv-loop-watchdog', daemon=True,
+            )
+            self.thread.start()
+
+    def stop(self):
+        self.enabled = False
+
+        if self.handle is not None:
+            self.handle.cancel()
+            self.handle = None
+
+        if self.thread is not None:
+            self.stopped.set()
+            self.thread.join()
+            self.thread = None
+
+
+profiler = LoopProfiler()
@@ -0,0 +1,133 @@
+from unittest import mock
+import asyncio
+import re
+import time
+import unittest
+
+from . import checks
+from . import profiling
+
+
+class BlockingCheck(checks.BaseCheck):
+    async def main(self):
+        time.sleep(0.25)
+        await asyncio.sleep(0)
+        return True
+
+
+class TimedCoroutineTest(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.get_event_loop()
+
+    def test_await(self):
+        """
+        Ensure that each step of the coroutine gets timed, while its result
+        and its exceptions pass through.
+        """
+        durations = []
+
+        async def coroutine(error=None):
+            time.sleep(0.01)
+            await asyncio.sleep(0)
+            await asyncio.sleep(0.01)
+
+            if error:
+                raise error
+
+            return 'done'
+
+        result = self.loop.run_until_complete(
+            profiling.TimedCoroutine(coroutine(), durations.append),
+        )
+
+        assert result == 'done'
+        assert len(durations) == 3
+        assert durations[0] >= 0.01
+        # Sleeping does not hold the event loop.
+        assert durations[2] < 0.01
+
+        with self.assertRaises(ValueError):
+            self.loop.run_until_complete(
+                profiling.TimedCoroutine(
+                    coroutine(ValueError()), durations.append,
+                ),
+            )
+
+    def test_cancel(self):
+        """
+        Ensure that cancelling the awaitable cancels the coroutine.
+        """
+        cancelled = []
+
+        async def coroutine():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        async def cancel():
+            task = asyncio.ensure_future(
+                profiling.TimedCoroutine(coroutine(), lambda duration: None),
+            )
+            await asyncio.sleep(0)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+        self.loop.run_until_complete(cancel())
+        assert cancelled == [True]
+
+
+class LoopProfilerTest(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.get_event_loop()
+        self.profiler = profiling.LoopProfiler()
+        self.addCleanup(self.profiler.stop)
+
+    def run_blocking_check(self):
+        check = BlockingCheck()
+
+        with mock.patch('procenv.profiling.profiler', self.profiler):
+            with mock.patch('procenv.utils.log') as log_mock:
+                self.profiler.start(self.loop)
+                self.loop.run_until_complete(check.run_method('main'))
+                # Let the timer of the profiler notice the lag.
+                self.loop.run_until_complete(asyncio.sleep(0.1))
+
+        return log_mock
+
+    def test_report(self):
+        """
+        Ensure that a lag of the event loop gets reported along with the
+        slowest callbacks of checks, once per report interval.
+        """
+        log_mock = self.run_blocking_check()
+
+        code, message = log_mock.call_args_list[0][0]
+        assert code == 'PE54'
+        assert re.match(
+            r'Event loop lagged by 0\.\d{3} seconds; slowest check '
+            r'callbacks: BlockingCheck\.main\(\) \(0\.2\d{2} seconds\)$',
+            message,
+        )
+        assert log_mock.call_count == 1
+        assert self.profiler.longest_steps == {}
+        assert self.profiler.reported_at is not None
+
+        # Later lags are held back until the report interval passes.
+        log_mock = self.run_blocking_check()
+        assert log_mock.called is False
+        assert self.profiler.lags == 1
+
+    def test_sample_stacks(self):
+        """
+        Ensure that the stack of the event loop gets sampled while it is
+        blocked, pointing to the line blocking it.
+        """
+        self.profiler.sample_stacks = True
+        log_mock = self.run_blocking_check()
+
+        code, message = log_mock.call_args_list[1][0]
+        assert code == 'PE55'
+        assert message.startswith('Event loop was blocked for over 0.')
+        assert message.endswith('profiling_test.py:13 in main')
@@ -0,0 +1,127 @@
+import json
+import os
+import sys
+
+from . import exceptions
+
+
+ENTRY_POINT_GROUP = 'procenv.checks'
+
+# The checks of Procenv, by short name, so that they can be resolved without
+# looking up entry points.
+BUILTIN_CHECKS = {
+    'ProcfileCheck': 'procenv.checks.ProcfileCheck',
+    'PortBindCheck': 'procenv.checks.PortBindCheck',
+    'NetlinkPortBindCheck': 'procenv.checks.NetlinkPortBindCheck',
+    'DatabaseURLCheck': 'procenv.checks.DatabaseURLCheck',
+    'RedisURLCheck': 'procenv.checks.RedisURLCheck',
+    'HttpHealthCheck': 'procenv.checks.HttpHealthCheck',
+    'OutputPatternCheck': 'procenv.checks.OutputPatternCheck',
+    'ResourceUsageCheck': 'procenv.checks.ResourceUsageCheck',
+}
+
+
+def get_cache_path():
+    cache_home = os.getenv('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    return os.path.join(cache_home, 'procenv', 'checks.json')
+
+
+def get_cache_key():
+    """
+    Return a key that changes whenever packages get installed or removed,
+    i.e. whenever a directory of `sys.path` gets modified.
+    """
+    key = []
+
+    for path in sys.path:
+        try:
+            key.append([path, os.stat(path or '.').st_mtime_ns])
+        except OSError:
+            continue
+
+    return key
+
+
+def scan_entry_points():
+    """
+    Return the checks that installed packages declare as entry points of the
+    `procenv.checks` group, as dotted paths by name.
+    """
+    try:
+        from importlib.metadata import entry_points
+    except ImportError:
+        import pkg_resources
+        return {
+            entry_point.name: '.'.join(
+                [entry_point.module_name, *entry_point.attrs],
+            )
+            for entry_point in pkg_resources.iter_entry_points(
+                ENTRY_POINT_GROUP,
+            )
+        }
+
+    all_entry_points = entry_points()
+
+    if hasattr(all_entry_points, 'select'):
+        group = all_entry_points.select(group=ENTRY_POINT_GROUP)
+    else:
+        group = all_entry_points.get(ENTRY_POINT_GROUP, ())
+
+    return {
+        entry_point.name: entry_point.value.replace(':', '.')
+        for entry_point in group
+    }
+
+
+def get_entry_point_checks(cache_path=None):
+    """
+    Return the checks declared as entry points, from a cached index while no
+    package has been installed or removed since it was written, as scanning
+    the metadata of every installed package is slow.
+    """
+    cache_path = cache_path or get_cache_path()
+    key = get_cache_key()
+
+    try:
+        with open(cache_path) as cache_file:
+            cache = json.load(cache_file)
+
+        if cache['key'] == key:
+            return cache['checks']
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    checks = scan_entry_points()
+
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+
+        with open(cache_path, 'w') as cache_file:
+            json.dump({'key': key, 'checks': checks}, cache_file)
+    except OSError:
+        # Not being able to cache the index just makes the next run slower.
+        pass
+
+    return checks
+
+
+def resolve_check(name):
+    """
+    Return the dotted path of the check with the given name; either the short
+    name of a check of Procenv or of an entry point of the `procenv.checks`
+    group, or a dotted path already.
+    """
+    if '.' in name:
+        return name
+
+    if name in BUILTIN_CHECKS:
+        return BUILTIN_CHECKS[name]
+
+    entry_point_checks = get_entry_point_checks()
+
+    if name in entry_point_checks:
+        return entry_point_checks[name]
+
+    raise exceptions.InvalidCheckException(
+        f'Check "{name}" is neither a dotted path, nor a known check',
+    )
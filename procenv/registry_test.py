@@ -0,0 +1,97 @@
+from unittest import mock
+import json
+import os
+import tempfile
+import unittest
+
+from . import exceptions
+from . import registry
+
+
+class RegistryTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(
+            self.temp_dir.name, 'cache', 'procenv', 'checks.json',
+        )
+        self.site_packages = os.path.join(self.temp_dir.name, 'site-packages')
+        os.mkdir(self.site_packages)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_resolve_check(self):
+        """
+        Ensure that dotted paths are returned as they are and that checks of
+        Procenv are resolved without looking up entry points.
+        """
+        with mock.patch(
+            'procenv.registry.get_entry_point_checks',
+        ) as get_entry_point_checks_mock:
+            assert registry.resolve_check('my.checks.Check') == (
+                'my.checks.Check'
+            )
+            assert registry.resolve_check('PortBindCheck') == (
+                'procenv.checks.PortBindCheck'
+            )
+
+        get_entry_point_checks_mock.assert_not_called()
+
+    def test_resolve_check_entry_point(self):
+        """
+        Ensure that other short names are resolved via entry points and that
+        unknown ones raise `InvalidCheckException`.
+        """
+        with mock.patch(
+            'procenv.registry.get_entry_point_checks',
+            return_value={'SidekiqCheck': 'sidekiq_checks.SidekiqCheck'},
+        ):
+            assert registry.resolve_check('SidekiqCheck') == (
+                'sidekiq_checks.SidekiqCheck'
+            )
+
+            with self.assertRaises(exceptions.InvalidCheckException):
+                registry.resolve_check('ScumCheck')
+
+    def test_get_entry_point_checks(self):
+        """
+        Ensure that entry points are scanned once and cached, until a
+        directory of `sys.path` changes.
+        """
+        checks = {'SidekiqCheck': 'sidekiq_checks.SidekiqCheck'}
+
+        with mock.patch(
+            'procenv.registry.scan_entry_points', return_value=checks,
+        ) as scan_mock, mock.patch('sys.path', [self.site_packages]):
+            assert registry.get_entry_point_checks(self.cache_path) == checks
+            assert registry.get_entry_point_checks(self.cache_path) == checks
+            assert scan_mock.call_count == 1
+
+            with open(self.cache_path) as cache_file:
+                assert json.load(cache_file)['checks'] == checks
+
+            stat = os.stat(self.site_packages)
+            os.utime(
+                self.site_packages,
+                ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9),
+            )
+            assert registry.get_entry_point_checks(self.cache_path) == checks
+            assert scan_mock.call_count == 2
+
+    def test_scan_entry_points(self):
+        """
+        Ensure that entry points get returned as dotted paths.
+        """
+        entry_point = mock.Mock(value='sidekiq_checks:SidekiqCheck')
+        entry_point.name = 'SidekiqCheck'
+        entry_points = mock.Mock()
+        entry_points.select.return_value = [entry_point]
+
+        with mock.patch(
+            'importlib.metadata.entry_points', return_value=entry_points,
+        ):
+            assert registry.scan_entry_points() == {
+                'SidekiqCheck': 'sidekiq_checks.SidekiqCheck',
+            }
+
+        entry_points.select.assert_called_once_with(group='procenv.checks')
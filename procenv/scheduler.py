@@ -0,0 +1,183 @@
+import asyncio
+import random
+
+from . import logs
+from . import metrics
+from . import tracing
+
+
+class ScheduledCheck:
+    """
+    The scheduling state of a check in the `main` stage.
+    """
+
+    def __init__(self, check, started_at):
+        self.check = check
+        self.started_at = started_at
+        self.interval = None
+        self.result = None
+        self.handle = None
+        self.task = None
+
+
+class CheckScheduler:
+    """
+    The `CheckScheduler` class runs the `main` stage of all checks from a
+    single place (even the checks of many applications), using the timers of
+    the event loop instead of a sleeping task per check.
+
+    Checks whose `main` method returns a result are polled adaptively; every
+    `min_interval` seconds while their result changes, or while they are
+    unsatisfied (`False`) during their `startup_period`, backing off
+    exponentially up to their `interval` once their result is stable. Checks
+    that return `None` run every `interval` seconds. Every interval gets
+    stretched by a random jitter, so that checks do not run in lockstep.
+    """
+    backoff_factor = 2
+    jitter = 0.1
+
+    def __init__(self, checks, loop=None):
+        self.checks = checks
+        self.loop = loop or asyncio.get_event_loop()
+        self.scheduled_checks = []
+        self.done = None
+
+    def get_next_interval(self, scheduled_check, result):
+        check = scheduled_check.check
+        in_startup_period = (
+            self.loop.time() - scheduled_check.started_at <
+            check.startup_period
+        )
+
+        if result is None:
+            interval = check.interval
+        elif result is False and in_startup_period:
+            interval = check.min_interval
+        elif result != scheduled_check.result:
+            interval = check.min_interval
+        else:
+            interval = min(
+                scheduled_check.interval * self.backoff_factor,
+                check.interval,
+            )
+
+        return interval
+
+    def add_jitter(self, interval):
+        return interval * random.uniform(1, 1 + self.jitter)
+
+    def schedule(self, scheduled_check, interval):
+        scheduled_check.interval = interval
+        scheduled_check.handle = self.loop.call_later(
+            self.add_jitter(interval), self.start, scheduled_check,
+        )
+
+    def start(self, scheduled_check):
+        scheduled_check.handle = None
+        scheduled_check.task = self.loop.create_task(
+            self.run_check(scheduled_check),
+        )
+
+    async def run_check(self, scheduled_check):
+        """
+        Run the `main` method of the check and schedule its next run, if it
+        should run again.
+        """
+        check = scheduled_check.check
+        # Each run is a task of its own, so this affects just this run.
+        logs.current_check.set(check.__class__.__name__)
+        logs.current_app.set(check.app_name)
+        started_at = self.loop.time()
+        result = await check.run_method('main')
+        finished_at = self.loop.time()
+
+        if scheduled_check not in self.scheduled_checks:
+            # Removed while running, without the cancellation getting through
+            # (`wait_for` returns the result of a call completing meanwhile).
+            return
+
+        metrics.check_duration.observe(
+            finished_at - started_at, check.qualified_name, 'main',
+        )
+        tracing.tracer.add_span(
+            'main()', check.qualified_name, started_at, finished_at,
+            result=repr(result),
+        )
+
+        if isinstance(result, bool):
+            metrics.check_status.set(int(result), check.qualified_name)
+
+        interval = self.get_next_interval(scheduled_check, result)
+        scheduled_check.result = result
+        scheduled_check.task = None
+
+        should_run = await check.run_method(
+            'should_main_check_run', default=True,
+        )
+
+        if scheduled_check not in self.scheduled_checks:
+            return
+
+        if should_run:
+            self.schedule(scheduled_check, interval)
+        else:
+            self.retire(scheduled_check)
+
+    async def add(self, check):
+        if not hasattr(check, 'should_main_check_run'):
+            msg = (
+                f'Check "{check}" should implement the '
+                '"should_main_check_run" method, in order to run its "main" '
+                'check'
+            )
+            raise NotImplementedError(msg)
+
+        logs.current_check.set(check.__class__.__name__)
+        logs.current_app.set(check.app_name)
+
+        if not await check.run_method('should_main_check_run', default=True):
+            return
+
+        if check not in self.checks:
+            # Removed while finding out whether it should run.
+            return
+
+        scheduled_check = ScheduledCheck(check, started_at=self.loop.time())
+        self.scheduled_checks.append(scheduled_check)
+        self.schedule(scheduled_check, check.min_interval)
+
+    def retire(self, scheduled_check):
+        self.scheduled_checks.remove(scheduled_check)
+
+        if not self.scheduled_checks and self.done and not self.done.done():
+            self.done.set_result(None)
+
+    def remove(self, checks):
+        """
+        Stop running the given checks (e.g. the checks of an application that
+        exited), while the rest of them keep running.
+        """
+        self.checks = [check for check in self.checks if check not in checks]
+
+        for scheduled_check in list(self.scheduled_checks):
+            if scheduled_check.check not in checks:
+                continue
+            if scheduled_check.handle:
+                scheduled_check.handle.cancel()
+            if scheduled_check.task:
+                scheduled_check.task.cancel()
+            self.retire(scheduled_check)
+
+    def stop(self):
+        self.remove(list(self.checks))
+
+    async def run(self):
+        """
+        Run the `main` stage of all checks, until none of them should run any
+        more.
+        """
+        self.done = self.loop.create_future()
+        await asyncio.gather(*[self.add(check) for check in self.checks])
+
+        if self.scheduled_checks:
+            await self.done
@@ -0,0 +1,185 @@
+from unittest import mock
+import asyncio
+import unittest
+
+from . import checks
+from .scheduler import CheckScheduler
+from .scheduler import ScheduledCheck
+
+
+class CountingCheck(checks.BaseCheck):
+    """
+    A check returning the given results from its `main` method and stopping
+    after all of them have been returned.
+    """
+    min_interval = 0.001
+    interval = 0.01
+    startup_period = 0
+
+    def __init__(self, results):
+        self.results = list(results)
+        self.calls = 0
+
+    def should_main_check_run(self):
+        return self.calls < len(self.results)
+
+    async def main(self):
+        self.calls += 1
+        return self.results[self.calls - 1]
+
+
+class CheckSchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.get_event_loop()
+
+    def test_get_next_interval(self):
+        """
+        Ensure that checks get polled fast while their result changes or
+        while they are unsatisfied during startup, that they back off
+        exponentially while their result is stable and that checks without a
+        result run every `interval` seconds.
+        """
+        check = checks.BaseCheck()
+        scheduler = CheckScheduler([check], loop=self.loop)
+        scheduled_check = ScheduledCheck(check, started_at=self.loop.time())
+        scheduled_check.interval = check.min_interval
+
+        # No result
+        assert scheduler.get_next_interval(scheduled_check, None) == 5
+
+        # Unsatisfied during startup
+        scheduled_check.result = False
+        assert scheduler.get_next_interval(scheduled_check, False) == 0.1
+
+        # Result changed
+        scheduled_check.result = False
+        assert scheduler.get_next_interval(scheduled_check, True) == 0.1
+
+        # Stable result
+        scheduled_check.result = True
+        scheduled_check.interval = 0.1
+        assert scheduler.get_next_interval(scheduled_check, True) == 0.2
+        scheduled_check.interval = 4
+        assert scheduler.get_next_interval(scheduled_check, True) == 5
+
+        # Unsatisfied after startup
+        scheduled_check.started_at -= check.startup_period
+        scheduled_check.result = False
+        scheduled_check.interval = 0.4
+        assert scheduler.get_next_interval(scheduled_check, False) == 0.8
+
+    def test_add_jitter(self):
+        """
+        Ensure that the jitter only ever stretches intervals.
+        """
+        scheduler = CheckScheduler([], loop=self.loop)
+
+        for _ in range(100):
+            assert 5 <= scheduler.add_jitter(5) <= 5.5
+
+    def test_run(self):
+        """
+        Ensure that `run` runs the `main` method of all checks until none of
+        them should run any more.
+        """
+        check_a = CountingCheck([False, False, True])
+        check_b = CountingCheck([None])
+        scheduler = CheckScheduler([check_a, check_b], loop=self.loop)
+
+        self.loop.run_until_complete(asyncio.wait_for(scheduler.run(), 5))
+
+        assert check_a.calls == 3
+        assert check_b.calls == 1
+        assert scheduler.scheduled_checks == []
+
+    def test_run_metrics(self):
+        """
+        Ensure that the duration of every run and the last boolean result of
+        each check get recorded as metrics.
+        """
+        check = CountingCheck([False, True, None])
+        scheduler = CheckScheduler([check], loop=self.loop)
+
+        with mock.patch(
+            'procenv.metrics.check_duration',
+        ) as duration_mock, mock.patch(
+            'procenv.metrics.check_status',
+        ) as status_mock:
+            self.loop.run_until_complete(asyncio.wait_for(scheduler.run(), 5))
+
+        assert duration_mock.observe.call_count == 3
+        assert duration_mock.observe.call_args[0][1:] == (
+            'CountingCheck', 'main',
+        )
+        assert status_mock.set.call_args_list == [
+            mock.call(0, 'CountingCheck'), mock.call(1, 'CountingCheck'),
+        ]
+
+    def test_run_without_checks(self):
+        """
+        Ensure that `run` returns immediately without any checks.
+        """
+        scheduler = CheckScheduler([], loop=self.loop)
+        self.loop.run_until_complete(asyncio.wait_for(scheduler.run(), 1))
+
+    def test_stop(self):
+        """
+        Ensure that `stop` stops all scheduled checks and completes `run`.
+        """
+        check = CountingCheck([None] * 1000)
+        scheduler = CheckScheduler([check], loop=self.loop)
+        task = self.loop.create_task(scheduler.run())
+        self.loop.call_later(0.05, scheduler.stop)
+
+        self.loop.run_until_complete(asyncio.wait_for(task, 5))
+
+        assert 0 < check.calls < 1000
+        assert scheduler.scheduled_checks == []
+
+    def test_remove(self):
+        """
+        Ensure that `remove` stops just the given checks, while the rest of
+        them keep running.
+        """
+        removed = CountingCheck([None] * 1000)
+        kept = CountingCheck([None] * 1000)
+        scheduler = CheckScheduler([removed, kept], loop=self.loop)
+        task = self.loop.create_task(scheduler.run())
+        self.loop.call_later(0.05, scheduler.remove, [removed])
+        self.loop.run_until_complete(asyncio.sleep(0.1))
+        calls = removed.calls
+        self.loop.run_until_complete(asyncio.sleep(0.05))
+
+        assert 0 < calls == removed.calls
+        assert kept.calls > calls
+        assert [
+            scheduled_check.check
+            for scheduled_check in scheduler.scheduled_checks
+        ] == [kept]
+
+        scheduler.stop()
+        self.loop.run_until_complete(asyncio.wait_for(task, 5))
+
+    def test_run_no_should_main_check_run(self):
+        """
+        Ensure that when a check does not implement the
+        `should_main_check_run` method, the appropriate exception gets raised.
+        """
+        class ScumCheck(checks.BaseCheck):
+            # No implementation of `should_main_check_run`
+            main = mock.MagicMock()
+
+        scum_check = ScumCheck()
+        scheduler = CheckScheduler([scum_check], loop=self.loop)
+
+        try:
+            self.loop.run_until_complete(scheduler.run())
+        except NotImplementedError as e:
+            expected_message = (
+                f'Check "{scum_check}" should implement the '
+                '"should_main_check_run" method, in order to run its "main" '
+                'check'
+            )
+            assert str(e) == expected_message
+        else:
+            raise AssertionError('NotImplementedError was not raised')
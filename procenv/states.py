@@ -0,0 +1,85 @@
+import collections
+import time
+
+
+# A change to report; either a transition from the `previous` state to
+# `state`, or a `summary` of `state` lasting, with the seconds spent in the
+# previous state or in the state respectively (`None` for the first state).
+StateChange = collections.namedtuple(
+    'StateChange', ['previous', 'state', 'duration', 'summary'],
+)
+
+
+class StateMachine:
+    """
+    The `StateMachine` class tracks the state of something being observed
+    repeatedly (e.g. whether Redis responds) and tells when it should be
+    reported; when it changes and, if `summary_interval` is set, every
+    `summary_interval` seconds that it stays the same.
+
+    A new state has to be observed for `hysteresis` seconds in a row before
+    it is taken as a change, so that a flapping state does not get reported
+    every time it flips. `hysteresis` can also be a mapping of states to
+    seconds, for states that should be reported sooner than others.
+    """
+
+    def __init__(self, hysteresis=0, summary_interval=None):
+        self.hysteresis = hysteresis
+        self.summary_interval = summary_interval
+        self.state = None
+        self.changed_at = None
+        self.reported_at = None
+        self.candidate = None
+        self.candidate_since = None
+
+    def get_hysteresis(self, state):
+        if isinstance(self.hysteresis, dict):
+            return self.hysteresis.get(state, 0)
+
+        return self.hysteresis
+
+    def reset(self, state, now=None):
+        """
+        Set the current state, without reporting it.
+        """
+        now = time.monotonic() if now is None else now
+        self.state = state
+        self.changed_at = self.reported_at = now
+        self.candidate = self.candidate_since = None
+
+    def update(self, state, now=None):
+        """
+        Record an observation of the given state and return the
+        `StateChange` to report, or `None` if there is nothing to report.
+        """
+        now = time.monotonic() if now is None else now
+
+        if state == self.state:
+            self.candidate = self.candidate_since = None
+
+            if (
+                self.summary_interval and
+                now - self.reported_at >= self.summary_interval
+            ):
+                self.reported_at = now
+                return StateChange(
+                    state, state, now - self.changed_at, True,
+                )
+
+            return None
+
+        if state != self.candidate:
+            self.candidate, self.candidate_since = state, now
+
+        if now - self.candidate_since < self.get_hysteresis(state):
+            return None
+
+        previous, started_at = self.state, self.candidate_since
+        duration = (
+            started_at - self.changed_at
+            if self.changed_at is not None else None
+        )
+        self.reset(state, now)
+        # The new state started when it was first observed.
+        self.changed_at = started_at
+        return StateChange(previous, state, duration, False)
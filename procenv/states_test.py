@@ -0,0 +1,68 @@
+from . import states
+
+
+def test_state_machine():
+    """
+    Make sure that `StateMachine` reports the first state and every change
+    of state, but not states observed again.
+    """
+    machine = states.StateMachine()
+
+    assert machine.update('up', now=100) == states.StateChange(
+        None, 'up', None, False,
+    )
+    assert machine.update('up', now=101) is None
+    assert machine.update('down', now=110) == states.StateChange(
+        'up', 'down', 10, False,
+    )
+    assert machine.update('down', now=1000) is None
+    assert machine.state == 'down'
+
+
+def test_state_machine_hysteresis():
+    """
+    Make sure that a new state is reported only once it has been observed for
+    `hysteresis` seconds in a row, so that flapping does not get reported.
+    """
+    machine = states.StateMachine(hysteresis=5)
+    machine.reset('up', now=100)
+
+    # Flapping
+    assert machine.update('down', now=101) is None
+    assert machine.update('up', now=102) is None
+    assert machine.update('down', now=103) is None
+    assert machine.update('down', now=107) is None
+    assert machine.state == 'up'
+
+    # The new state counts from when it was first observed in a row.
+    assert machine.update('down', now=108) == states.StateChange(
+        'up', 'down', 3, False,
+    )
+    assert machine.changed_at == 103
+
+    # The hysteresis of states missing from a mapping is zero.
+    machine = states.StateMachine(hysteresis={'down': 5})
+    assert machine.update('down', now=100) is None
+    assert machine.update('up', now=101).state == 'up'
+
+
+def test_state_machine_summary():
+    """
+    Make sure that a state lasting is summarized every `summary_interval`
+    seconds, along with how long it has lasted.
+    """
+    machine = states.StateMachine(summary_interval=60)
+    machine.update('down', now=100)
+
+    assert machine.update('down', now=159) is None
+    assert machine.update('down', now=160) == states.StateChange(
+        'down', 'down', 60, True,
+    )
+    assert machine.update('down', now=200) is None
+    assert machine.update('down', now=220) == states.StateChange(
+        'down', 'down', 120, True,
+    )
+
+    # Changes reset the summary interval.
+    assert machine.update('up', now=230).summary is False
+    assert machine.update('up', now=280) is None
@@ -0,0 +1,38 @@
+import collections
+import math
+
+
+class LatencyHistogram:
+    """
+    A rolling window of the latest latency samples (in seconds), which
+    reports percentiles (e.g. p50 or p99) of the samples in it.
+    """
+
+    def __init__(self, size=1000):
+        self.samples = collections.deque(maxlen=size)
+
+    def __len__(self):
+        return len(self.samples)
+
+    def add(self, latency):
+        self.samples.append(latency)
+
+    def percentile(self, percent):
+        """
+        Return the given percentile of the samples, using the nearest-rank
+        method, or `None` if there are no samples.
+        """
+        if not self.samples:
+            return None
+
+        samples = sorted(self.samples)
+        rank = max(math.ceil(percent / 100 * len(samples)), 1)
+        return samples[rank - 1]
+
+    @property
+    def p50(self):
+        return self.percentile(50)
+
+    @property
+    def p99(self):
+        return self.percentile(99)
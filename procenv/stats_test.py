@@ -0,0 +1,19 @@
+from . import stats
+
+
+def test_latency_histogram():
+    """
+    Make sure that `LatencyHistogram` reports the percentiles of its latest
+    samples only.
+    """
+    histogram = stats.LatencyHistogram(size=100)
+    assert histogram.p50 is None
+
+    for latency in range(1, 201):
+        histogram.add(latency / 1000)
+
+    assert len(histogram) == 100
+    assert histogram.p50 == 0.15
+    assert histogram.p99 == 0.199
+    assert histogram.percentile(100) == 0.2
+    assert histogram.percentile(0) == 0.101
@@ -0,0 +1,215 @@
+import asyncio
+import collections
+import datetime
+import sys
+
+from . import utils
+
+
+class OutputWriter:
+    """
+    The `OutputWriter` class writes output to stdout (or to the given binary
+    stream) from a thread, so that a slow stdout never blocks the event loop.
+    Writers of output wait while more than `high_water` bytes are pending,
+    until the pending bytes drop below `low_water`, which in turn makes them
+    stop reading the output of processes and eventually blocks the processes
+    themselves.
+    """
+    high_water = 1024 * 1024
+    low_water = 256 * 1024
+
+    def __init__(self, loop=None, stream=None):
+        self.loop = loop or asyncio.get_event_loop()
+        self.stream = stream
+        self.pending = collections.deque()
+        self.pending_bytes = 0
+        self.drained = asyncio.Event()
+        self.drained.set()
+        self.task = None
+
+    def write_nowait(self, data):
+        """
+        Queue the given bytes for writing, without waiting for the pending
+        bytes to drain.
+        """
+        self.pending.append(data)
+        self.pending_bytes += len(data)
+
+        if self.pending_bytes > self.high_water:
+            self.drained.clear()
+
+        if self.task is None:
+            self.task = self.loop.create_task(self.run())
+
+    async def write(self, data):
+        """
+        Queue the given bytes for writing and wait while too many bytes are
+        pending.
+        """
+        self.write_nowait(data)
+        await self.drained.wait()
+
+    def write_to_stream(self, data):
+        if self.stream is not None:
+            self.stream.write(data)
+            self.stream.flush()
+            return
+
+        # Look up stdout on every write, as it might have been replaced.
+        stream = sys.stdout
+        buffer = getattr(stream, 'buffer', None)
+
+        if buffer is not None:
+            buffer.write(data)
+        else:
+            stream.write(data.decode(errors='replace'))
+
+        stream.flush()
+
+    async def run(self):
+        """
+        Write pending output in batches, until there is none left.
+        """
+        try:
+            while self.pending:
+                data = b''.join(self.pending)
+                self.pending.clear()
+
+                try:
+                    await self.loop.run_in_executor(
+                        None, self.write_to_stream, data,
+                    )
+                except OSError:
+                    # Output that cannot be written (e.g. to a closed pipe)
+                    # gets dropped, instead of blocking the processes
+                    # forever.
+                    pass
+                finally:
+                    self.pending_bytes -= len(data)
+
+                    if self.pending_bytes <= self.low_water:
+                        self.drained.set()
+        finally:
+            # Even if writing failed otherwise or got cancelled, so that the
+            # next write starts over, instead of queueing up forever.
+            self.task = None
+
+    async def flush(self):
+        """
+        Wait until all pending bytes have been written, or until writing
+        stops with bytes still pending (e.g. after failing), as they would
+        wait for the next write to start over.
+        """
+        while self.pending_bytes and self.task is not None:
+            # Waited for without raising, as its failures are not the ones of
+            # the caller.
+            await asyncio.wait([self.task])
+
+
+class OutputPipeline:
+    """
+    The `OutputPipeline` class reads the output of the processes of an
+    application in large chunks, splits it into lines and writes them to
+    stdout, prefixed by the time and the name of each process (along with
+    the `label` of the application, if any).
+
+    The last `ring_buffer_size` lines of each process are kept in memory and
+    subscribers (e.g. checks) get every batch of lines read, as
+    `callback(process_name, lines)`, with each line being a `bytes` object
+    without its trailing new line. A subscriber raising an exception gets
+    logged, without keeping the rest of them or the output from going on.
+    """
+    chunk_size = 64 * 1024
+    max_line_length = 1024 * 1024
+    ring_buffer_size = 1000
+
+    def __init__(self, loop=None, writer=None, label=None):
+        self.loop = loop or asyncio.get_event_loop()
+        self.writer = writer or OutputWriter(loop=self.loop)
+        self.label = label
+        self.name_width = len('system')
+        self.ring_buffers = {}
+        self.subscribers = []
+
+    def subscribe(self, callback):
+        self.subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        self.subscribers.remove(callback)
+
+    def tail(self, name):
+        """
+        Return the last lines of output of the process with the given name.
+        """
+        return list(self.ring_buffers.get(name, ()))
+
+    def get_display_name(self, name):
+        return f'{self.label}/{name}' if self.label else name
+
+    def get_prefix(self, name):
+        timestamp = datetime.datetime.now().strftime('%H:%M:%S')
+        name = self.get_display_name(name)
+        return f'{timestamp} {name.ljust(self.name_width)} | '.encode()
+
+    def format_lines(self, name, lines):
+        prefix = self.get_prefix(name)
+        return b''.join([prefix + line + b'\n' for line in lines])
+
+    def write_line(self, name, line):
+        """
+        Write a line of output (e.g. a message of the `system`), without
+        waiting for stdout.
+        """
+        self.writer.write_nowait(self.format_lines(name, [line.encode()]))
+
+    async def feed(self, name, lines):
+        ring_buffer = self.ring_buffers.get(name)
+
+        if ring_buffer is None:
+            ring_buffer = collections.deque(maxlen=self.ring_buffer_size)
+            self.ring_buffers[name] = ring_buffer
+
+        ring_buffer.extend(lines)
+
+        for callback in self.subscribers:
+            try:
+                callback(name, lines)
+            except Exception as e:
+                subscriber = getattr(callback, '__qualname__', repr(callback))
+                utils.log(
+                    'PE56',
+                    f'Subscriber {subscriber}() to the output of {name} '
+                    f'raised {e!r}',
+                )
+
+        await self.writer.write(self.format_lines(name, lines))
+
+    async def pipe(self, name, reader):
+        """
+        Read the output of the process with the given name from the given
+        `asyncio.StreamReader`, until EOF.
+        """
+        partial_line = b''
+
+        while True:
+            chunk = await reader.read(self.chunk_size)
+
+            if not chunk:
+                break
+
+            lines = chunk.split(b'\n')
+
+            if partial_line:
+                lines[0] = partial_line + lines[0]
+
+            partial_line = lines.pop()
+
+            if len(partial_line) >= self.max_line_length:
+                lines.append(partial_line)
+                partial_line = b''
+
+            if lines:
+                await self.feed(name, lines)
+
+        if partial_line:
+            await self.feed(name, [partial_line])
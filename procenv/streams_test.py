@@ -0,0 +1,230 @@
+from unittest import mock
+import asyncio
+import unittest
+
+from . import streams
+
+
+class RecordingWriter:
+    def __init__(self):
+        self.data = []
+
+    def write_nowait(self, data):
+        self.data.append(data)
+
+    async def write(self, data):
+        self.write_nowait(data)
+
+
+def feed_reader(chunks):
+    reader = asyncio.StreamReader()
+
+    for chunk in chunks:
+        reader.feed_data(chunk)
+
+    reader.feed_eof()
+    return reader
+
+
+class OutputPipelineTest(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.get_event_loop()
+        self.writer = RecordingWriter()
+        self.pipeline = streams.OutputPipeline(
+            loop=self.loop, writer=self.writer,
+        )
+
+    def pipe(self, chunks, chunk_size=None):
+        if chunk_size:
+            self.pipeline.chunk_size = chunk_size
+
+        self.loop.run_until_complete(
+            self.pipeline.pipe('web.1', feed_reader(chunks)),
+        )
+
+    def test_pipe_splits_lines_across_chunks(self):
+        """
+        Ensure that lines split across chunks are being joined back and that
+        a trailing partial line is written on EOF.
+        """
+        lines = []
+        self.pipeline.subscribe(lambda name, batch: lines.extend(batch))
+        self.pipe([b'hel', b'lo\nwor', b'ld\n\nbye'], chunk_size=4)
+
+        assert lines == [b'hello', b'world', b'', b'bye']
+        output = b''.join(self.writer.data).decode()
+        assert output.count('web.1  | ') == 4
+        assert output.endswith('web.1  | bye\n')
+
+    def test_pipe_splits_long_lines(self):
+        """
+        Ensure that lines longer than `max_line_length` get split, instead of
+        being buffered indefinitely.
+        """
+        self.pipeline.max_line_length = 8
+        self.pipe([b'x' * 20 + b'\n'], chunk_size=4)
+
+        assert self.pipeline.tail('web.1') == [
+            b'xxxxxxxx', b'xxxxxxxx', b'xxxx',
+        ]
+
+    def test_tail(self):
+        """
+        Ensure that only the last `ring_buffer_size` lines of each process
+        are being kept.
+        """
+        self.pipeline.ring_buffer_size = 3
+        self.pipe([b'1\n2\n3\n4\n5\n'])
+
+        assert self.pipeline.tail('web.1') == [b'3', b'4', b'5']
+        assert self.pipeline.tail('worker.1') == []
+
+    def test_unsubscribe(self):
+        """
+        Ensure that unsubscribed callbacks do not get any more lines.
+        """
+        callback = mock.Mock()
+        self.pipeline.subscribe(callback)
+        self.pipeline.unsubscribe(callback)
+        self.pipe([b'hello\n'])
+
+        callback.assert_not_called()
+
+    def test_subscriber_exception(self):
+        """
+        Ensure that a subscriber raising an exception gets logged, while the
+        rest of the subscribers and the output go on.
+        """
+        def failing_callback(name, lines):
+            raise ValueError('bad line')
+
+        callback = mock.Mock()
+        self.pipeline.subscribe(failing_callback)
+        self.pipeline.subscribe(callback)
+
+        with mock.patch('procenv.utils.log') as log_mock:
+            self.pipe([b'hello\n'])
+
+        log_mock.assert_called_once_with(
+            'PE56',
+            'Subscriber OutputPipelineTest.test_subscriber_exception.'
+            '<locals>.failing_callback() to the output of web.1 raised '
+            "ValueError('bad line')",
+        )
+        callback.assert_called_once_with('web.1', [b'hello'])
+        assert self.writer.data[0].endswith(b'web.1  | hello\n')
+
+    def test_write_line(self):
+        """
+        Ensure that lines of the system are being written with the same
+        prefix as the output of the processes.
+        """
+        self.pipeline.name_width = 7
+        self.pipeline.write_line('system', 'web.1 started')
+
+        assert self.writer.data[0].endswith(b' system  | web.1 started\n')
+
+    def test_write_line_with_label(self):
+        """
+        Ensure that the output of applications with a label (when Procenv
+        runs many applications) is prefixed by it.
+        """
+        pipeline = streams.OutputPipeline(
+            loop=self.loop, writer=self.writer, label='blog',
+        )
+        pipeline.write_line('web.1', 'hello')
+
+        assert pipeline.get_display_name('web.1') == 'blog/web.1'
+        assert self.writer.data[0].endswith(b' blog/web.1 | hello\n')
+
+
+class OutputWriterTest(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.get_event_loop()
+
+    def test_write_and_flush(self):
+        """
+        Ensure that queued output is written to the buffer of stdout.
+        """
+        writer = streams.OutputWriter(loop=self.loop)
+
+        async def write():
+            writer.write_nowait(b'hello\n')
+            await writer.write(b'world\n')
+            await writer.flush()
+
+        with mock.patch('sys.stdout') as stdout_mock:
+            self.loop.run_until_complete(write())
+
+        output = b''.join(
+            call[0][0] for call in stdout_mock.buffer.write.call_args_list
+        )
+        assert output == b'hello\nworld\n'
+
+    def test_backpressure(self):
+        """
+        Ensure that writers wait while more than `high_water` bytes are
+        pending, until they get written.
+        """
+        writer = streams.OutputWriter(loop=self.loop)
+        writer.high_water = 4
+        writer.low_water = 0
+        writer.write_to_stream = mock.Mock()
+
+        async def write():
+            writer.write_nowait(b'hello\n')
+            assert not writer.drained.is_set()
+            await writer.write(b'world\n')
+            assert writer.drained.is_set()
+
+        self.loop.run_until_complete(write())
+
+        assert writer.pending_bytes == 0
+        writer.write_to_stream.assert_called_once_with(b'hello\nworld\n')
+
+    def test_write_failure(self):
+        """
+        Ensure that a write failing with an unexpected exception does not keep
+        later writes from starting over.
+        """
+        writer = streams.OutputWriter(loop=self.loop)
+        writer.write_to_stream = mock.Mock(side_effect=[ValueError, None])
+
+        async def write():
+            writer.write_nowait(b'hello\n')
+
+            with self.assertRaises(ValueError):
+                await writer.task
+
+            assert writer.task is None
+            await writer.write(b'world\n')
+            await writer.flush()
+
+        self.loop.run_until_complete(write())
+
+        writer.write_to_stream.assert_called_with(b'world\n')
+
+    def test_flush_after_failure(self):
+        """
+        Ensure that flushing returns when writing stopped with bytes still
+        pending, instead of waiting for them forever.
+        """
+        writer = streams.OutputWriter(loop=self.loop)
+
+        def write_to_stream(data):
+            # Queued while the batch is being written, which then fails.
+            self.loop.call_soon_threadsafe(writer.write_nowait, b'world\n')
+            raise ValueError
+
+        writer.write_to_stream = mock.Mock(side_effect=write_to_stream)
+
+        async def write():
+            writer.write_nowait(b'hello\n')
+            task = writer.task
+            await asyncio.wait_for(writer.flush(), 5)
+            assert isinstance(task.exception(), ValueError)
+
+        self.loop.run_until_complete(write())
+
+        assert writer.task is None
+        assert writer.pending_bytes == len(b'world\n')
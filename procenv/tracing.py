@@ -0,0 +1,196 @@
+import collections
+import contextlib
+import json
+import os
+import time
+
+
+# A span of the lifecycle of Procenv, with its start and end in seconds of
+# the monotonic clock (the clock of the event loop), shown on the given track
+# (e.g. a process or a check).
+Span = collections.namedtuple(
+    'Span', ['name', 'track', 'start', 'end', 'attributes'],
+)
+
+
+def format_otlp_value(value):
+    if isinstance(value, bool):
+        return {'boolValue': value}
+
+    if isinstance(value, int):
+        # 64-bit integers are strings in the JSON encoding of OTLP.
+        return {'intValue': str(value)}
+
+    if isinstance(value, float):
+        return {'doubleValue': value}
+
+    return {'stringValue': str(value)}
+
+
+class Tracer:
+    """
+    The `Tracer` class records spans of the lifecycle of Procenv and its
+    applications (e.g. preboot checks, spawning processes, the time until
+    they output anything or bind to their ports and every run of the main
+    checks) and writes them to a file, either in the trace event format of
+    Chrome (for `chrome://tracing` or Perfetto) or as OTLP-JSON.
+
+    Nothing gets recorded until the tracer is enabled. At most `max_spans`
+    spans are kept, so that the main checks of a long-running application do
+    not grow the trace without bounds.
+    """
+    max_spans = 100000
+
+    def __init__(self):
+        self.enabled = False
+        self.spans = []
+        self.dropped = 0
+        # Spans are timed with the monotonic clock, which gets converted to
+        # wall-clock time when writing them.
+        self.origin = time.time() - time.monotonic()
+
+    def add_span(self, name, track, start, end=None, **attributes):
+        if not self.enabled:
+            return
+
+        if len(self.spans) >= self.max_spans:
+            self.dropped += 1
+            return
+
+        end = time.monotonic() if end is None else end
+        self.spans.append(Span(name, track, start, end, attributes))
+
+    @contextlib.contextmanager
+    def span(self, name, track, **attributes):
+        """
+        Record the block of the `with` statement as a span.
+        """
+        start = time.monotonic()
+
+        try:
+            yield attributes
+        finally:
+            self.add_span(name, track, start, **attributes)
+
+    def to_microseconds(self, seconds):
+        return round((self.origin + seconds) * 1e6)
+
+    def to_chrome(self):
+        """
+        Return the spans in the trace event format of Chrome, as complete
+        events with a thread for each track.
+        """
+        pid = os.getpid()
+        tids = {}
+        events = [{
+            'name': 'process_name',
+            'ph': 'M',
+            'pid': pid,
+            'args': {'name': 'procenv'},
+        }]
+
+        for span in self.spans:
+            if span.track not in tids:
+                tids[span.track] = len(tids) + 1
+                events.append({
+                    'name': 'thread_name',
+                    'ph': 'M',
+                    'pid': pid,
+                    'tid': tids[span.track],
+                    'args': {'name': span.track},
+                })
+
+            events.append({
+                'name': span.name,
+                'cat': span.track,
+                'ph': 'X',
+                'ts': self.to_microseconds(span.start),
+                'dur': round((span.end - span.start) * 1e6),
+                'pid': pid,
+                'tid': tids[span.track],
+                'args': span.attributes,
+            })
+
+        return {
+            'traceEvents': events,
+            'displayTimeUnit': 'ms',
+            'otherData': {'dropped_spans': self.dropped},
+        }
+
+    def to_otlp(self):
+        """
+        Return the spans as OTLP-JSON, as children of a root span covering
+        all of them, with their track as the `procenv.track` attribute.
+        """
+        trace_id = os.urandom(16).hex()
+        root_id = os.urandom(8).hex()
+        spans = []
+
+        for span in self.spans:
+            attributes = dict(span.attributes, **{'procenv.track': span.track})
+            spans.append({
+                'traceId': trace_id,
+                'spanId': os.urandom(8).hex(),
+                'parentSpanId': root_id,
+                'name': span.name,
+                'kind': 1,
+                'startTimeUnixNano': str(
+                    self.to_microseconds(span.start) * 1000,
+                ),
+                'endTimeUnixNano': str(self.to_microseconds(span.end) * 1000),
+                'attributes': [
+                    {'key': key, 'value': format_otlp_value(value)}
+                    for key, value in attributes.items()
+                ],
+            })
+
+        if self.spans:
+            spans.insert(0, {
+                'traceId': trace_id,
+                'spanId': root_id,
+                'name': 'procenv',
+                'kind': 1,
+                'startTimeUnixNano': str(self.to_microseconds(
+                    min(span.start for span in self.spans),
+                ) * 1000),
+                'endTimeUnixNano': str(self.to_microseconds(
+                    max(span.end for span in self.spans),
+                ) * 1000),
+                'attributes': [{
+                    'key': 'procenv.dropped_spans',
+                    'value': format_otlp_value(self.dropped),
+                }],
+            })
+
+        return {
+            'resourceSpans': [{
+                'resource': {
+                    'attributes': [{
+                        'key': 'service.name',
+                        'value': {'stringValue': 'procenv'},
+                    }],
+                },
+                'scopeSpans': [{
+                    'scope': {'name': 'procenv'},
+                    'spans': spans,
+                }],
+            }],
+        }
+
+    def write(self, path, trace_format='chrome'):
+        """
+        Write the spans recorded so far to the given path, replacing it
+        atomically, so that writing the trace again (e.g. on a signal) never
+        leaves a partial file behind.
+        """
+        trace = self.to_otlp() if trace_format == 'otlp' else self.to_chrome()
+        temporary_path = f'{path}.tmp'
+
+        with open(temporary_path, 'w') as f:
+            json.dump(trace, f, default=str)
+
+        os.replace(temporary_path, path)
+        return len(self.spans)
+
+
+tracer = Tracer()
@@ -0,0 +1,117 @@
+import json
+import os
+import tempfile
+
+from . import tracing
+
+
+def create_tracer():
+    tracer = tracing.Tracer()
+    tracer.enabled = True
+    tracer.origin = 1000
+    tracer.add_span('preboot()', 'PortBindCheck', 1, 1.5, succeeded=True)
+    tracer.add_span('spawn', 'web.1', 2, 2.25)
+    tracer.add_span('first output', 'web.1', 2.25, 3)
+    return tracer
+
+
+def test_add_span():
+    """
+    Make sure that nothing gets recorded until the tracer is enabled, and
+    that spans beyond `max_spans` get dropped and counted.
+    """
+    tracer = tracing.Tracer()
+    tracer.add_span('spawn', 'web.1', 1, 2)
+
+    with tracer.span('preboot', 'application'):
+        pass
+
+    assert tracer.spans == []
+
+    tracer.enabled = True
+    tracer.max_spans = 2
+
+    with tracer.span('preboot', 'application') as attributes:
+        attributes['checks'] = 4
+
+    tracer.add_span('spawn', 'web.1', 1, 2)
+    tracer.add_span('spawn', 'web.2', 1, 2)
+
+    assert len(tracer.spans) == 2
+    assert tracer.spans[0].attributes == {'checks': 4}
+    assert tracer.spans[0].end >= tracer.spans[0].start
+    assert tracer.spans[1] == tracing.Span('spawn', 'web.1', 1, 2, {})
+    assert tracer.dropped == 1
+
+
+def test_to_chrome():
+    """
+    Make sure that spans are written as complete trace events in
+    microseconds of wall-clock time, with a named thread for each track.
+    """
+    events = create_tracer().to_chrome()['traceEvents']
+    threads = {
+        event['args']['name']: event['tid']
+        for event in events if event['name'] == 'thread_name'
+    }
+    spans = [event for event in events if event['ph'] == 'X']
+
+    assert threads == {'PortBindCheck': 1, 'web.1': 2}
+    assert [
+        (span['name'], span['tid'], span['ts'], span['dur'])
+        for span in spans
+    ] == [
+        ('preboot()', 1, 1001000000, 500000),
+        ('spawn', 2, 1002000000, 250000),
+        ('first output', 2, 1002250000, 750000),
+    ]
+    assert spans[0]['args'] == {'succeeded': True}
+
+
+def test_to_otlp():
+    """
+    Make sure that spans are written as OTLP-JSON, as children of a root
+    span covering all of them.
+    """
+    trace = create_tracer().to_otlp()
+    resource_spans = trace['resourceSpans'][0]
+    root, *spans = resource_spans['scopeSpans'][0]['spans']
+
+    assert resource_spans['resource']['attributes'] == [
+        {'key': 'service.name', 'value': {'stringValue': 'procenv'}},
+    ]
+    assert root['name'] == 'procenv'
+    assert root['startTimeUnixNano'] == '1001000000000'
+    assert root['endTimeUnixNano'] == '1003000000000'
+    assert [span['name'] for span in spans] == [
+        'preboot()', 'spawn', 'first output',
+    ]
+    assert {span['parentSpanId'] for span in spans} == {root['spanId']}
+    assert {span['traceId'] for span in spans} == {root['traceId']}
+    assert spans[0]['attributes'] == [
+        {'key': 'succeeded', 'value': {'boolValue': True}},
+        {'key': 'procenv.track', 'value': {'stringValue': 'PortBindCheck'}},
+    ]
+
+
+def test_write():
+    """
+    Make sure that the trace gets written in the requested format, replacing
+    any trace written before.
+    """
+    tracer = create_tracer()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'trace.json')
+
+        assert tracer.write(path) == 3
+
+        with open(path) as f:
+            assert 'traceEvents' in json.load(f)
+
+        assert tracer.write(path, 'otlp') == 3
+
+        with open(path) as f:
+            assert 'resourceSpans' in json.load(f)
+
+        assert os.listdir(directory) == ['trace.json']
@@ -1,7 +1,20 @@
 from importlib import import_module
+import collections
 import functools
 import os
-import sys
+import re
+
+from . import logs
+
+
+PROCFILE_LINE_RE = re.compile(r'^([A-Za-z0-9_-]+):\s*(.+)$')
+PROCESS_TYPE_RE = re.compile(r'^[A-Za-z0-9_-]+$')
+PROC_NET_TCP_PATHS = ('/proc/net/tcp', '/proc/net/tcp6')
+TCP_LISTEN_STATE = '0A'
+
+# The process types of each Procfile parsed, by path, along with the
+# modification time, size and inode of the file when it got parsed.
+procfile_cache = {}
 
 
 @functools.lru_cache()
@@ -29,6 +42,157 @@ def detect_procfile():
     return procfile
 
 
+def parse_procfile(path):
+    """
+    Parse the Procfile at the given path and return an ordered mapping of its
+    process types to their commands. Lines that do not declare a process type
+    (e.g. comments or blank lines) are ignored.
+
+    Parsed Procfiles are cached until their modification time, size or inode
+    changes (e.g. when an editor replaces the file), so that reading the
+    process types again costs a single `stat`.
+    """
+    stat = os.stat(path)
+    key = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+    cached = procfile_cache.get(path)
+
+    if cached is None or cached[0] != key:
+        process_types = collections.OrderedDict()
+
+        with open(path) as procfile:
+            for line in procfile:
+                match = PROCFILE_LINE_RE.match(line.strip())
+
+                if match:
+                    process_type, command = match.groups()
+                    process_types[process_type] = command
+
+        cached = procfile_cache[path] = (key, process_types)
+
+    return collections.OrderedDict(cached[1])
+
+
+def read_env_file(path):
+    """
+    Read the `KEY=value` pairs of the given environment file (e.g. `.env`)
+    into a dictionary. Return an empty dictionary if the file does not exist.
+    """
+    env = {}
+
+    if not os.path.exists(path):
+        return env
+
+    with open(path) as env_file:
+        for line in env_file:
+            line = line.strip()
+
+            if not line or line.startswith('#') or '=' not in line:
+                continue
+
+            key, value = line.split('=', 1)
+            key = key.strip()
+
+            if key.startswith('export '):
+                key = key[len('export '):].strip()
+
+            value = value.strip()
+
+            if len(value) > 1 and value[0] == value[-1] and value[0] in '\'"':
+                value = value[1:-1]
+
+            env[key] = value
+
+    return env
+
+
+def parse_concurrency(values):
+    """
+    Parse `process_type=count` pairs, separated by commas (e.g.
+    `web=4,worker=2`), into a mapping of process types to the number of
+    instances to run. Raise ValueError if any of the pairs is not valid.
+    """
+    concurrency = collections.OrderedDict()
+
+    for value in values:
+        for pair in value.split(','):
+            process_type, _, count = pair.strip().partition('=')
+
+            if not PROCESS_TYPE_RE.match(process_type):
+                raise ValueError(f'"{pair}" is not a process_type=count pair')
+
+            try:
+                concurrency[process_type] = int(count)
+            except ValueError:
+                raise ValueError(f'"{count}" is not a number of instances')
+
+            if concurrency[process_type] < 1:
+                raise ValueError(
+                    f'Process type "{process_type}" should run at least one '
+                    'instance',
+                )
+
+    return concurrency
+
+
+def parse_watch(values):
+    """
+    Parse `process_type` or `process_type=pattern` values (e.g. `web` or
+    `worker=tasks/*.py`) into a mapping of process types to the patterns of
+    the files to restart them on; an empty list of patterns matches every
+    file. Raise ValueError if any of the values is not valid.
+    """
+    watch = collections.OrderedDict()
+    every_file = set()
+
+    for value in values:
+        process_type, _, pattern = value.partition('=')
+        process_type, pattern = process_type.strip(), pattern.strip()
+
+        if not PROCESS_TYPE_RE.match(process_type):
+            raise ValueError(f'"{process_type}" is not a process type')
+
+        watch.setdefault(process_type, [])
+
+        if pattern:
+            watch[process_type].append(pattern)
+        else:
+            every_file.add(process_type)
+
+    for process_type in every_file:
+        watch[process_type] = []
+
+    return watch
+
+
+def get_listening_ports(paths=PROC_NET_TCP_PATHS):
+    """
+    Return the set of TCP ports that sockets are listening to, by parsing
+    `/proc/net/tcp` and `/proc/net/tcp6`. Return `None` if none of these files
+    is available (e.g. not running on Linux).
+    """
+    ports = set()
+    available = False
+
+    for path in paths:
+        try:
+            with open(path) as proc_net_tcp:
+                table = proc_net_tcp.read()
+        except OSError:
+            continue
+
+        available = True
+
+        # Skip the header line. The fields we care about are the local
+        # address (`{ip}:{port}` in hex) and the state of each socket.
+        for line in table.splitlines()[1:]:
+            fields = line.split(None, 4)
+
+            if len(fields) > 3 and fields[3] == TCP_LISTEN_STATE:
+                ports.add(int(fields[1].rsplit(':', 1)[1], 16))
+
+    return ports if available else None
+
+
 @functools.lru_cache()
 def import_string(dotted_path):
     """
@@ -53,12 +217,10 @@ def import_string(dotted_path):
         raise ImportError(msg) from err
 
 
-def log(code, message):
+def log(code, message, check=None):
     """
-    Log a Procenv message to stderr, with an optional message code.
+    Log a Procenv message to stderr, with an optional message code. Messages
+    get written asynchronously by the log sink of Procenv; `check` defaults to
+    the name of the check running in the current context (if any).
     """
-    message_prefix = '[Procenv Message]'
-    code_prefix = f' ({code})' if code else ''
-    prefix = f'{message_prefix}{code_prefix}'
-    full_message = f'{prefix} {message}\n'
-    sys.stderr.write(full_message)
+    logs.sink.emit(code, message, check or logs.current_check.get())
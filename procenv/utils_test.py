@@ -1,7 +1,9 @@
 from unittest import mock
 import os
+import tempfile
 
 from . import checks
+from . import logs
 from . import utils
 
 
@@ -91,8 +93,144 @@ def test_log_message():
     appropriate format. Logging is important in Procenv, we do not want to
     ruin it.
     """
+    # Messages logged by earlier tests should not end up in the mock.
+    logs.sink.flush()
+
     with mock.patch('sys.stderr') as stderr_mock:
         utils.log('PE99', 'Hey mark')
+        logs.sink.flush()
         stderr_mock.write.assert_called_once_with(
             '[Procenv Message] (PE99) Hey mark\n',
         )
+
+    # Messages should be attributed to the check running in the current
+    # context, unless stated otherwise.
+    logs.current_check.set('SomeCheck')
+
+    with mock.patch('procenv.logs.sink') as sink_mock:
+        utils.log('PE99', 'Hey mark')
+        utils.log('PE99', 'Hey mark', check='OtherCheck')
+
+    assert sink_mock.emit.call_args_list == [
+        mock.call('PE99', 'Hey mark', 'SomeCheck'),
+        mock.call('PE99', 'Hey mark', 'OtherCheck'),
+    ]
+
+
+def test_parse_procfile():
+    """
+    Make sure that `parse_procfile` returns the process types of a Procfile
+    in order, ignoring lines that do not declare a process type.
+    """
+    process_types = utils.parse_procfile(
+        'procenv/fixtures/procfile_echo/Procfile',
+    )
+    assert list(process_types.items()) == [
+        (
+            'hello',
+            'echo "hello from $PS on port $PORT and $GREETING" && sleep 30',
+        ),
+        ('world', 'sleep 0.2 && echo world && exit 3'),
+    ]
+
+
+def test_parse_procfile_cache():
+    """
+    Make sure that `parse_procfile` parses a Procfile again only after it
+    changes, even when it gets replaced by a file of the same size and
+    modification time.
+    """
+    with tempfile.TemporaryDirectory() as temp_dir:
+        procfile = os.path.join(temp_dir, 'Procfile')
+        replacement = os.path.join(temp_dir, 'Procfile.new')
+
+        with open(procfile, 'w') as f:
+            f.write('web: sleep 1\n')
+
+        with mock.patch('builtins.open', wraps=open) as open_mock:
+            assert utils.parse_procfile(procfile) == {'web': 'sleep 1'}
+            assert utils.parse_procfile(procfile) == {'web': 'sleep 1'}
+            assert open_mock.call_count == 1
+
+        with open(replacement, 'w') as f:
+            f.write('web: sleep 2\n')
+
+        mtime_ns = os.stat(procfile).st_mtime_ns
+        os.utime(replacement, ns=(mtime_ns, mtime_ns))
+        os.rename(replacement, procfile)
+
+        assert utils.parse_procfile(procfile) == {'web': 'sleep 2'}
+
+        # Changing the mapping returned does not change the cached one.
+        utils.parse_procfile(procfile)['web'] = 'lol'
+        assert utils.parse_procfile(procfile) == {'web': 'sleep 2'}
+
+
+def test_read_env_file():
+    """
+    Make sure that `read_env_file` reads the variables of an environment file
+    and returns an empty dictionary, if the file does not exist.
+    """
+    env = utils.read_env_file('procenv/fixtures/procfile_echo/.env')
+    assert env == {
+        'GREETING': 'hello',
+        'QUOTED': 'quoted value',
+        'PORT': '1234',
+    }
+    assert utils.read_env_file('procenv/fixtures/.env.inexistent') == {}
+
+
+def test_parse_concurrency():
+    """
+    Make sure that `parse_concurrency` parses comma-separated pairs of
+    process types and counts, given once or more, and rejects invalid ones.
+    """
+    concurrency = utils.parse_concurrency(['web=4,worker=2', 'clock=1'])
+    assert list(concurrency.items()) == [
+        ('web', 4), ('worker', 2), ('clock', 1),
+    ]
+    assert utils.parse_concurrency([]) == {}
+
+    for value in ('web', 'web=four', 'web=0', 'we b=1'):
+        try:
+            utils.parse_concurrency([value])
+        except ValueError:
+            continue
+
+        raise AssertionError(f'"{value}" should not be valid')
+
+
+def test_parse_watch():
+    """
+    Make sure that `parse_watch` maps process types to the patterns of the
+    files to restart them on, with process types given without a pattern
+    restarting on every file.
+    """
+    watch = utils.parse_watch(
+        ['worker=tasks/*.py', 'web', 'worker=lib/*', 'web=app/*'],
+    )
+    assert list(watch.items()) == [
+        ('worker', ['tasks/*.py', 'lib/*']), ('web', []),
+    ]
+
+    try:
+        utils.parse_watch(['we b=app/*'])
+    except ValueError:
+        pass
+    else:
+        raise AssertionError('"we b" should not be valid')
+
+
+def test_get_listening_ports():
+    """
+    Make sure that `get_listening_ports` returns the ports of the sockets in
+    the LISTEN state of both `/proc/net/tcp` and `/proc/net/tcp6` and `None`
+    if none of them is available.
+    """
+    paths = (
+        'procenv/fixtures/proc_net/tcp',
+        'procenv/fixtures/proc_net/tcp6',
+        'procenv/fixtures/proc_net/inexistent',
+    )
+    assert utils.get_listening_ports(paths) == {80, 8000, 8080}
+    assert utils.get_listening_ports(paths[-1:]) is None
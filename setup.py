@@ -9,11 +9,21 @@ setup(
     author_email='paris@sourcelair.com',
     license='MIT',
     packages=['procenv'],
+    python_requires='>=3.8',
     install_requires=[
-        'honcho>=1.0.0',
         'click>=6.7.0',
     ],
     entry_points={
         'console_scripts': ['procenv=procenv.cli:main'],
+        'procenv.checks': [
+            'ProcfileCheck=procenv.checks:ProcfileCheck',
+            'PortBindCheck=procenv.checks:PortBindCheck',
+            'NetlinkPortBindCheck=procenv.checks:NetlinkPortBindCheck',
+            'DatabaseURLCheck=procenv.checks:DatabaseURLCheck',
+            'RedisURLCheck=procenv.checks:RedisURLCheck',
+            'HttpHealthCheck=procenv.checks:HttpHealthCheck',
+            'OutputPatternCheck=procenv.checks:OutputPatternCheck',
+            'ResourceUsageCheck=procenv.checks:ResourceUsageCheck',
+        ],
     }
 )